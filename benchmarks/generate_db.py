@@ -0,0 +1,239 @@
+import os
+import sys
+import time
+import random
+import sqlite3
+import argparse
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(BENCH_DIR), 'src'))
+
+from database_manager import DatabaseManager, needs_enrichment
+from db_connection import close_connections
+from data_utils import get_job_signature, normalize_location
+from text_store import compress_text
+
+# Синтетическая база vacancies для бенчмарков: детерминированная (seed), без сети.
+# Распределения грубо повторяют реальную базу: доли источников, ~25% вакансий
+# без полного описания (их берет DescriptionManager), часть устаревших (mark_stale).
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+DATA_DIR = os.path.join(BENCH_DIR, "data")
+
+ROLES = ["Data Analyst", "Data Scientist", "Data Engineer", "BI Analyst", "Business Intelligence Developer",
+         "Analytics Engineer", "Machine Learning Engineer", "Product Analyst", "Reporting Analyst",
+         "Datenanalyst", "Marketing Analyst", "Financial Analyst", "Controller Data Analytics", "BI Consultant"]
+LEVELS = ["", "", "", "Junior ", "Senior ", "Lead ", "Werkstudent ", "Praktikant ", "Principal "]
+SUFFIXES = [" (m/w/d)", " (m/w/d)", " (w/m/d)", " (m/f/d)", " (gn)", " (all genders)", "", " - Remote möglich"]
+COMPANY_PREFIXES = ["Nord", "Süd", "Alpen", "Rhein", "Main", "Elb", "Donau", "Isar", "Spree", "Berg", "Stadt", "Land",
+                    "Blau", "Grün", "Silber", "Stern", "Adler", "Falken", "Linden", "Eichen", "Hansa", "Bavaria",
+                    "Helvetia", "Austria", "Ost", "West", "Neckar", "Weser", "Ruhr", "Taunus", "Harz", "Boden",
+                    "Zug", "Tirol", "Saar", "Mosel", "Havel", "Oder", "Inn", "Lech"]
+COMPANY_CORES = ["Werk", "Bank", "Versicherung", "Logistik", "Energie", "Digital", "Software", "Consulting", "Retail",
+                 "Pharma", "Health", "Mobility", "Telekom", "Analytics", "Systems", "Solutions", "Technik", "Data",
+                 "Finanz", "Handel", "Medien", "Bau", "Chemie", "Automotive", "Robotics", "Cloud", "Payments",
+                 "Food", "Fashion", "Travel", "Immobilien", "Verlag", "Labs", "Services", "Holding", "Capital",
+                 "Invest", "Gruppe", "Partner", "Netz"]
+LEGAL_FORMS = ["GmbH", "AG", "SE", "GmbH & Co. KG", "KGaA", "", "Holding GmbH", "Ltd."]
+CITIES = {
+    "DE": ["Berlin", "München", "Hamburg", "Frankfurt am Main", "Köln", "Düsseldorf", "Stuttgart", "Leipzig",
+           "Dortmund", "Essen", "Bremen", "Dresden", "Hannover", "Nürnberg", "Duisburg", "Bochum", "Wuppertal",
+           "Bielefeld", "Bonn", "Münster", "Mannheim", "Karlsruhe", "Augsburg", "Wiesbaden", "Mainz", "Kiel",
+           "Freiburg im Breisgau", "Heidelberg", "Darmstadt", "Regensburg", "Ingolstadt", "Ulm", "Potsdam",
+           "Erlangen", "Wolfsburg", "Jena", "Rostock", "Lübeck", "Kassel", "Saarbrücken", "Deutschland"],
+    "AT": ["Wien", "Graz", "Linz", "Salzburg", "Innsbruck", "Klagenfurt", "Villach", "Wels", "St. Pölten",
+           "Dornbirn", "Österreich"],
+    "CH": ["Zürich", "Genf", "Basel", "Bern", "Lausanne", "Winterthur", "Luzern", "St. Gallen", "Lugano",
+           "Zug", "Schweiz"],
+}
+COUNTRY_WEIGHTS = [("DE", 0.75), ("AT", 0.13), ("CH", 0.12)]
+SOURCE_WEIGHTS = [("adzuna", 0.40), ("stepstone", 0.25), ("arbeitsagentur", 0.20), ("xing", 0.15)]
+
+DE_SENTENCES = [
+    "Du analysierst große Datenmengen aus unterschiedlichen Quellsystemen mit SQL und Python.",
+    "Du entwickelst interaktive Dashboards in Power BI oder Tableau für das Management.",
+    "Gemeinsam mit dem Data-Engineering-Team baust du ETL-Strecken mit Airflow und Spark auf.",
+    "Du definierst KPIs und berätst die Fachbereiche bei datengetriebenen Entscheidungen.",
+    "Du automatisierst wiederkehrende Reportings und verbesserst die Datenqualität nachhaltig.",
+    "Abgeschlossenes Studium der Informatik, Mathematik, Statistik oder eine vergleichbare Qualifikation.",
+    "Mehrjährige Berufserfahrung mit SQL, Python (Pandas) sowie Cloud-Plattformen wie Azure, AWS oder GCP.",
+    "Erfahrung mit Docker, Kubernetes, Git und CI/CD-Pipelines ist von Vorteil.",
+    "Kenntnisse in SAP BW, Excel und VBA runden dein Profil ab.",
+    "Sehr gute Deutsch- und gute Englischkenntnisse in Wort und Schrift.",
+    "Eine strukturierte, eigenständige Arbeitsweise und ausgeprägte Kommunikationsstärke.",
+    "Flexible Arbeitszeiten und bis zu drei Tage mobiles Arbeiten pro Woche.",
+    "30 Tage Urlaub, JobRad, Wellpass und eine betriebliche Altersvorsorge.",
+    "Individuelle Weiterbildungsmöglichkeiten über unsere Academy sowie Konferenzbesuche.",
+    "Ein modernes Büro in zentraler Lage mit sehr guter Anbindung an den ÖPNV.",
+    "Wir freuen uns auf deine Bewerbung über unser Karriereportal.",
+]
+EN_SENTENCES = [
+    "You build and maintain data models in dbt on top of Snowflake or BigQuery.",
+    "You develop machine learning prototypes with PyTorch, TensorFlow and scikit-learn.",
+    "You own reporting in Looker and Excel for the finance and product teams.",
+    "You work closely with stakeholders to translate business questions into analyses.",
+    "You design A/B tests and communicate results to senior management.",
+    "3+ years of experience with SQL, Python and Spark in a production environment.",
+    "Hands-on experience with Kubernetes, Terraform, Docker and GitLab CI.",
+    "Experience with MLOps tooling such as MLflow or Kubeflow is a plus.",
+    "Strong communication and problem solving skills, fluent English; German is a plus.",
+    "Familiarity with NoSQL databases like MongoDB or Cassandra.",
+    "Hybrid working model with a flexible home office policy.",
+    "Competitive salary, company pension scheme and 28 days of vacation.",
+    "A learning budget of 1.500 EUR per year and regular hackathons.",
+    "Visa sponsorship and relocation support for international candidates.",
+]
+HEADINGS_DE = ["Deine Aufgaben:", "Dein Profil:", "Wir bieten:", "Über uns:"]
+HEADINGS_EN = ["Your responsibilities:", "Your profile:", "What we offer:", "About us:"]
+
+
+def _weighted(rng, weights):
+    x = rng.random()
+    for value, w in weights:
+        x -= w
+        if x <= 0:
+            return value
+    return weights[-1][0]
+
+
+def make_description(rng, title, company):
+    """Описание 1-4 КБ из немецких или английских предложений (примерно 60/40)."""
+    german = rng.random() < 0.6
+    sentences, headings = (DE_SENTENCES, HEADINGS_DE) if german else (EN_SENTENCES, HEADINGS_EN)
+    target = rng.randint(1000, 4000)
+    parts = [f"{title} bei {company}." if german else f"{title} at {company}."]
+    size = len(parts[0])
+    while size < target:
+        block = [rng.choice(headings)] + rng.sample(sentences, rng.randint(3, 6))
+        text = " ".join(block)
+        parts.append(text)
+        size += len(text) + 1
+    return "\n".join(parts)
+
+
+def make_job(rng, today=None):
+    """
+    Одна синтетическая вакансия в формате скраперов (dict) + служебные поля для базы.
+    Используется и генератором, и бенчмарком save_vacancies (новые вакансии).
+    """
+    today = today or datetime.now()
+    country = _weighted(rng, COUNTRY_WEIGHTS)
+    source = _weighted(rng, SOURCE_WEIGHTS)
+    role = rng.choice(ROLES)
+    title = f"{rng.choice(LEVELS)}{role}{rng.choice(SUFFIXES)}"
+    company = f"{rng.choice(COMPANY_PREFIXES)}{rng.choice(COMPANY_CORES).lower()} {rng.choice(LEGAL_FORMS)}".strip()
+    location = rng.choice(CITIES[country])
+    if country == "DE" and rng.random() < 0.2 and location != "Deutschland":
+        location = f"{rng.randint(10000, 99999)} {location}"
+    elif rng.random() < 0.1:
+        location = f"{location}, Hybrid"
+
+    salary_min = salary_max = None
+    if rng.random() < 0.5:
+        salary_min = float(rng.randrange(38000, 90000, 1000))
+        salary_max = salary_min + rng.randrange(0, 30000, 1000)
+
+    first_seen = today - timedelta(days=rng.randint(0, 120))
+    last_seen = first_seen + timedelta(days=rng.randint(0, (today - first_seen).days))
+    return {
+        "id": str(rng.randint(10**8, 10**9)),
+        "title": title,
+        "company": company,
+        "location": location,
+        "country_search": country,
+        "salary_min": salary_min,
+        "salary_max": salary_max,
+        "salary_is_predicted": source == "adzuna" and salary_min is not None and rng.random() < 0.3,
+        "url": f"https://www.{source}.example/job/{rng.randint(10**8, 10**9)}",
+        "search_query": role,
+        "search_level": rng.choice(["Junior", "Middle", "Senior", "Lead", "General"]),
+        "source": source,
+        "created": first_seen.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "first_seen": first_seen.strftime("%Y-%m-%d"),
+        "last_seen": last_seen.strftime("%Y-%m-%d"),
+    }
+
+
+def generate(size, path, seed=42, batch_size=10_000):
+    """Создает базу на `size` вакансий (схема - через DatabaseManager, чтобы совпадали миграции)."""
+    if os.path.exists(path):
+        os.remove(path)
+    DatabaseManager(path)
+    close_connections()
+    rng = random.Random(seed)
+    today = datetime.now()
+    started = time.time()
+
+    with sqlite3.connect(path) as conn:
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        seen = set()
+        inserted = 0
+        while inserted < size:
+            rows, texts = [], []
+            while len(rows) < min(batch_size, size - inserted):
+                job = make_job(rng, today)
+                signature = get_job_signature(job["title"], job["company"], job["location"])
+                if signature in seen:
+                    continue
+                seen.add(signature)
+                r = rng.random()
+                if r < 0.15:
+                    description = job["title"]  # агрегатор: описание = заголовок
+                elif r < 0.25:
+                    description = make_description(rng, job["title"], job["company"])[:rng.randint(150, 590)]
+                else:
+                    description = make_description(rng, job["title"], job["company"])
+                is_active = 1 if (today - datetime.strptime(job["last_seen"], "%Y-%m-%d")).days <= 10 else int(rng.random() < 0.3)
+                vacancy_id = inserted + len(rows) + 1
+                rows.append((vacancy_id, signature, job["id"], job["title"], job["company"], job["location"],
+                             job["country_search"], job["salary_min"], job["salary_max"],
+                             1 if job["salary_is_predicted"] else 0, job["created"], job["url"], job["search_query"],
+                             job["search_level"], job["first_seen"], job["last_seen"], job["source"], is_active,
+                             needs_enrichment(description, job["title"]), len(description),
+                             normalize_location(job["location"]), job["last_seen"]))
+                codec, body, text_hash, length = compress_text(description)
+                texts.append((vacancy_id, text_hash, codec, length, body))
+            conn.executemany('''
+                INSERT INTO vacancies (internal_id, signature, api_id, title, company, location, country_api,
+                                       salary_min, salary_max, salary_is_predicted, created, url, search_query,
+                                       search_level, first_seen, last_seen, source, is_active, needs_enrichment,
+                                       description_length, city, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            conn.executemany("INSERT INTO vacancy_texts (vacancy_id, content_hash, codec, raw_length, body) "
+                             "VALUES (?, ?, ?, ?, ?)", texts)
+            inserted += len(rows)
+            conn.commit()
+            print(f"  [+] {inserted}/{size} rows ({round(time.time() - started, 1)}s)")
+    conn.close()
+    # Вставка шла в обход DatabaseManager - полнотекстовый индекс строим одним проходом
+    DatabaseManager(path).rebuild_search_index()
+    close_connections()
+    print(f"  [+] Full-text index built ({round(time.time() - started, 1)}s)")
+    return path
+
+
+def db_path_for(size):
+    return os.path.join(DATA_DIR, f"bench_{size}.sqlite")
+
+
+def ensure_db(size, seed=42, force=False):
+    """Возвращает путь к базе нужного размера, генерируя ее при первом запуске."""
+    path = db_path_for(size)
+    if force or not os.path.exists(path):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        print(f"[BENCH] Generating synthetic database: {SIZES[size]} rows -> {path}")
+        generate(SIZES[size], path, seed=seed)
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic vacancies databases for benchmarks")
+    parser.add_argument("--size", choices=list(SIZES), nargs="+", default=["10k"])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--force", action="store_true", help="Regenerate even if the file already exists")
+    args = parser.parse_args()
+    for s in args.size:
+        ensure_db(s, seed=args.seed, force=args.force)
@@ -0,0 +1,394 @@
+import os
+import sys
+import json
+import time
+import random
+import socket
+import sqlite3
+import argparse
+import platform
+import tracemalloc
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(os.path.dirname(BENCH_DIR), 'src'))
+
+from generate_db import SIZES, DATA_DIR, ensure_db, make_job
+from db_connection import close_connections
+
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+
+
+def _block_network():
+    """Бенчмарки работают только офлайн: любая попытка открыть соединение - ошибка."""
+    def guard(*args, **kwargs):
+        raise RuntimeError("benchmarks must run offline, but a network connection was attempted")
+    socket.socket.connect = guard
+    socket.create_connection = guard
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+class ReplayClient:
+    """
+    Подменяет общий HttpClient: отдает записанные страницы из fixtures/ по хосту.
+    Позволяет гонять fetch_page() скраперов целиком (включая пул разбора) без сети.
+    """
+    ROUTES = {
+        "stepstone.": ("stepstone_listing.html", "text/html"),
+        "xing.com": ("xing_listing.html", "text/html"),
+        "arbeitsagentur.de": ("arbeitsagentur_search.json", "application/json"),
+    }
+
+    def __init__(self):
+        from scrapers.http_cache import CachedResponse
+        self.responses = {}
+        for marker, (name, content_type) in self.ROUTES.items():
+            content = load_fixture(name).encode("utf-8")
+            self.responses[marker] = (CachedResponse, content, content_type)
+        self.preferred = {}
+
+    def get(self, url, params=None, **kwargs):
+        for marker, (cls, content, content_type) in self.responses.items():
+            if marker in url:
+                return cls(url, 200, content, {"Content-Type": content_type})
+        raise RuntimeError(f"no fixture recorded for {url}")
+
+    def get_first_working(self, key, urls, **kwargs):
+        return self.get(urls[0], **kwargs)
+
+    def pool_stats(self):
+        return {}
+
+
+class Bench:
+    """
+    Окружение одного запуска: рабочая копия синтетической базы и общие входные данные.
+    Мутирующие бенчмарки (save, mark_stale, skills) каждый раз получают свежую копию.
+    """
+
+    def __init__(self, size, seed=42):
+        self.size = size
+        self.rows = SIZES[size]
+        self.seed = seed
+        self.base_db = ensure_db(size, seed=seed)
+        self.work_db = os.path.join(DATA_DIR, f"work_{size}.sqlite")
+
+    def fresh_copy(self):
+        close_connections()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.work_db + suffix):
+                os.remove(self.work_db + suffix)
+        # backup API, а не копирование файла: база может быть в WAL-режиме
+        src, dst = sqlite3.connect(self.base_db), sqlite3.connect(self.work_db)
+        src.backup(dst)
+        src.close()
+        dst.close()
+        return self.work_db
+
+    def sample_existing(self, n):
+        """n случайных уже сохраненных вакансий в виде dict'ов скрапера (для апдейтов в save_vacancies)."""
+        rng = random.Random(self.seed)
+        with sqlite3.connect(self.base_db) as conn:
+            max_id = conn.execute("SELECT max(internal_id) FROM vacancies").fetchone()[0]
+            ids = rng.sample(range(1, max_id + 1), min(n, max_id))
+            rows = []
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                rows += conn.execute(f'''
+                    SELECT api_id, title, company, location, country_api, salary_min, salary_max, url, source
+                    FROM vacancies WHERE internal_id IN ({",".join("?" * len(chunk))})
+                ''', chunk).fetchall()
+        return [{"id": r[0], "title": r[1], "company": r[2], "location": r[3], "country_search": r[4],
+                 "salary_min": r[5], "salary_max": r[6], "url": r[7], "source": r[8]} for r in rows]
+
+
+# --- Бенчмарки ---
+# Каждый: setup(bench) -> state (не измеряется), run(state) -> число обработанных единиц.
+
+def setup_signature(bench):
+    rng = random.Random(bench.seed)
+    return [make_job(rng) for _ in range(50_000)]
+
+
+def run_signature(jobs):
+    from data_utils import get_job_signature
+    for job in jobs:
+        get_job_signature(job["title"], job["company"], job["location"])
+    return len(jobs)
+
+
+def setup_save(bench):
+    from database_manager import DatabaseManager
+    rng = random.Random(bench.seed + 1)
+    existing = bench.sample_existing(5_000)
+    new = [make_job(rng) for _ in range(5_000)]
+    jobs = existing + new
+    rng.shuffle(jobs)
+    # Страницами по 50, как их сохраняет пайплайн
+    pages = [jobs[i:i + 50] for i in range(0, len(jobs), 50)]
+    return DatabaseManager(bench.fresh_copy()), pages
+
+
+def run_save(state):
+    db, pages = state
+    for page in pages:
+        db.save_vacancies(page)
+    return sum(len(p) for p in pages)
+
+
+def setup_pending(bench):
+    from description_manager import DescriptionManager
+    return DescriptionManager(bench.base_db)
+
+
+def run_pending(dm):
+    calls = 0
+    for _ in range(5):
+        for source in (None, "adzuna", "stepstone", "xing", "arbeitsagentur"):
+            dm.get_pending_vacancies(limit=100, source=source)
+            calls += 1
+    return calls
+
+
+def setup_mark_stale(bench):
+    from database_manager import DatabaseManager
+    return DatabaseManager(bench.fresh_copy()), bench.rows
+
+
+def run_mark_stale(state):
+    db, rows = state
+    db.mark_stale_vacancies(threshold_days=7)
+    return rows
+
+
+def setup_skills(bench):
+    from database_manager import DatabaseManager
+    from skill_extractor import SkillExtractor
+    db = DatabaseManager(bench.fresh_copy())
+    return SkillExtractor(db.db_path), bench.rows
+
+
+def run_skills(state):
+    extractor, rows = state
+    extractor.analyze_skills(full=True)
+    return rows
+
+
+def setup_skills_incremental(bench):
+    # Ежедневный запуск: навыки уже извлечены, у 5% вакансий новое описание
+    from database_manager import DatabaseManager, save_description
+    from skill_extractor import SkillExtractor
+    db = DatabaseManager(bench.fresh_copy())
+    extractor = SkillExtractor(db.db_path)
+    extractor.analyze_skills(full=True)
+    with sqlite3.connect(db.db_path) as conn:
+        ids = [r[0] for r in conn.execute("SELECT internal_id FROM vacancies WHERE internal_id % 20 = 0")]
+        cursor = conn.cursor()
+        for vid in ids:
+            save_description(cursor, vid, f"Neue Beschreibung {vid}: Python, SQL, dbt und Snowflake.")
+    return extractor, len(ids)
+
+
+def run_skills_incremental(state):
+    extractor, rows = state
+    extractor.analyze_skills()
+    return rows
+
+
+def setup_near_dedup(bench):
+    from database_manager import DatabaseManager
+    from near_dedup import NearDuplicateDetector
+    db = DatabaseManager(bench.fresh_copy())
+    return NearDuplicateDetector(db.db_path), bench.rows
+
+
+def run_near_dedup(state):
+    detector, rows = state
+    detector.run()
+    return rows
+
+
+def setup_resign(bench):
+    from database_manager import DatabaseManager
+    from resign import Resigner
+    db = DatabaseManager(bench.fresh_copy())
+    # Каждая пятая сигнатура "устарела" - пересчитываются все строки, переписывается пятая часть
+    with sqlite3.connect(db.db_path) as conn:
+        conn.execute("UPDATE vacancies SET signature = 'old:' || internal_id WHERE internal_id % 5 = 0")
+    return Resigner(db.db_path), bench.rows
+
+
+def run_resign(state):
+    resigner, rows = state
+    resigner.run()
+    return rows
+
+
+def setup_json_ld(bench):
+    from description_manager import DescriptionManager
+    pages = [load_fixture(n) for n in ("jsonld_detail.html", "stepstone_detail.html", "arbeitsagentur_detail.html")]
+    return DescriptionManager(bench.base_db), pages * 200
+
+
+def run_json_ld(state):
+    dm, pages = state
+    for html in pages:
+        if not dm.scrape_json_ld(html):
+            raise RuntimeError("JSON-LD fixture was not parsed")
+    return len(pages)
+
+
+def setup_description_pages(bench):
+    names = ["jsonld_detail.html", "stepstone_detail.html", "stepstone_detail_nold.html",
+             "xing_detail.html", "arbeitsagentur_detail.html"]
+    return [(load_fixture(n), n.split("_")[0]) for n in names] * 100
+
+
+def run_description_pages(pages):
+    from html_parsing import parse_description_page
+    for html, site in pages:
+        parse_description_page(html, "", site=None if site == "jsonld" else site)
+    return len(pages)
+
+
+def setup_listings(bench):
+    from scrapers.stepstone import StepStoneScraper
+    from scrapers.xing import XingScraper
+    from scrapers.arbeitsagentur import ArbeitsagenturScraper
+    scrapers = [StepStoneScraper(), XingScraper(), ArbeitsagenturScraper()]
+    for s in scrapers:
+        s.client = ReplayClient()
+    return scrapers
+
+
+def run_listings(scrapers):
+    jobs = 0
+    for _ in range(50):
+        for s in scrapers:
+            page_jobs, _ = s.fetch_page("Data Analyst", 1, "DE")
+            jobs += len(page_jobs)
+    return jobs
+
+
+BENCHMARKS = [
+    # name, setup, run, unit
+    ("signature", setup_signature, run_signature, "jobs"),
+    ("save_vacancies", setup_save, run_save, "jobs"),
+    ("pending_vacancies", setup_pending, run_pending, "queries"),
+    ("mark_stale", setup_mark_stale, run_mark_stale, "rows"),
+    ("json_ld", setup_json_ld, run_json_ld, "pages"),
+    ("description_pages", setup_description_pages, run_description_pages, "pages"),
+    ("listing_pages", setup_listings, run_listings, "jobs"),
+    ("analyze_skills", setup_skills, run_skills, "rows"),
+    ("skills_incremental", setup_skills_incremental, run_skills_incremental, "rows"),
+    ("near_dedup", setup_near_dedup, run_near_dedup, "rows"),
+    ("resign", setup_resign, run_resign, "rows"),
+]
+
+
+def measure(bench, setup, run, repeat=3, memory=True):
+    """
+    Лучшее время из `repeat` прогонов (setup не входит в замер) и, отдельным прогоном,
+    пиковая память Python-аллокаций (tracemalloc; память самого SQLite сюда не входит).
+    """
+    best = None
+    count = 0
+    for _ in range(repeat):
+        state = setup(bench)
+        started = time.perf_counter()
+        count = run(state)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+        del state
+
+    peak_mb = None
+    if memory:
+        state = setup(bench)
+        tracemalloc.start()
+        run(state)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_mb = round(peak / 1024 / 1024, 2)
+    return {"count": count, "seconds": round(best, 4),
+            "per_second": round(count / best, 1) if best else 0.0, "peak_mb": peak_mb}
+
+
+def compare(results, baseline_path, tolerance):
+    """Сравнивает пропускную способность с сохраненным отчетом. Возвращает список регрессий."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    print(f"\n=== COMPARISON WITH {baseline_path} (tolerance {int(tolerance * 100)}%) ===")
+    for name, r in results.items():
+        base = baseline.get(name)
+        if not base or not base.get("per_second"):
+            continue
+        ratio = r["per_second"] / base["per_second"]
+        mark = "  "
+        if ratio < 1 - tolerance:
+            mark = "[!]"
+            regressions.append(name)
+        print(f"  {mark} {name:<20} {base['per_second']:>12} -> {r['per_second']:>12} /s  (x{round(ratio, 2)})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the DACH job market pipeline")
+    parser.add_argument("--size", choices=list(SIZES), default="10k", help="Synthetic database size")
+    parser.add_argument("--only", nargs="+", choices=[b[0] for b in BENCHMARKS], help="Run only these benchmarks")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark (best is reported)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the extra tracemalloc run")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", metavar="PATH", help="Write results as JSON (default: benchmarks/results/<size>_<ts>.json)",
+                        nargs="?", const="")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare with a saved JSON report, exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed throughput drop for --compare (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    _block_network()
+    import scrapers.http_client as http_client
+    http_client._client = ReplayClient()
+
+    bench = Bench(args.size, seed=args.seed)
+    print(f"\n=== BENCHMARKS: {args.size} rows, Python {platform.python_version()}, SQLite {sqlite3.sqlite_version} ===")
+
+    results = {}
+    for name, setup, run, unit in BENCHMARKS:
+        if args.only and name not in args.only:
+            continue
+        print(f"[BENCH] {name}...")
+        r = measure(bench, setup, run, repeat=args.repeat, memory=not args.no_memory)
+        r["unit"] = unit
+        results[name] = r
+        peak = f", peak {r['peak_mb']} MB" if r["peak_mb"] is not None else ""
+        print(f"  [+] {r['count']} {unit} in {r['seconds']}s -> {r['per_second']} {unit}/s{peak}")
+
+    report = {
+        "size": args.size, "rows": SIZES[args.size], "created": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(), "sqlite": sqlite3.sqlite_version, "platform": platform.platform(),
+        "results": results
+    }
+    if args.save is not None:
+        path = args.save or os.path.join(RESULTS_DIR, f"{args.size}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[BENCH] Results saved to {path}")
+
+    from html_parsing import get_parse_pool
+    get_parse_pool().shutdown()
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        if regressions:
+            print(f"\n[!] Performance regression: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -8,13 +8,17 @@ from datetime import datetime
 # Ensure imports work when running from the project root
 sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
 
-from database_manager import DatabaseManager
+from database_manager import DatabaseManager, quote_search_terms
 from scrapers.adzuna import AdzunaScraper
 from scrapers.stepstone import StepStoneScraper
 from scrapers.xing import XingScraper
 from scrapers.arbeitsagentur import ArbeitsagenturScraper
+from scrapers.http_client import get_http_client
 from description_manager import DescriptionManager
-from data_utils import normalize_location
+from scheduler import ScrapeScheduler
+from signature_index import SignatureIndex
+from job_queue import JobQueue
+from instrumentation import METRICS
 
 def load_config():
     config = configparser.ConfigParser()
@@ -28,12 +32,43 @@ def load_config():
             "priority": config.getint('Scraping', 'pages_priority'),
             "aggregator": config.getint('Scraping', 'pages_aggregator')
         },
+        "EARLY_STOP": {
+            "enabled": config.getboolean('Scraping', 'early_stop', fallback=True),
+            "known_ratio": config.getfloat('Scraping', 'early_stop_known_ratio', fallback=0.9),
+            "max_age_days": config.getint('Scraping', 'early_stop_max_age_days', fallback=3),
+            "stale_days": config.getint('Scraping', 'early_stop_stale_days', fallback=30)
+        },
+        "CONCURRENCY": {
+            "max_workers": config.getint('Concurrency', 'max_workers', fallback=8),
+            "sources": {k: config.getint('Concurrency', k) for k in ["stepstone", "xing", "aa", "adzuna"]
+                        if config.has_option('Concurrency', k)}
+        },
         "ENRICHMENT_LIMIT": config.getint('Scraping', 'enrichment_limit', fallback=1000),
         "ENRICHMENT_WORKERS": config.getint('Scraping', 'enrichment_workers', fallback=5),
         "TRANSLATION_LIMIT": config.getint('Scraping', 'translation_limit', fallback=500),
         "STRICT_MATCHING": config.getboolean('Scraping', 'strict_matching', fallback=False),
         "EXCLUDE_KEYWORDS": [k.strip().lower() for k in config.get('Scraping', 'exclude_keywords', fallback='').split(',') if k.strip()],
         "RELEVANT_KEYWORDS": [k.strip().lower() for k in config.get('Scraping', 'relevant_keywords', fallback='').split(',') if k.strip()],
+        "DEDUP": {
+            "threshold": config.getfloat('Dedup', 'threshold', fallback=0.8),
+            "num_perm": config.getint('Dedup', 'num_perm', fallback=128),
+            "bands": config.getint('Dedup', 'bands', fallback=16),
+            "shingle_size": config.getint('Dedup', 'shingle_size', fallback=3),
+            "min_shingles": config.getint('Dedup', 'min_shingles', fallback=30)
+        },
+        "SKILLS": {
+            "workers": None if config.get('Skills', 'workers', fallback='auto').strip() == 'auto'
+                       else config.getint('Skills', 'workers'),
+            "chunk_size": config.getint('Skills', 'chunk_size', fallback=2000),
+            "commit_rows": config.getint('Skills', 'commit_rows', fallback=50000),
+            "garbage_cache_size": config.getint('Skills', 'garbage_cache_size', fallback=100000)
+        },
+        "EXPORT": {
+            "dir": config.get('Export', 'dir', fallback='exports/parquet'),
+            "compression": config.get('Export', 'compression', fallback='zstd'),
+            "chunk_size": config.getint('Export', 'chunk_size', fallback=50000),
+            "columns": [c.strip() for c in config.get('Export', 'columns', fallback='').split(',') if c.strip()] or None
+        },
         "DEEPL": {
             "session_limit": config.getint('DeepL', 'session_limit', fallback=5000),
             "target_language": config.get('DeepL', 'target_language', fallback='RU')
@@ -54,149 +89,257 @@ class Pipeline:
         }
         self.is_test = is_test
         self.total_added = 0
+        self.known = None
+        self.queue = None
         if is_test:
             CONFIG["ROLES"] = ["Data Analyst"]
             CONFIG["LEVELS"] = {"Junior": ["Junior"], "General": [""]}
             CONFIG["DEFAULT_PAGES"] = {"priority": 1, "aggregator": 1}
 
-    def run(self, scrape=True, enrich=True, skills=True, translate=False, source=None):
+    def run(self, scrape=True, enrich=True, skills=True, translate=False, dedup=True, source=None, full_scan=False, resume=False, skills_full=False):
         print(f"=== STARTING PIPELINE: {datetime.now().strftime('%Y-%m-%d %H:%M')} ===")
         start_time = time.time()
         
         if scrape:
+            METRICS.begin("scrape")
             print(f"\n[SCRAPING] Fetching new vacancies (Source: {source if source else 'All'})...")
-            for role in CONFIG["ROLES"]:
-                # --- 1. Direct Sources (High Accuracy) ---
-                if source in [None, "stepstone", "xing", "aa"]:
-                    for level_name, synonyms in CONFIG["LEVELS"].items():
-                        for syn in synonyms:
-                            query = f"{syn} {role}".strip()
-                            print(f"\n[QUERY] Searching for: '{query}'")
-                            
-                            for country in CONFIG["COUNTRIES"]:
-                                # StepStone
-                                if source in [None, "stepstone"]:
-                                    print(f"  [STEPSTONE] Fetching ({country.upper()})...")
-                                    self._process_scraper("stepstone", query, role, level_name, country)
-                                
-                                # Xing
-                                if source in [None, "xing"]:
-                                    print(f"  [XING] Fetching...")
-                                    self._process_scraper("xing", query, role, level_name, country)
-
-                                # Arbeitsagentur (DE only)
-                                if country == "de" and source in [None, "aa"]:
-                                    print(f"  [AA] Fetching...")
-                                    self._process_scraper("aa", query, role, level_name, country)
+            if CONFIG["EARLY_STOP"]["enabled"] and not full_scan:
+                self.known = SignatureIndex.load(
+                    self.db.db_path,
+                    max_age_days=CONFIG["EARLY_STOP"]["max_age_days"],
+                    known_ratio=CONFIG["EARLY_STOP"]["known_ratio"]
+                )
+                print(f"[SCRAPING] Loaded {len(self.known)} known signatures for early pagination cut-off.")
+            queue = JobQueue(self.db.db_path)
+            cycle_id = queue.resume_cycle() if resume else None
+            if cycle_id:
+                print(f"[SCRAPING] Resuming cycle #{cycle_id}: {queue.summary(cycle_id)}")
+            else:
+                if resume:
+                    print("[SCRAPING] Nothing to resume, planning a new cycle.")
+                tasks = self._plan_scrape_tasks(source)
+                cycle_id = queue.start_cycle(tasks, self._pages_for)
+                print(f"[SCRAPING] Planned cycle #{cycle_id}: {len(tasks)} tasks.")
+            self.queue = queue
 
-                # --- 2. Aggregator (Efficiency: 1 broad query per role) ---
-                if source in [None, "adzuna"]:
-                    for country in CONFIG["COUNTRIES"]:
-                        print(f"\n  [ADZUNA] Fetching broad results for '{role}' ({country.upper()})...")
-                        self._process_scraper("adzuna", role, role, "General", country, is_aggregator=True, auto_level=True)
+            units = queue.get_units(cycle_id)
+            scheduler = ScrapeScheduler(
+                max_workers=CONFIG["CONCURRENCY"]["max_workers"],
+                source_limits=CONFIG["CONCURRENCY"]["sources"]
+            )
+            print(f"[SCRAPING] {len(units)} tasks to run, up to {scheduler.max_workers} in parallel...")
+            stats = scheduler.run(units, self._fetch_unit, self._save_unit)
+            left = queue.finish_cycle(cycle_id)
+            print(f"[SCRAPING] Tasks done: {stats['done']}/{stats['total']} (failed: {stats['failed']}) in {stats['seconds']}s")
+            print(f"[SCRAPING] Cycle #{cycle_id} pages: {queue.summary(cycle_id)}")
+            if left:
+                print(f"[SCRAPING] {left} pages left for retry, continue with --resume.")
+            if self.known is not None:
+                print(f"[SCRAPING] Early cut-off stopped pagination on {self.known.pages_cut} of {self.known.pages_checked} checked pages.")
             
             print(f"\n[SCRAPING] Finished! Total new vacancies added: {self.total_added}")
             
             # Post-scrape cleanup: Mark old vacancies as closed
-            closed_count = self.db.mark_stale_vacancies(threshold_days=7)
+            # Где пагинацию остановили рано, last_seen у вакансий с дальних страниц не обновлялся
+            closed_count = self.db.mark_stale_vacancies(
+                threshold_days=7,
+                keep_scopes=self.known.cut_scopes if self.known is not None else None,
+                keep_max_days=CONFIG["EARLY_STOP"]["stale_days"]
+            )
             if closed_count > 0:
                 print(f"[SCRAPING] Marked {closed_count} vacancies as closed/inactive.")
+            # Точка дневной истории активных вакансий для дашбордов
+            self.db.stats.snapshot_daily()
+            METRICS.end("scrape")
 
         # 3. Description Enrichment (Critical for skill analysis)
         if enrich:
+            METRICS.begin("enrich")
             print(f"\n[ENRICHMENT] Scraping full descriptions (Limit: {CONFIG['ENRICHMENT_LIMIT']}, Source: {source if source else 'All'})...")
             desc_manager = DescriptionManager(db_path=self.db.db_path)
             # Use limit from settings.ini
             limit = 20 if self.is_test else CONFIG["ENRICHMENT_LIMIT"]
             # Workers count from settings.ini
             desc_manager.run_parallel(limit=limit, max_workers=CONFIG["ENRICHMENT_WORKERS"], source=source)
+            METRICS.end("enrich")
 
         if translate:
+            METRICS.begin("translate")
             from translator import JobTranslator
             print(f"\n[TRANSLATION] Translating job titles (Limit: {CONFIG['TRANSLATION_LIMIT']})...")
             translator = JobTranslator(db_path=self.db.db_path)
             # Use limit from settings.ini
             limit = 10 if self.is_test else CONFIG["TRANSLATION_LIMIT"]
             translator.translate_titles(limit=limit)
+            METRICS.end("translate")
 
         # 5. Skill Extraction based on full descriptions
         if skills:
+            METRICS.begin("skills")
             try:
                 from skill_extractor import SkillExtractor
                 print("\n[SKILLS] Extracting skills...")
-                extractor = SkillExtractor(db_path=self.db.db_path)
-                extractor.analyze_skills()
+                extractor = SkillExtractor(db_path=self.db.db_path, **CONFIG["SKILLS"])
+                extractor.analyze_skills(full=skills_full)
             except ImportError:
                 print("\n[!] SkillExtractor not found. Skipping skill extraction.")
+            METRICS.end("skills")
+
+        # 6. Near-duplicates that the exact signature missed (needs full descriptions)
+        if dedup:
+            METRICS.begin("dedup")
+            from near_dedup import NearDuplicateDetector
+            print("\n[DEDUP] Looking for near-duplicate vacancies (MinHash/LSH)...")
+            detector = NearDuplicateDetector(db_path=self.db.db_path, **CONFIG["DEDUP"])
+            stats = detector.run()
+            print(f"[DEDUP] {stats['duplicates']} duplicates in {stats['clusters']} clusters "
+                  f"({stats['compared']} vacancies compared, {stats['signatures_updated']} new signatures, {stats['seconds']}s)")
+            METRICS.end("dedup")
 
         end_time = time.time()
         print(f"\n=== PIPELINE FINISHED IN {round((end_time - start_time)/60, 1)} MINUTES ===")
+        self._write_run_report()
 
-    def _process_scraper(self, name, query, role, level_name, country, is_aggregator=False, auto_level=False):
-        try:
-            pages = CONFIG["DEFAULT_PAGES"]["aggregator" if is_aggregator else "priority"]
+    def _write_run_report(self):
+        print("\n=== RUN METRICS ===")
+        METRICS.print_summary()
+        for path in METRICS.write_reports():
+            print(f"  Report written: {path}")
+
+    def _plan_scrape_tasks(self, source=None):
+        """Turns roles x levels x synonyms x countries x sources into a flat list of independent units."""
+        tasks = []
+        for role in CONFIG["ROLES"]:
+            # --- 1. Direct Sources (High Accuracy) ---
+            if source in [None, "stepstone", "xing", "aa"]:
+                for level_name, synonyms in CONFIG["LEVELS"].items():
+                    for syn in synonyms:
+                        query = f"{syn} {role}".strip()
+                        for country in CONFIG["COUNTRIES"]:
+                            for name in ["stepstone", "xing", "aa"]:
+                                if source not in [None, name]:
+                                    continue
+                                # Arbeitsagentur (DE only)
+                                if name == "aa" and country != "de":
+                                    continue
+                                tasks.append({
+                                    "source": name, "query": query, "role": role,
+                                    "level_name": level_name, "country": country,
+                                    "is_aggregator": False, "auto_level": False
+                                })
+
+            # --- 2. Aggregator (Efficiency: 1 broad query per role) ---
+            if source in [None, "adzuna"]:
+                for country in CONFIG["COUNTRIES"]:
+                    tasks.append({
+                        "source": "adzuna", "query": role, "role": role,
+                        "level_name": "General", "country": country,
+                        "is_aggregator": True, "auto_level": True
+                    })
+        return tasks
+
+    def _pages_for(self, task):
+        return CONFIG["DEFAULT_PAGES"]["aggregator" if task["is_aggregator"] else "priority"]
+
+    def _fetch_page(self, name, query, country, page):
+        if name == "adzuna":
+            return self.scrapers[name].fetch_page(country=country, query=query, page=page)
+        return self.scrapers[name].fetch_page(query, page=page, country=country)
+
+    def _fetch_unit(self, unit):
+        """
+        Runs in a worker thread: fetches the unit's pending pages in order (network + filtering only).
+        Stops at the first failed page, so the remaining ones stay pending for --resume.
+        """
+        results = []
+        for job_id, page in unit["pages"]:
+            try:
+                jobs, has_more = self._fetch_page(unit["source"], unit["query"], unit["country"], page)
+            except Exception as e:
+                results.append({"job_id": job_id, "page": page, "error": e})
+                break
+            valid_jobs = self._filter_jobs(jobs, unit["role"], unit["level_name"], unit["country"], unit["auto_level"])
+            result = {"job_id": job_id, "page": page, "jobs": jobs, "valid_jobs": valid_jobs}
+            results.append(result)
+            # End of results or early cut-off: the rest of the pages are not needed
+            if not has_more or (self.known is not None and self.known.is_page_known(jobs)):
+                result["last"] = True
+                break
+        return results
+
+    def _save_unit(self, unit, results):
+        """Runs in the main thread: saves every fetched page and records its state in the job queue."""
+        label = f"[{unit['source'].upper()}] '{unit['query']}' ({unit['country'].upper()})"
+        fetched = added = 0
+        for r in results:
+            if "error" in r:
+                print(f"  {label}: [!] Error on page {r['page']}: {r['error']}")
+                self.queue.mark_failed(r["job_id"], r["error"])
+                continue
+            page_added = self.db.save_vacancies(r["valid_jobs"])
+            METRICS.record_rows(unit["source"], inserted=page_added, updated=len(r["valid_jobs"]) - page_added)
+            self.queue.mark_done(r["job_id"], len(r["jobs"]), page_added)
+            if r.get("last"):
+                self.queue.skip_rest(unit, r["page"])
+            fetched += len(r["jobs"])
+            added += page_added
+        
+        if added > 0:
+            self.total_added += added
+            print(f"  {label}: [+] Added {added} new vacancies (filtered from {fetched})")
+        else:
+            print(f"  {label}: {fetched} fetched, nothing new")
+
+    def _filter_jobs(self, jobs, role, level_name, country, auto_level=False):
+        valid_jobs = []
+        for j in jobs:
+            title_lower = j.get('title', '').lower()
+            
+            # Smart Filter: 
+            # 1. Check for excluded keywords (e.g., Manager, Sales)
+            has_exclude = any(kw in title_lower for kw in CONFIG["EXCLUDE_KEYWORDS"])
+            
+            # 2. Check for relevant override keywords (e.g., Data, Analyst)
+            # If it's "Junior Analytics Manager", has_exclude is True, but has_relevant is also True.
+            has_relevant = any(kw in title_lower for kw in CONFIG["RELEVANT_KEYWORDS"])
             
-            if name in ["stepstone", "xing"]:
-                jobs = self.scrapers[name].fetch_jobs(query, pages=pages, country=country)
-            elif name == "adzuna":
-                jobs = self.scrapers[name].fetch_jobs(country=country, query=query, pages=pages)
+            if has_exclude and not has_relevant:
+                continue
+            
+            # 3. Double check - if we search for a specific role, title should be somewhat related
+            # (Optional, but helps with very fuzzy search results)
+            
+            # 4. Strict matching - verify level and role relevance
+            j['search_query'] = role
+            
+            # Re-detect level even for priority sources if strict mode is on
+            if auto_level or CONFIG["STRICT_MATCHING"]:
+                detected_level = "General"
+                for level, syns in CONFIG["LEVELS"].items():
+                    if any(s.lower() in title_lower for s in syns if s):
+                        detected_level = level
+                        break
+                j['search_level'] = detected_level
             else:
-                jobs = self.scrapers[name].fetch_jobs(query, pages=pages, country=country)
+                j['search_level'] = level_name
             
-            valid_jobs = []
-            for j in jobs:
-                title_lower = j.get('title', '').lower()
-                
-                # Smart Filter: 
-                # 1. Check for excluded keywords (e.g., Manager, Sales)
-                has_exclude = any(kw in title_lower for kw in CONFIG["EXCLUDE_KEYWORDS"])
-                
-                # 2. Check for relevant override keywords (e.g., Data, Analyst)
-                # If it's "Junior Analytics Manager", has_exclude is True, but has_relevant is also True.
-                has_relevant = any(kw in title_lower for kw in CONFIG["RELEVANT_KEYWORDS"])
+            # 3. Filter out if level was reassigned to something we didn't ask for
+            # Example: Search was "Junior", but title says "Senior". 
+            # If "Senior" is not in our current search levels, we might skip it.
+            # But for now, let's at least ensure correct tagging.
                 
-                if has_exclude and not has_relevant:
-                    continue
-                
-                # 3. Double check - if we search for a specific role, title should be somewhat related
-                # (Optional, but helps with very fuzzy search results)
-                
-                # 4. Strict matching - verify level and role relevance
-                j['search_query'] = role
-                
-                # Re-detect level even for priority sources if strict mode is on
-                if auto_level or CONFIG["STRICT_MATCHING"]:
-                    detected_level = "General"
-                    for level, syns in CONFIG["LEVELS"].items():
-                        if any(s.lower() in title_lower for s in syns if s):
-                            detected_level = level
-                            break
-                    j['search_level'] = detected_level
-                else:
-                    j['search_level'] = level_name
-                
-                # 3. Filter out if level was reassigned to something we didn't ask for
-                # Example: Search was "Junior", but title says "Senior". 
-                # If "Senior" is not in our current search levels, we might skip it.
-                # But for now, let's at least ensure correct tagging.
-                    
-                if 'country_search' not in j:
-                    j['country_search'] = country.upper()
-                
-                valid_jobs.append(j)
+            if 'country_search' not in j:
+                j['country_search'] = country.upper()
             
-            added = self.db.save_vacancies(valid_jobs)
-            if added > 0:
-                self.total_added += added
-                print(f"    [+] Added {added} new vacancies (filtered from {len(jobs)})")
-        except Exception as e:
-            print(f"    [!] Error in {name}: {e}")
+            valid_jobs.append(j)
+        return valid_jobs
 
     def run_salary_trends(self):
         """
         Collect historical salary trends for all roles and countries.
         """
         print(f"\n=== STARTING SALARY TRENDS COLLECTION: {datetime.now().strftime('%Y-%m-%d %H:%M')} ===")
+        METRICS.begin("trends")
         # Adzuna is the main source for history
         adzuna = self.scrapers.get("adzuna")
         if not adzuna:
@@ -231,16 +374,17 @@ class Pipeline:
                     history_data = adzuna.fetch_salary_history(country=country, query=kw)
                     if history_data:
                         self.db.save_salary_history(country, role, history_data)
+                        METRICS.record_rows("adzuna", updated=len(history_data))
                         print(f"    [+] Saved history for {role} using '{kw}' ({len(history_data)} months)")
                         success = True
                         break 
                 
                 if not success:
                     print(f"    [-] No history data found for {role} in {country.upper()} after trying all keywords.")
-                
-                time.sleep(1) # Quota friendly
 
+        METRICS.end("trends")
         print("\n=== TRENDS COLLECTION FINISHED ===")
+        self._write_run_report()
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -249,9 +393,20 @@ if __name__ == "__main__":
     parser.add_argument("--scrape", action="store_true", help="Run only vacancy scraping")
     parser.add_argument("--source", type=str, help="Specific source to scrape (adzuna, stepstone, xing, aa)")
     parser.add_argument("--enrich", action="store_true", help="Run only description enrichment")
-    parser.add_argument("--skills", action="store_true", help="Run only skill extraction")
+    parser.add_argument("--skills", action="store_true", help="Run only skill extraction (new/changed vacancies)")
+    parser.add_argument("--full", action="store_true", help="With --skills: re-extract skills for all vacancies")
     parser.add_argument("--translate", action="store_true", help="Translate job titles using DeepL")
+    parser.add_argument("--dedup", action="store_true", help="Run only near-duplicate detection")
+    parser.add_argument("--resign", action="store_true", help="Recompute all signatures after changing normalization rules and merge rows that now collide")
+    parser.add_argument("--dry-run", action="store_true", help="With --resign: only report what would be merged")
+    parser.add_argument("--resume", action="store_true", help="Continue the last interrupted scraping cycle")
+    parser.add_argument("--full-scan", action="store_true", help="Fetch all pages, disable early pagination cut-off")
     parser.add_argument("--reset", action="store_true", help="Clear all data from the database before starting")
+    parser.add_argument("--export", action="store_true", help="Export vacancies changed since the last export to Parquet")
+    parser.add_argument("--export-full", action="store_true", help="Re-export all vacancies to Parquet")
+    parser.add_argument("--search", type=str, metavar="QUERY", help='Full-text search in titles/descriptions, e.g. \'dbt snowflake\' or \'"data engineer"\'')
+    parser.add_argument("--country", type=str, help="Country filter for --search (de, at, ch)")
+    parser.add_argument("--level", type=str, help="Level filter for --search (e.g. Junior, General)")
     args = parser.parse_args()
     
     pipeline = Pipeline(is_test=args.test)
@@ -264,17 +419,51 @@ if __name__ == "__main__":
             print("[!] Reset cancelled.")
             exit()
 
-    if args.trends:
+    if args.search:
+        search = dict(country=args.country, level=args.level, source=args.source)
+        query = args.search
+        try:
+            results = pipeline.db.search_vacancies(query, **search)
+        except ValueError:
+            # Чаще всего - дефис или точка без кавычек ("power-bi", "node.js"): пробуем еще раз в кавычках
+            query = quote_search_terms(args.search)
+            try:
+                results = pipeline.db.search_vacancies(query, **search)
+            except ValueError as e:
+                print(f"[!] {e}")
+                print('    Hint: put terms with "-", "+" or "." in double quotes, e.g. --search \'"power-bi" dbt\'')
+                exit(1)
+        print(f"[SEARCH] {len(results)} matches for {query!r}")
+        for _, row in results.iterrows():
+            print(f"  [+] {row['title']} | {row['company']} | {row['location']} ({row['source']})")
+            print(f"      {row['snippet']}")
+    elif args.export or args.export_full:
+        from exporter import ParquetExporter
+        print(f"[EXPORT] Writing Parquet dataset to {CONFIG['EXPORT']['dir']}...")
+        exporter = ParquetExporter(pipeline.db.db_path, export_dir=CONFIG["EXPORT"]["dir"],
+                                   compression=CONFIG["EXPORT"]["compression"],
+                                   chunk_size=CONFIG["EXPORT"]["chunk_size"])
+        exporter.export(columns=CONFIG["EXPORT"]["columns"], full=args.export_full)
+    elif args.resign:
+        from resign import Resigner
+        print("[RESIGN] Recomputing signatures of all vacancies...")
+        stats = Resigner(pipeline.db.db_path).run(dry_run=args.dry_run)
+        print(f"[RESIGN] {stats['rows']} rows: {stats['resigned']} new signatures, {stats['merged']} rows merged "
+              f"into {stats['groups']} vacancies, {stats['cities']} cities updated ({stats['seconds']}s)"
+              + (" - dry run, nothing written" if args.dry_run else ""))
+        if stats['merged'] and not args.dry_run:
+            print("  [~] Merged rows are recorded in vacancy_deletions: the next --export rewrites the Parquet dataset")
+    elif args.trends:
         pipeline.run_salary_trends()
-    elif args.scrape or args.enrich or args.skills or args.translate:
+    elif args.scrape or args.enrich or args.skills or args.translate or args.dedup:
         # Run specific components
-        pipeline.run(scrape=args.scrape, enrich=args.enrich, skills=args.skills, translate=args.translate, source=args.source)
+        pipeline.run(scrape=args.scrape, enrich=args.enrich, skills=args.skills, translate=args.translate, dedup=args.dedup, source=args.source, full_scan=args.full_scan, resume=args.resume, skills_full=args.full)
     elif args.reset:
         # If ONLY reset was passed, we've already done it above
         print("[!] Database reset complete. No further actions requested.")
     else:
         # Default full run (only if NO specific flags were passed)
-        pipeline.run(source=args.source)
+        pipeline.run(source=args.source, full_scan=args.full_scan, resume=args.resume)
 
     # Final quota usage report
     adzuna = pipeline.scrapers.get("adzuna")
@@ -286,4 +475,12 @@ if __name__ == "__main__":
         print(f"  Weekly:  {status['weekly']}/{adzuna.LIMITS['weekly']}")
         print(f"  Monthly: {status['monthly']}/{adzuna.LIMITS['monthly']}")
         print("==============================")
+
+    # Connection reuse report (only hosts we actually talked to)
+    pool_stats = get_http_client().pool_stats()
+    if pool_stats:
+        print("\n=== HTTP CONNECTION POOLS ===")
+        for host, s in sorted(pool_stats.items()):
+            print(f"  {host}: {s['requests']} requests, {s.get('connections_opened', 0)} connections, "
+                  f"{round(s['bytes'] / 1024 / 1024, 1)} MB, {s['errors']} errors")
         print("==============================\n")
@@ -1,74 +1,87 @@
 import re
 import hashlib
+from functools import lru_cache
+from gazetteer import COUNTRY_WIDE, lookup_location
+
+# Правила очистки (по порядку); их же применяет векторная clean_text_series
+_CLEAN_RULES = [
+    # Удаляем (m/w/d), (f/m/d), (gn) и прочие гендерные приписки
+    (re.compile(r'[\(\[/]*(m/w/d|f/m/d|w/m/d|m/f/d|gn|m/w/x|x/m/w|d/m/w|w/m/x)[\)\]/]*'), ''),
+    # Удаляем правовые формы компаний (GmbH, AG, SE и т.д.)
+    (re.compile(r'\b(gmbh|ag|se|kg|limited|ltd|inc|llc|gbr|co\.? kg|kgaa|mbh)\b'), ''),
+    # Очищаем от ключевых слов "remote", "hybrid" и т.д. для более чистого сравнения
+    (re.compile(r'\b(remote|hybrid|homeoffice|home office|100%|on-site|onsite|work from home)\b'), ''),
+    # Очищаем от спецсимволов
+    (re.compile(r'[^a-z0-9а-яё ]'), ' '),
+]
 
 def clean_text(text):
     if not text:
         return ""
     # Приводим к нижнему регистру
     text = str(text).lower()
-    
-    # Удаляем (m/w/d), (f/m/d), (gn) и прочие гендерные приписки
-    text = re.sub(r'[\(\[/]*(m/w/d|f/m/d|w/m/d|m/f/d|gn|m/w/x|x/m/w|d/m/w|w/m/x)[\)\]/]*', '', text)
-    
-    # Удаляем правовые формы компаний (GmbH, AG, SE и т.д.)
-    text = re.sub(r'\b(gmbh|ag|se|kg|limited|ltd|inc|llc|gbr|co\.? kg|kgaa|mbh)\b', '', text)
-    
-    # Очищаем от ключевых слов "remote", "hybrid" и т.д. для более чистого сравнения
-    text = re.sub(r'\b(remote|hybrid|homeoffice|home office|100%|on-site|onsite|work from home)\b', '', text)
-
-    # Очищаем от спецсимволов и лишних пробелов
-    text = re.sub(r'[^a-z0-9а-яё ]', ' ', text)
+    for pattern, repl in _CLEAN_RULES:
+        text = pattern.sub(repl, text)
+    # Убираем лишние пробелы
     return " ".join(text.split()).strip()
 
+def clean_text_series(values):
+    """
+    clean_text для целой колонки (pandas Series): каждое правило - один векторный
+    str.replace, а не вызов функции на строку. Результат совпадает с clean_text.
+    """
+    values = values.where(values.notna() & (values != ""), "").astype(str).str.lower()
+    for pattern, repl in _CLEAN_RULES:
+        values = values.str.replace(pattern, repl, regex=True)
+    return values.str.replace(r' +', ' ', regex=True).str.strip()
+
+@lru_cache(maxsize=65536)
 def normalize_location(loc):
-    if not loc or loc.lower() in ["deutschland", "germany", "remote", "nationwide", "home office", "homeoffice", "unknown"]:
+    """
+    Название города для сигнатуры и колонки city. Город ищется по справочнику DACH
+    (gazetteer.py) по целым словам: "Frankfurt (Oder)" и "Frankfurt am Main" различаются,
+    "10115 Berlin-Mitte" и "Berlin, Deutschland" дают "Berlin", а строка только с PLZ -
+    город по диапазону индексов. Результат кэшируется (LRU): локации сильно повторяются.
+    """
+    if not loc:
         return "Remote/Deutschland"
-    
-    # Если формат "City, State", берем City
+    country_wide = COUNTRY_WIDE.get(loc.strip().lower())
+    if country_wide:
+        return country_wide
+
+    found = lookup_location(loc)
+    if found:
+        return found["city"] or found["region"]
+
+    # Не нашли в справочнике: как раньше - первая часть "City, State" без индексов
     if "," in loc:
         loc = loc.split(",")[0]
-    
-    # Очистка от почтовых индексов и лишних слов (типа "Berlin city", "Frankfurt am Main (Hessen)")
     loc = re.sub(r'\d{5}', '', loc)
     loc = loc.replace(" - ", " ").replace("/", " ")
-    
-    # Маппинг для склейки разных названий одного города
-    mapping = {
-        'frankfurt': 'Frankfurt am Main',
-        'ffm': 'Frankfurt am Main',
-        'münchen': 'München',
-        'munich': 'München',
-        'köln': 'Köln',
-        'cologne': 'Köln',
-        'nürnberg': 'Nürnberg',
-        'nuremberg': 'Nürnberg',
-        'düsseldorf': 'Düsseldorf',
-        'hannover': 'Hannover',
-        'zürich': 'Zürich',
-        'zurich': 'Zürich',
-        'wien': 'Wien',
-        'vienna': 'Wien',
-        'berlin': 'Berlin',
-        'hamburg': 'Hamburg'
-    }
-    
-    loc_clean = loc.lower().strip()
-    # Ищем точное вхождение названия города в строку
-    for key, val in mapping.items():
-        if key in loc_clean:
-            return val
-            
     return loc.strip().title()
 
+def get_job_fields(job):
+    """
+    Достает (title, company, location) из сырой вакансии любого источника.
+    Company/Location might be dicts (from Adzuna) or strings (from others).
+    """
+    title = job.get('title')
+    company = job.get('company', {}).get('display_name') if isinstance(job.get('company'), dict) else job.get('company')
+    location = job.get('location', {}).get('display_name') if isinstance(job.get('location'), dict) else job.get('location')
+    return title, company, location
+
+# Компания Unknown игнорируется в хеше, чтобы склеить с нормальной записью
+# ("rheine" sometimes appears as parsed error)
+_ANY_COMPANY = ("", "unknown", "rheine")
+
 def get_job_signature(title, company, location):
     """
     Создает уникальный хеш на основе названия вакансии, компании и города.
     """
     t = clean_text(title)
     
-    # Если компания Unknown, игнорируем её в хеше, чтобы склеить с нормальной записью
     c = clean_text(company)
-    if not c or c in ["unknown", "rheine"]: # "rheine" sometimes appears as parsed error
+    if c in _ANY_COMPANY:
         c = "any"
         
     # Для локации используем нормализатор
@@ -78,6 +91,30 @@ def get_job_signature(title, company, location):
     sig_string = f"{t}|{c}|{l}"
     return hashlib.md5(sig_string.encode()).hexdigest()
 
+def get_job_signatures(titles, companies, locations):
+    """
+    get_job_signature для колонок (pandas Series одной длины), например при пересчете
+    сигнатур всей базы (resign.py). Каждое уникальное значение чистится один раз
+    (заголовки, компании и особенно локации сильно повторяются), очистка - векторная.
+    Возвращает список сигнатур в порядке строк.
+    """
+    import pandas as pd
+
+    def clean_unique(values, normalize=None):
+        codes, uniques = pd.factorize(values, use_na_sentinel=False)
+        uniques = pd.Series(uniques, dtype=object)
+        if normalize is not None:
+            # NULL из базы после factorize может стать NaN
+            uniques = uniques.map(lambda v: normalize(v if isinstance(v, str) else None))
+        return clean_text_series(uniques).to_numpy()[codes]
+
+    t = clean_unique(titles)
+    c = clean_unique(companies)
+    c[pd.Series(c).isin(_ANY_COMPANY).to_numpy()] = "any"
+    l = clean_unique(locations, normalize_location)
+    md5 = hashlib.md5
+    return [md5(f"{a}|{b}|{d}".encode()).hexdigest() for a, b, d in zip(t, c, l)]
+
 if __name__ == "__main__":
     # Тест
     print(f"Signature 1: {get_job_signature('Data Analyst (m/w/d)', 'Google GmbH', 'Berlin')}")
@@ -1,16 +1,170 @@
+import re
 import sqlite3
 import os
 from datetime import datetime
-from data_utils import get_job_signature
+from data_utils import get_job_signature, get_job_fields, normalize_location
+from db_connection import get_connection
+from text_store import compress_text
+from market_stats import MarketStats
+from vacancy_reader import VacancyReader
+
+# Описание короче этого (или равное заголовку, как у агрегаторов) нужно докачать
+ENRICH_MIN_LENGTH = 600
+
+
+def needs_enrichment_sql(description, title):
+    """SQL-выражение для флага needs_enrichment (NULL-описание, как и раньше, не выбирается)."""
+    return f"COALESCE(length({description}) < {ENRICH_MIN_LENGTH} OR {description} = {title}, 0)"
+
+
+def needs_enrichment(description, title):
+    """То же правило в Python - для записи, когда текст уже на руках."""
+    if description is None:
+        return 0
+    return 1 if len(description) < ENRICH_MIN_LENGTH or description == title else 0
+
+
+def save_vacancy_skills(cursor, rows):
+    """
+    Записывает навыки в skills / vacancy_skills. rows - [(vacancy_id, [навыки])];
+    прежние навыки этих вакансий заменяются.
+    """
+    names = sorted({name for _, skills in rows for name in skills})
+    cursor.executemany("INSERT OR IGNORE INTO skills (name) VALUES (?)", [(n,) for n in names])
+    skill_ids = {}
+    for i in range(0, len(names), 500):
+        chunk = names[i:i + 500]
+        skill_ids.update(cursor.execute(
+            f"SELECT name, id FROM skills WHERE name IN ({', '.join('?' * len(chunk))})", chunk
+        ).fetchall())
+    cursor.executemany("DELETE FROM vacancy_skills WHERE vacancy_id = ?", [(vid,) for vid, _ in rows])
+    cursor.executemany("INSERT OR IGNORE INTO vacancy_skills (vacancy_id, skill_id) VALUES (?, ?)",
+                       [(vid, skill_ids[name]) for vid, skills in rows for name in skills])
+
+
+def save_description(cursor, vacancy_id, description):
+    """Записывает (заменяет) сжатое описание одной вакансии в vacancy_texts."""
+    codec, body, text_hash, length = compress_text(description)
+    cursor.execute('''
+        INSERT INTO vacancy_texts (vacancy_id, content_hash, codec, raw_length, body)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(vacancy_id) DO UPDATE SET
+            content_hash = excluded.content_hash,
+            codec = excluded.codec,
+            raw_length = excluded.raw_length,
+            body = excluded.body
+    ''', (vacancy_id, text_hash, codec, length, body))
+
+
+def unindex_vacancies(cursor, id_query, params=()):
+    """
+    Убирает вакансии из полнотекстового индекса vacancy_fts. Вызывать ДО изменения
+    заголовка/описания: FTS5 с внешним содержимым удаляет по старым значениям.
+    id_query - SELECT, возвращающий internal_id.
+    """
+    cursor.execute(f'''
+        INSERT INTO vacancy_fts (vacancy_fts, rowid, title, description)
+        SELECT 'delete', internal_id, title, description FROM vacancy_search_source
+        WHERE internal_id IN ({id_query})
+    ''', params)
+
+
+def index_vacancies(cursor, id_query, params=()):
+    """Добавляет вакансии в vacancy_fts (после записи заголовка/описания)."""
+    cursor.execute(f'''
+        INSERT INTO vacancy_fts (rowid, title, description)
+        SELECT internal_id, title, description FROM vacancy_search_source
+        WHERE internal_id IN ({id_query})
+    ''', params)
+
+
+def quote_search_terms(query):
+    """
+    Берет в кавычки слова запроса со спецсимволами FTS5 ("power-bi", "c++", "node.js"),
+    не трогая фразы в кавычках, операторы и префиксы колонок: 'power-bi title:junior'
+    -> '"power-bi" title:junior'. Для CLI, где такие запросы пишут без кавычек.
+    """
+    terms = []
+    for term in re.findall(r'"[^"]*"|\S+', query):
+        if not term.startswith('"') and re.search(r"[-+./#&@']", term):
+            column, sep, value = term.rpartition(":") if re.match(r"^\w+:", term) else ("", "", term)
+            term = f'{column}{sep}"{value.replace(chr(34), chr(34) * 2)}"'
+        terms.append(term)
+    return " ".join(terms)
+
+
+def create_staging(cursor):
+    """Создает (если нужно) и очищает временные таблицы пакетного UPSERT."""
+    cursor.execute('''
+        CREATE TEMP TABLE IF NOT EXISTS staging_vacancies (
+            seq INTEGER PRIMARY KEY,
+            signature TEXT, api_id TEXT, title TEXT, company TEXT, location TEXT, country_api TEXT,
+            salary_min REAL, salary_max REAL, salary_is_predicted INTEGER, created TEXT,
+            url TEXT, search_query TEXT, search_level TEXT, first_seen TEXT, last_seen TEXT, source TEXT,
+            needs_enrichment INTEGER, description_length INTEGER, city TEXT,
+            content_hash TEXT, codec TEXT, body BLOB
+        )
+    ''')
+    cursor.execute("CREATE TEMP TABLE IF NOT EXISTS staging_texts (seq INTEGER PRIMARY KEY, vacancy_id INTEGER)")
+    cursor.execute("DELETE FROM staging_vacancies")
+    cursor.execute("DELETE FROM staging_texts")
+
+
+def select_staged_texts(cursor):
+    """
+    Отмечает строки staging_vacancies, чье описание окажется в базе: первое самое длинное
+    для сигнатуры, если оно длиннее уже сохраненного (для новой вакансии - всегда); так же
+    работала построчная запись. vacancy_id заполнен только у уже существующих вакансий -
+    их нужно убрать из FTS. Вызывать до UPSERT.
+    """
+    cursor.execute('''
+        INSERT INTO staging_texts (seq, vacancy_id)
+        SELECT MIN(s.seq), v.internal_id FROM staging_vacancies s
+        JOIN (SELECT signature, MAX(description_length) AS max_len FROM staging_vacancies GROUP BY signature) b
+            ON b.signature = s.signature AND s.description_length = b.max_len
+        LEFT JOIN vacancies v ON v.signature = s.signature
+        WHERE v.internal_id IS NULL OR s.description_length > v.description_length
+        GROUP BY s.signature
+    ''')
+
+
+def write_staged_texts(cursor):
+    """После UPSERT: пишет отмеченные описания в vacancy_texts и обновляет FTS, очищает staging."""
+    unindex_vacancies(cursor, "SELECT vacancy_id FROM staging_texts WHERE vacancy_id IS NOT NULL")
+    cursor.execute('''
+        INSERT INTO vacancy_texts (vacancy_id, content_hash, codec, raw_length, body)
+        SELECT v.internal_id, s.content_hash, s.codec, s.description_length, s.body
+        FROM staging_texts w
+        JOIN staging_vacancies s ON s.seq = w.seq
+        JOIN vacancies v ON v.signature = s.signature
+        WHERE true
+        ON CONFLICT(vacancy_id) DO UPDATE SET
+            content_hash = excluded.content_hash,
+            codec = excluded.codec,
+            raw_length = excluded.raw_length,
+            body = excluded.body
+    ''')
+    index_vacancies(cursor, '''
+        SELECT v.internal_id FROM staging_texts w
+        JOIN staging_vacancies s ON s.seq = w.seq
+        JOIN vacancies v ON v.signature = s.signature
+    ''')
+    cursor.execute("DELETE FROM staging_vacancies")
+    cursor.execute("DELETE FROM staging_texts")
+
 
 class DatabaseManager:
     def __init__(self, db_path="data/jobs_database.sqlite"):
         self.db_path = db_path
         self._init_db()
+        # Агрегаты для дашбордов; таблицы и триггеры создаются после миграций vacancies
+        self.stats = MarketStats(db_path)
+        # Потоковое чтение с проекцией и фильтрами (вместо get_all_vacancies для анализа)
+        self.reader = VacancyReader(db_path)
 
     def _init_db(self):
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        with sqlite3.connect(self.db_path) as conn:
+        with get_connection(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS vacancies (
@@ -45,9 +199,172 @@ class DatabaseManager:
                 cursor.execute("ALTER TABLE vacancies ADD COLUMN translated_title TEXT")
             if 'extracted_skills' not in columns:
                 cursor.execute("ALTER TABLE vacancies ADD COLUMN extracted_skills TEXT")
+            if 'skills_hash' not in columns:
+                # Хэш описания и версия экстрактора, с которыми извлечены навыки:
+                # SkillExtractor.analyze_skills обрабатывает только строки с skills_version IS NULL
+                cursor.execute("ALTER TABLE vacancies ADD COLUMN skills_hash TEXT")
+                cursor.execute("ALTER TABLE vacancies ADD COLUMN skills_version TEXT")
             if 'is_active' not in columns:
                 cursor.execute("ALTER TABLE vacancies ADD COLUMN is_active INTEGER DEFAULT 1")
+            if 'needs_enrichment' not in columns:
+                # Хранимый флаг вместо length(description) в запросе: выборка для --enrich
+                # идет по частичному индексу, а не чтением всех описаний
+                cursor.execute("ALTER TABLE vacancies ADD COLUMN needs_enrichment INTEGER DEFAULT 0")
+                cursor.execute(f"UPDATE vacancies SET needs_enrichment = {needs_enrichment_sql('description', 'title')}")
+
+            # Описания живут в отдельной таблице в сжатом виде; в vacancies остается только длина
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS vacancy_texts (
+                    vacancy_id INTEGER PRIMARY KEY,
+                    content_hash TEXT,
+                    codec TEXT,
+                    raw_length INTEGER,
+                    body BLOB
+                )
+            ''')
+            if 'city' not in columns:
+                # Нормализованный город - ключ зарплатной статистики (MarketStats)
+                cursor.execute("ALTER TABLE vacancies ADD COLUMN city TEXT")
+                rows = cursor.execute("SELECT internal_id, location FROM vacancies").fetchall()
+                cursor.executemany("UPDATE vacancies SET city = ? WHERE internal_id = ?",
+                                   [(normalize_location(loc), vid) for vid, loc in rows])
+            if 'updated_at' not in columns:
+                # Время последнего изменения строки - водяной знак инкрементального экспорта (exporter.py)
+                cursor.execute("ALTER TABLE vacancies ADD COLUMN updated_at TEXT")
+                cursor.execute("UPDATE vacancies SET updated_at = COALESCE(last_seen, first_seen)")
+            # save_vacancies проставляет updated_at сам; остальные UPDATE (перевод, навыки, обогащение,
+            # закрытие) - через триггер. Рекурсивные триггеры выключены, WHEN отсекает повторный вызов
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_vacancies_touch AFTER UPDATE ON vacancies
+                WHEN NEW.updated_at IS OLD.updated_at
+                BEGIN
+                    UPDATE vacancies SET updated_at = datetime('now') WHERE internal_id = NEW.internal_id;
+                END
+            ''')
+            # Удаленные строки (слияние --resign, --reset): инкрементальный экспорт их не видит,
+            # поэтому ParquetExporter по этой таблице решает, что датасет нужно выгрузить заново
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS vacancy_deletions (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    internal_id INTEGER,
+                    deleted_at TEXT
+                )
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_vacancies_deleted AFTER DELETE ON vacancies
+                BEGIN
+                    INSERT INTO vacancy_deletions (internal_id, deleted_at) VALUES (OLD.internal_id, datetime('now'));
+                END
+            ''')
+            # Изменился вход извлечения навыков (заголовок или описание) - сбрасываем skills_version,
+            # и analyze_skills найдет строку по индексу idx_vacancies_skills_version, не пересчитывая
+            # ключи всей таблицы. Строки, где навыки еще не извлекались (NULL), не трогаем
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_vacancies_skills_title AFTER UPDATE OF title ON vacancies
+                WHEN OLD.title IS NOT NEW.title AND NEW.skills_version IS NOT NULL
+                BEGIN
+                    UPDATE vacancies SET skills_version = NULL WHERE internal_id = NEW.internal_id;
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_vacancy_texts_skills_insert AFTER INSERT ON vacancy_texts
+                BEGIN
+                    UPDATE vacancies SET skills_version = NULL
+                    WHERE internal_id = NEW.vacancy_id AND skills_version IS NOT NULL
+                      AND skills_hash IS NOT NEW.content_hash;
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS trg_vacancy_texts_skills_update AFTER UPDATE OF content_hash ON vacancy_texts
+                BEGIN
+                    UPDATE vacancies SET skills_version = NULL
+                    WHERE internal_id = NEW.vacancy_id AND skills_version IS NOT NULL
+                      AND skills_hash IS NOT NEW.content_hash;
+                END
+            ''')
+            if 'description_length' not in columns:
+                cursor.execute("ALTER TABLE vacancies ADD COLUMN description_length INTEGER DEFAULT 0")
+            # Перенос идет порциями со своим commit: после сбоя посередине колонка уже есть,
+            # поэтому продолжаем по оставшимся description, а не по наличию колонки
+            moved = self._move_descriptions(conn)
+
+            # Активные по last_seen: mark_stale_vacancies и загрузка SignatureIndex
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_vacancies_active_last_seen ON vacancies(last_seen)
+                WHERE is_active = 1
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_vacancies_enrich ON vacancies(last_seen)
+                WHERE needs_enrichment = 1 AND is_active = 1
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_vacancies_enrich_source ON vacancies(source, last_seen)
+                WHERE needs_enrichment = 1 AND is_active = 1
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_vacancies_untranslated ON vacancies(search_level)
+                WHERE translated_title IS NULL
+            ''')
+            # Инкрементальное извлечение навыков: NULL (новые / измененные) по internal_id
+            # и строки с чужой версией экстрактора
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_vacancies_skills_version ON vacancies(skills_version)")
             
+            # Навыки в нормализованном виде (пишет SkillExtractor); extracted_skills остается для ноутбука
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS skills (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT UNIQUE
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS vacancy_skills (
+                    vacancy_id INTEGER,
+                    skill_id INTEGER,
+                    PRIMARY KEY (vacancy_id, skill_id)
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_vacancy_skills_skill ON vacancy_skills(skill_id, vacancy_id)")
+            # Фильтры get_top_skills / VacancyReader: вакансии выбираются по индексу, их навыки - по PK
+            # vacancy_skills. Выборочные фильтры (AT, xing, Senior) в разы быстрее; фильтр почти по всей
+            # таблице (country=DE) немного медленнее обхода idx_vacancy_skills_skill, без фильтра - как раньше
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_vacancies_country ON vacancies(country_api, search_level)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_vacancies_level ON vacancies(search_level)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_vacancies_source ON vacancies(source, country_api)")
+            has_skills = cursor.execute("SELECT 1 FROM vacancy_skills LIMIT 1").fetchone()
+            if not has_skills:
+                # Перенос уже извлеченных навыков из строки extracted_skills (один раз)
+                rows = cursor.execute(
+                    "SELECT internal_id, extracted_skills FROM vacancies WHERE extracted_skills IS NOT NULL AND extracted_skills != ''"
+                ).fetchall()
+                if rows:
+                    save_vacancy_skills(cursor, [(vid, [x for x in skills.split(", ") if x]) for vid, skills in rows])
+
+            # Почти-дубликаты (near_dedup.py): MinHash-подписи и кластеры одной и той же вакансии
+            # с разными сигнатурами. unique_vacancies - по одной вакансии (самой ранней) на кластер
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS vacancy_minhash (
+                    vacancy_id INTEGER PRIMARY KEY,
+                    content_hash TEXT,
+                    params TEXT,
+                    minhash BLOB
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS vacancy_clusters (
+                    vacancy_id INTEGER PRIMARY KEY,
+                    cluster_id INTEGER,
+                    similarity REAL
+                )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_vacancy_clusters_cluster ON vacancy_clusters(cluster_id)")
+            cursor.execute('''
+                CREATE VIEW IF NOT EXISTS unique_vacancies AS
+                SELECT v.* FROM vacancies v
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM vacancy_clusters c WHERE c.vacancy_id = v.internal_id AND c.cluster_id != v.internal_id
+                )
+            ''')
+
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS salary_history (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -58,114 +375,298 @@ class DatabaseManager:
                     UNIQUE(country, role, month)
                 )
             ''')
+
+            # Полнотекстовый поиск по заголовкам и описаниям. Внешнее содержимое (view с распаковкой
+            # vacancy_text) - в индексе только токены, тексты второй раз не хранятся.
+            # Синхронизацию ведут save_vacancies и update_vacancy_fields (unindex/index_vacancies)
+            cursor.execute('''
+                CREATE VIEW IF NOT EXISTS vacancy_search_source AS
+                SELECT v.internal_id, v.title, vacancy_text(t.codec, t.body) AS description
+                FROM vacancies v LEFT JOIN vacancy_texts t ON t.vacancy_id = v.internal_id
+            ''')
+            has_fts = cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'vacancy_fts'").fetchone()
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS vacancy_fts USING fts5(
+                    title, description,
+                    content = 'vacancy_search_source', content_rowid = 'internal_id',
+                    tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+                )
+            ''')
+            if not has_fts:
+                print("  [DB] Building full-text index...")
+                cursor.execute("INSERT INTO vacancy_fts (vacancy_fts) VALUES ('rebuild')")
             conn.commit()
+        if moved:
+            # Освобождаем место, которое занимали несжатые описания
+            print("  [DB] VACUUM after moving descriptions...")
+            get_connection(self.db_path).execute("VACUUM")
+
+    def _move_descriptions(self, conn, chunk_size=5000):
+        """
+        Миграция vacancies.description -> vacancy_texts (сжато), description = NULL. Идемпотентна:
+        переносит только оставшиеся описания, так что прерванный перенос продолжается при следующем запуске.
+        """
+        if not conn.execute("SELECT 1 FROM vacancies WHERE description IS NOT NULL LIMIT 1").fetchone():
+            return 0
+        total = conn.execute("SELECT COUNT(*) FROM vacancies WHERE description IS NOT NULL").fetchone()[0]
+        # Индекс уже построен (перенос продолжается после сбоя) - переносимые строки переиндексируются
+        has_fts = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'vacancy_fts'").fetchone()
+        print(f"  [DB] Moving {total} descriptions to vacancy_texts...")
+        moved, last_id = 0, 0
+        while True:
+            rows = conn.execute('''
+                SELECT internal_id, description FROM vacancies
+                WHERE internal_id > ? AND description IS NOT NULL
+                ORDER BY internal_id LIMIT ?
+            ''', (last_id, chunk_size)).fetchall()
+            if not rows:
+                break
+            cursor = conn.cursor()
+            ids = f"SELECT internal_id FROM vacancies WHERE internal_id BETWEEN {rows[0][0]} AND {rows[-1][0]}"
+            if has_fts:
+                unindex_vacancies(cursor, ids)
+            for vacancy_id, description in rows:
+                save_description(cursor, vacancy_id, description)
+            cursor.executemany("UPDATE vacancies SET description_length = ?, description = NULL WHERE internal_id = ?",
+                               [(len(d), vid) for vid, d in rows])
+            if has_fts:
+                index_vacancies(cursor, ids)
+            conn.commit()
+            moved += len(rows)
+            last_id = rows[-1][0]
+            print(f"  [+] {moved}/{total}")
+        return moved
+
+    # Правила слияния при повторной встрече вакансии: зарплата не от Adzuna (реальная) важнее
+    # оценочной Adzuna, более длинное описание заменяет короткое (сам текст - в vacancy_texts)
+    VACANCY_COLUMNS = ("signature, api_id, title, company, location, country_api, salary_min, salary_max, "
+                       "salary_is_predicted, created, url, search_query, search_level, first_seen, last_seen, "
+                       "source, needs_enrichment, description_length, city")
+    STAGING_COLUMNS = VACANCY_COLUMNS + ", content_hash, codec, body"
+    UPSERT_SQL = '''
+        INSERT INTO vacancies ({columns})
+        {values}
+        ON CONFLICT(signature) DO UPDATE SET 
+            last_seen = excluded.last_seen,
+            is_active = 1,
+            url = COALESCE(excluded.url, vacancies.url),
+            salary_min = CASE 
+                WHEN excluded.salary_min IS NOT NULL AND (vacancies.salary_min IS NULL OR excluded.source != 'adzuna' OR vacancies.source = 'adzuna') 
+                THEN excluded.salary_min 
+                ELSE vacancies.salary_min 
+            END,
+            salary_max = CASE 
+                WHEN excluded.salary_max IS NOT NULL AND (vacancies.salary_max IS NULL OR excluded.source != 'adzuna' OR vacancies.source = 'adzuna') 
+                THEN excluded.salary_max 
+                ELSE vacancies.salary_max 
+            END,
+            salary_is_predicted = CASE 
+                WHEN excluded.salary_min IS NOT NULL AND (vacancies.salary_min IS NULL OR excluded.source != 'adzuna' OR vacancies.source = 'adzuna')
+                THEN excluded.salary_is_predicted 
+                ELSE vacancies.salary_is_predicted 
+            END,
+            description_length = CASE
+                WHEN excluded.description_length > vacancies.description_length THEN excluded.description_length
+                ELSE vacancies.description_length
+            END,
+            needs_enrichment = CASE
+                WHEN excluded.description_length > vacancies.description_length THEN excluded.needs_enrichment
+                ELSE vacancies.needs_enrichment
+            END,
+            source = CASE 
+                WHEN excluded.source != 'adzuna' OR vacancies.source = 'adzuna' THEN excluded.source 
+                ELSE vacancies.source 
+            END,
+            updated_at = excluded.updated_at
+    '''
+
+    def _job_row(self, job, today):
+        title, company, location = get_job_fields(job)
+        description = job.get('description') or ''
+        codec, body, text_hash, length = compress_text(description)
+        return (
+            get_job_signature(title, company, location),
+            str(job.get('api_id') or job.get('id')),
+            title,
+            company,
+            location,
+            job.get('country_search') or job.get('country_api', 'DE'),
+            job.get('salary_min'),
+            job.get('salary_max'),
+            1 if job.get('salary_is_predicted') else 0,
+            job.get('created'),
+            job.get('url') or job.get('redirect_url'),
+            job.get('search_query'),
+            job.get('search_level', 'General'),
+            today,
+            today,
+            job.get('source', 'unknown'),
+            needs_enrichment(description, title),
+            length,
+            normalize_location(location),
+            text_hash,
+            codec,
+            body
+        )
+
+    def _stage(self, cursor, rows):
+        """Кладет пачку во временные таблицы и отмечает строки, чье описание окажется в базе."""
+        create_staging(cursor)
+        cursor.executemany(
+            f"INSERT INTO staging_vacancies ({self.STAGING_COLUMNS}) VALUES ({', '.join('?' * len(rows[0]))})", rows
+        )
+        select_staged_texts(cursor)
 
     def save_vacancies(self, jobs):
+        """
+        Пакетный UPSERT: все вакансии пачки кладутся во временную таблицу одним executemany,
+        число новых считается одним запросом, слияние - одним INSERT ... SELECT ... ON CONFLICT.
+        Строки применяются в порядке пачки, поэтому дубликаты внутри пачки сливаются так же,
+        как при построчной записи. Сжатые описания пишутся в vacancy_texts.
+        Возвращает число новых вакансий (уникальных сигнатур).
+        """
         if not jobs:
             return 0
         
         today = datetime.now().strftime("%Y-%m-%d")
-        new_count = 0
-        
-        with sqlite3.connect(self.db_path) as conn:
+        rows = []
+        for job in jobs:
+            try:
+                rows.append(self._job_row(job, today))
+            except Exception as e:
+                print(f"  [!] Database error for {job.get('title')}: {e}")
+        if not rows:
+            return 0
+
+        with get_connection(self.db_path) as conn:
             cursor = conn.cursor()
-            for job in jobs:
-                try:
-                    title = job.get('title')
-                    # Company/Location might be dicts (from Adzuna) or strings (from others)
-                    company = job.get('company', {}).get('display_name') if isinstance(job.get('company'), dict) else job.get('company')
-                    location = job.get('location', {}).get('display_name') if isinstance(job.get('location'), dict) else job.get('location')
-                    
-                    signature = get_job_signature(title, company, location)
+            self._stage(cursor, rows)
 
-                    # Check existence for counting
-                    cursor.execute("SELECT source FROM vacancies WHERE signature = ?", (signature,))
-                    exists = cursor.fetchone()
+            new_count = cursor.execute('''
+                SELECT COUNT(DISTINCT s.signature) FROM staging_vacancies s
+                WHERE NOT EXISTS (SELECT 1 FROM vacancies v WHERE v.signature = s.signature)
+            ''').fetchone()[0]
 
-                    cursor.execute('''
-                        INSERT INTO vacancies (signature, api_id, title, company, location, country_api, 
-                                              salary_min, salary_max, salary_is_predicted, description, created, 
-                                              url, search_query, search_level, first_seen, last_seen, source)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        ON CONFLICT(signature) DO UPDATE SET 
-                            last_seen = excluded.last_seen,
-                            is_active = 1,
-                            url = COALESCE(excluded.url, vacancies.url),
-                            salary_min = CASE 
-                                WHEN excluded.salary_min IS NOT NULL AND (vacancies.salary_min IS NULL OR excluded.source != 'adzuna' OR vacancies.source = 'adzuna') 
-                                THEN excluded.salary_min 
-                                ELSE vacancies.salary_min 
-                            END,
-                            salary_max = CASE 
-                                WHEN excluded.salary_max IS NOT NULL AND (vacancies.salary_max IS NULL OR excluded.source != 'adzuna' OR vacancies.source = 'adzuna') 
-                                THEN excluded.salary_max 
-                                ELSE vacancies.salary_max 
-                            END,
-                            salary_is_predicted = CASE 
-                                WHEN excluded.salary_min IS NOT NULL AND (vacancies.salary_min IS NULL OR excluded.source != 'adzuna' OR vacancies.source = 'adzuna')
-                                THEN excluded.salary_is_predicted 
-                                ELSE vacancies.salary_is_predicted 
-                            END,
-                            description = CASE
-                                WHEN length(excluded.description) > length(vacancies.description) THEN excluded.description
-                                ELSE vacancies.description
-                            END,
-                            source = CASE 
-                                WHEN excluded.source != 'adzuna' OR vacancies.source = 'adzuna' THEN excluded.source 
-                                ELSE vacancies.source 
-                            END
-                    ''', (
-                        signature,
-                        str(job.get('api_id') or job.get('id')),
-                        title,
-                        company,
-                        location,
-                        job.get('country_search') or job.get('country_api', 'DE'),
-                        job.get('salary_min'),
-                        job.get('salary_max'),
-                        1 if job.get('salary_is_predicted') else 0,
-                        job.get('description', ''),
-                        job.get('created'),
-                        job.get('url') or job.get('redirect_url'),
-                        job.get('search_query'),
-                        job.get('search_level', 'General'),
-                        today,
-                        today,
-                        job.get('source', 'unknown')
-                    ))
-                    if not exists:
-                        new_count += 1
-                except Exception as e:
-                    print(f"  [!] Database error for {job.get('title')}: {e}")
+            columns = self.VACANCY_COLUMNS + ", updated_at"
+            select = f"SELECT {self.VACANCY_COLUMNS}, datetime('now') FROM staging_vacancies WHERE {{where}} ORDER BY seq"
+            try:
+                # WHERE нужен, чтобы парсер SQLite не принял ON CONFLICT за часть SELECT
+                cursor.execute(self.UPSERT_SQL.format(columns=columns, values=select.format(where="true")))
+            except sqlite3.Error as e:
+                # Пачка целиком не прошла - применяем построчно, чтобы потерять только битые строки
+                print(f"  [!] Bulk upsert failed ({e}), falling back to row-by-row")
+                conn.rollback()
+                self._stage(cursor, rows)
+                for seq, row in enumerate(rows, start=1):
+                    try:
+                        cursor.execute(self.UPSERT_SQL.format(columns=columns, values=select.format(where="seq = ?")),
+                                       (seq,))
+                    except sqlite3.Error as row_error:
+                        print(f"  [!] Database error for {row[2]}: {row_error}")
+
+            write_staged_texts(cursor)
             conn.commit()
             
         return new_count
 
-    def mark_stale_vacancies(self, threshold_days=7):
-        """Marks active vacancies as inactive if they haven't been seen for X days."""
-        with sqlite3.connect(self.db_path) as conn:
+    def mark_stale_vacancies(self, threshold_days=7, keep_scopes=None, keep_max_days=30):
+        """
+        Marks active vacancies as inactive if they haven't been seen for X days.
+        keep_scopes - пары (source, country_api), где скрапинг остановил пагинацию рано
+        (SignatureIndex.cut_scopes): их вакансии закрываются только через keep_max_days.
+        """
+        query = '''
+            UPDATE vacancies
+            SET is_active = 0
+            WHERE is_active = 1
+            AND last_seen < datetime('now', ?)
+        '''
+        params = [f"-{threshold_days} days"]
+        scopes = sorted(s for s in (keep_scopes or ()) if s[0] and s[1])
+        if scopes:
+            query += f'''
+            AND NOT (last_seen >= datetime('now', ?)
+                     AND (source, country_api) IN (VALUES {", ".join("(?, ?)" for _ in scopes)}))
+            '''
+            params.append(f"-{keep_max_days} days")
+            params.extend(v for scope in scopes for v in scope)
+        with get_connection(self.db_path) as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                UPDATE vacancies 
-                SET is_active = 0 
-                WHERE is_active = 1 
-                AND (julianday('now') - julianday(last_seen)) > ?
-            ''', (threshold_days,))
+            cursor.execute(query, params)
             count = cursor.rowcount
             conn.commit()
         if count > 0:
             print(f"  [DB] {count} вакансий помечены как закрытые (не актуальны более {threshold_days} дн.)")
         return count
 
-    def get_all_vacancies(self):
+    def get_all_vacancies(self, include_description=False):
+        """
+        Все вакансии без текстов описаний (они нужны редко и занимают большую часть базы).
+        include_description=True добавляет колонку description, распакованную из vacancy_texts.
+        """
         import pandas as pd
-        with sqlite3.connect(self.db_path) as conn:
-            return pd.read_sql_query("SELECT * FROM vacancies", conn)
+        with get_connection(self.db_path) as conn:
+            columns = [c[1] for c in conn.execute("PRAGMA table_info(vacancies)") if c[1] != 'description']
+            select = ", ".join(f"v.{c}" for c in columns)
+            if include_description:
+                return pd.read_sql_query(f'''
+                    SELECT {select}, vacancy_text(t.codec, t.body) AS description
+                    FROM vacancies v LEFT JOIN vacancy_texts t ON t.vacancy_id = v.internal_id
+                ''', conn)
+            return pd.read_sql_query(f"SELECT {select} FROM vacancies v", conn)
+
+    def search_vacancies(self, query, country=None, level=None, source=None, active_only=True, limit=50):
+        """
+        Полнотекстовый поиск (FTS5) по заголовкам и описаниям, сортировка по BM25
+        (совпадение в заголовке весит больше). Синтаксис запроса FTS5:
+            'dbt snowflake'           - оба слова (AND по умолчанию)
+            '"data engineer" OR mlops' - фраза / альтернатива
+            'snowfl*'                 - префикс
+            'title: junior AND dbt'   - поиск только по заголовку
+        """
+        import pandas as pd
+        sql = '''
+            SELECT v.internal_id, v.title, v.company, v.location, v.country_api, v.search_level,
+                   v.salary_min, v.salary_max, v.source, v.url, v.is_active, v.last_seen,
+                   snippet(vacancy_fts, 1, '[', ']', '...', 12) AS snippet,
+                   bm25(vacancy_fts, 5.0, 1.0) AS rank
+            FROM vacancy_fts
+            JOIN vacancies v ON v.internal_id = vacancy_fts.rowid
+            WHERE vacancy_fts MATCH ?
+        '''
+        params = [query]
+        if country:
+            sql += " AND v.country_api = ?"
+            params.append(country.upper())
+        if level:
+            sql += " AND v.search_level = ?"
+            params.append(level)
+        if source:
+            sql += " AND v.source = ?"
+            params.append(source)
+        if active_only:
+            sql += " AND v.is_active = 1"
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+
+        with get_connection(self.db_path) as conn:
+            try:
+                return pd.read_sql_query(sql, conn, params=params)
+            except pd.errors.DatabaseError as e:
+                # Синтаксис FTS5: дефисы и спецсимволы нужно брать в кавычки ("power-bi", "c++")
+                raise ValueError(f"Invalid search query {query!r}: {e.__cause__ or e}") from e
+
+    def rebuild_search_index(self):
+        """Перестраивает vacancy_fts целиком (после записи в базу в обход DatabaseManager)."""
+        with get_connection(self.db_path) as conn:
+            conn.execute("INSERT INTO vacancy_fts (vacancy_fts) VALUES ('rebuild')")
+            conn.commit()
+
     def save_salary_history(self, country, role, history_data):
         if not history_data:
             return
         
-        with sqlite3.connect(self.db_path) as conn:
+        with get_connection(self.db_path) as conn:
             cursor = conn.cursor()
             for month, avg_salary in history_data.items():
                 try:
@@ -192,15 +693,23 @@ class DatabaseManager:
         
         query += " ORDER BY month ASC"
         
-        with sqlite3.connect(self.db_path) as conn:
+        with get_connection(self.db_path) as conn:
             return pd.read_sql_query(query, conn, params=params)
 
     def clear_all_data(self):
         """Полная очистка всех таблиц в базе данных."""
-        with sqlite3.connect(self.db_path) as conn:
+        with get_connection(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM vacancies")
+            cursor.execute("DELETE FROM vacancy_texts")
+            cursor.execute("INSERT INTO vacancy_fts (vacancy_fts) VALUES ('delete-all')")
+            cursor.execute("DELETE FROM vacancy_skills")
+            cursor.execute("DELETE FROM skills")
             cursor.execute("DELETE FROM salary_history")
+            cursor.execute("DELETE FROM vacancy_minhash")
+            cursor.execute("DELETE FROM vacancy_clusters")
+            for table in ("stats_active", "stats_daily_active", "stats_salary", "stats_skills_monthly"):
+                cursor.execute(f"DELETE FROM {table}")
             # Сбрасываем автоинкремент
             cursor.execute("DELETE FROM sqlite_sequence WHERE name IN ('vacancies', 'salary_history')")
             conn.commit()
@@ -0,0 +1,78 @@
+import os
+import sqlite3
+import threading
+import configparser
+from text_store import decompress_text
+
+# Одно долгоживущее соединение на (поток, файл базы) вместо sqlite3.connect на каждую операцию.
+# WAL позволяет ноутбуку читать базу, пока пайплайн пишет; synchronous=NORMAL в WAL
+# не делает fsync на каждый commit (только на checkpoint), целостность при этом сохраняется.
+#
+# Описания хранятся сжатыми (vacancy_texts), и представление vacancy_search_source - источник
+# содержимого vacancy_fts - распаковывает их функцией vacancy_text(), которая есть только
+# в соединениях get_connection. В голом sqlite3.connect (скрипты, ноутбук, DB Browser)
+# SELECT из vacancy_search_source и чтение колонок vacancy_fts (title, description, snippet())
+# падают с "no such function: vacancy_text"; запросы к самим vacancies работают как раньше.
+# Для описаний и полнотекстового поиска открывайте базу через get_connection / VacancyReader.
+
+_local = threading.local()
+_settings = None
+
+
+def _load_settings():
+    global _settings
+    if _settings is None:
+        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        config = configparser.ConfigParser()
+        config.read(os.path.join(base_dir, 'settings.ini'), encoding='utf-8')
+        _settings = {
+            "journal_mode": config.get('Database', 'journal_mode', fallback='WAL'),
+            "synchronous": config.get('Database', 'synchronous', fallback='NORMAL'),
+            "cache_size_mb": config.getint('Database', 'cache_size_mb', fallback=64),
+            "mmap_size_mb": config.getint('Database', 'mmap_size_mb', fallback=256),
+            "busy_timeout_ms": config.getint('Database', 'busy_timeout_ms', fallback=30000),
+        }
+    return _settings
+
+
+def _open(db_path):
+    settings = _load_settings()
+    conn = sqlite3.connect(db_path, timeout=settings["busy_timeout_ms"] / 1000)
+    conn.execute(f"PRAGMA journal_mode = {settings['journal_mode']}")
+    conn.execute(f"PRAGMA synchronous = {settings['synchronous']}")
+    # Отрицательное значение cache_size - размер в КБ, а не в страницах
+    conn.execute(f"PRAGMA cache_size = -{settings['cache_size_mb'] * 1024}")
+    conn.execute(f"PRAGMA mmap_size = {settings['mmap_size_mb'] * 1024 * 1024}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute(f"PRAGMA busy_timeout = {settings['busy_timeout_ms']}")
+    # Прозрачное чтение сжатых описаний: SELECT vacancy_text(t.codec, t.body) FROM vacancy_texts t
+    conn.create_function("vacancy_text", 2, decompress_text, deterministic=True)
+    return conn
+
+
+def get_connection(db_path):
+    """
+    Соединение текущего потока с базой `db_path` (создается при первом обращении).
+    Использовать как `with get_connection(path) as conn:` - блок завершает транзакцию
+    (commit/rollback), но соединение не закрывает. Закрывать его вручную не нужно.
+    """
+    # После fork (пул процессов) унаследованные соединения использовать нельзя
+    if getattr(_local, "pid", None) != os.getpid():
+        _local.pid = os.getpid()
+        _local.connections = {}
+    key = os.path.abspath(db_path)
+    conn = _local.connections.get(key)
+    if conn is None:
+        conn = _open(db_path)
+        _local.connections[key] = conn
+    return conn
+
+
+def close_connections():
+    """Закрывает соединения текущего потока (например, перед удалением или копированием файла базы)."""
+    for conn in getattr(_local, "connections", {}).values():
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    _local.connections = {}
@@ -1,10 +1,13 @@
-import sqlite3
-import requests
-from bs4 import BeautifulSoup
+from db_connection import get_connection
+from database_manager import needs_enrichment, save_description, unindex_vacancies, index_vacancies
 import time
 import random
 import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from scrapers.http_client import get_http_client
+from instrumentation import METRICS
+from html_parsing import (get_parse_pool, get_parser_backend, make_soup,
+                          parse_json_ld, parse_description_page)
 
 class DescriptionManager:
     def __init__(self, db_path="data/jobs_database.sqlite"):
@@ -23,6 +26,7 @@ class DescriptionManager:
             "https://www.adzuna.de/",
             "https://www.stepstone.de/"
         ]
+        self.client = get_http_client()
 
     def get_headers(self, url=None):
         ua = random.choice(self.user_agents)
@@ -44,14 +48,13 @@ class DescriptionManager:
 
     def get_pending_vacancies(self, limit=100, source=None):
         # Ищем вакансии, где описание слишком короткое (< 600 символов) 
-        # или совпадает с заголовком (что часто бывает у агрегаторов)
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        # или совпадает с заголовком (что часто бывает у агрегаторов).
+        # Флаг needs_enrichment поддерживается при записи, выборка идет по частичному индексу.
+        cursor = get_connection(self.db_path).cursor()
         
         query = '''
             SELECT signature, url, source, title FROM vacancies 
-            WHERE (length(description) < 600 OR description = title)
-            AND is_active = 1
+            WHERE needs_enrichment = 1 AND is_active = 1
         '''
         params = []
         if source:
@@ -62,82 +65,40 @@ class DescriptionManager:
         params.append(limit)
         
         cursor.execute(query, tuple(params))
-        rows = cursor.fetchall()
-        conn.close()
-        return rows
+        return cursor.fetchall()
 
     def scrape_json_ld(self, html):
         """
         Универсальный помощник для извлечения данных из JSON-LD.
         Возвращает словарь с найденными полями.
         """
-        results = {"description": None, "salary_min": None, "salary_max": None}
         try:
-            soup = BeautifulSoup(html, 'html.parser')
-            scripts = soup.find_all('script', type='application/ld+json')
-            for script in scripts:
-                try:
-                    import json
-                    data = json.loads(script.string)
-                    items = data if isinstance(data, list) else [data]
-                    for item in items:
-                        if isinstance(item, dict) and item.get('@type') == 'JobPosting':
-                            # 1. Описание
-                            if 'description' in item:
-                                content_html = item['description']
-                                clean_soup = BeautifulSoup(content_html, 'html.parser')
-                                results["description"] = clean_soup.get_text(" ", strip=True)
-                            
-                            # 2. Зарплата (baseSalary)
-                            salary = item.get('baseSalary')
-                            if isinstance(salary, dict):
-                                value = salary.get('value')
-                                if isinstance(value, dict):
-                                    results["salary_min"] = value.get('minValue') or value.get('value')
-                                    results["salary_max"] = value.get('maxValue') or value.get('value')
-                            
-                            # Если нашли главные данные, можно выходить (обычно JobPosting один на странице)
-                            if results["description"]:
-                                return results
-                except:
-                    continue
+            return parse_json_ld(make_soup(html))
         except:
-            pass
-        return results if results["description"] else None
+            return None
 
     def scrape_stepstone(self, html):
         """
         Извлекает данные вакансии с сайта StepStone.
         """
-        # 1. Сначала пробуем JSON-LD
-        data = self.scrape_json_ld(html)
-        if data: return data
+        return parse_description_page(html, "", site="stepstone")
 
-        # 2. Fallback: Старые CSS селекторы (только для описания)
-        try:
-            soup = BeautifulSoup(html, 'html.parser')
-            content = soup.find('div', class_=lambda x: x and 'JobDescription' in x)
-            if not content:
-                content = soup.find('div', class_='js-app-ld-ContentBlock')
-            
-            if content:
-                return {"description": content.get_text(" ", strip=True), "salary_min": None, "salary_max": None}
-        except:
-            pass
-        return None
+    def _get(self, url, session=None):
+        # По умолчанию - общий пул keep-alive соединений (rate limiter клиент применяет сам)
+        if session is None:
+            return self.client.get(url, headers=self.get_headers(url), timeout=15, allow_redirects=True,
+                                   cache_source="descriptions")
+        self.client.limiter.acquire(url)
+        return session.get(url, headers=self.get_headers(url), timeout=15, allow_redirects=True)
 
     def scrape_adzuna_redirect(self, url, session=None):
         try:
-            # Используем общую сессию, если передана, иначе создаем новую
-            if session is None:
-                session = requests.Session()
-                
-            res = session.get(url, headers=self.get_headers(url), timeout=15, allow_redirects=True)
+            res = self._get(url, session)
             
             # Если словили 403, пробуем еще разок через паузу с другим UA
             if res.status_code == 403:
                 time.sleep(random.uniform(2, 5))
-                res = session.get(url, headers=self.get_headers(url), timeout=15, allow_redirects=True)
+                res = self._get(url, session)
 
             if res.status_code == 403:
                 return res.url, "ERR_403"
@@ -147,6 +108,9 @@ class DescriptionManager:
             # Проверка на капчу в тексте
             text_low = res.text.lower()
             if any(marker in text_low for marker in ["captcha", "blocked", "suspicious behavior", "verdächtiges verhalten"]):
+                # Страницу блокировки не держим в кэше, иначе она будет отдаваться и дальше
+                if self.client.cache is not None:
+                    self.client.cache.invalidate(url)
                 return res.url, "ERR_403"
                 
             return res.url, res.text
@@ -174,87 +138,73 @@ class DescriptionManager:
         if any(marker in desc.lower() for marker in garbage_markers):
             return False
 
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Обновляем описание, если оно длиннее текущего
-        cursor.execute('''
-            UPDATE vacancies SET 
-                description = CASE 
-                    WHEN length(?) > length(description) THEN ? 
-                    ELSE description 
-                END,
-                salary_min = COALESCE(salary_min, ?),
-                salary_max = COALESCE(salary_max, ?)
-            WHERE signature = ?
-        ''', (desc, desc, s_min, s_max, signature))
-        
-        updated = cursor.rowcount > 0
-        conn.commit()
-        conn.close()
-        return updated
+        with get_connection(self.db_path) as conn:
+            row = conn.execute("SELECT internal_id, description_length, title FROM vacancies WHERE signature = ?",
+                               (signature,)).fetchone()
+            if not row:
+                return False
+            vacancy_id, current_length, title = row
+            # Обновляем описание, если оно длиннее текущего
+            if len(desc) > (current_length or 0):
+                cursor = conn.cursor()
+                unindex_vacancies(cursor, "?", (vacancy_id,))
+                save_description(cursor, vacancy_id, desc)
+                index_vacancies(cursor, "?", (vacancy_id,))
+                conn.execute("UPDATE vacancies SET description_length = ?, needs_enrichment = ? WHERE internal_id = ?",
+                             (len(desc), needs_enrichment(desc, title), vacancy_id))
+            conn.execute('''
+                UPDATE vacancies SET 
+                    salary_min = COALESCE(salary_min, ?),
+                    salary_max = COALESCE(salary_max, ?)
+                WHERE internal_id = ?
+            ''', (s_min, s_max, vacancy_id))
+        return True
 
     def scrape_xing(self, html):
-        # 1. Пробуем JSON-LD
-        data = self.scrape_json_ld(html)
-        if data: return data
-
-        # 2. Fallback: Селекторы
-        soup = BeautifulSoup(html, 'html.parser')
-        content = soup.find('div', class_=re.compile(r'job-description|description'))
-        if not content:
-            content = soup.find('main')
-        
-        if content:
-            return {"description": content.get_text(" ", strip=True), "salary_min": None, "salary_max": None}
-        return None
+        return parse_description_page(html, "", site="xing")
 
     def scrape_arbeitsagentur(self, html):
         """
         Извлекает описание с сайта Arbeitsagentur (обычно через JSON-LD).
         """
-        return self.scrape_json_ld(html)
+        return parse_description_page(html, "", site="arbeitsagentur")
 
-    def _process_one(self, row, session):
+    def _fetch_one(self, row, session=None):
+        """Стадия 1 (поток): только сеть. Возвращает (status, final_url, html)."""
         sig, url, source, title = row
         try:
-            # Рандомная пауза перед запросом, чтобы не "долбить" сервер
-            time.sleep(random.uniform(1.0, 4.0))
+            # Паузу между запросами к одному хосту теперь выдерживает общий rate limiter
             final_url, html = self.scrape_adzuna_redirect(url, session=session)
             
-            if html == "ERR_403": return "403_forbidden"
-            if html == "ERR_404": return "404_not_found"
-            if not html: return "connection_error"
-            
-            data = None
-            if 'stepstone.de' in final_url:
-                data = self.scrape_stepstone(html)
-            elif 'xing.com' in final_url:
-                data = self.scrape_xing(html)
-            elif 'arbeitsagentur.de' in final_url:
-                data = self.scrape_arbeitsagentur(html)
-            else:
-                data = self.scrape_json_ld(html)
-                if not data:
-                    soup = BeautifulSoup(html, 'html.parser')
-                    for tag in ['script', 'style', 'nav', 'footer', 'header', 'aside']:
-                        for match in soup.find_all(tag): match.decompose()
-                    paragraphs = soup.find_all(['p', 'div', 'li'])
-                    text_blocks = [p.get_text(" ", strip=True) for p in paragraphs if len(p.get_text()) > 100]
-                    desc = "\n".join(text_blocks)
-                    if desc:
-                        data = {"description": desc, "salary_min": None, "salary_max": None}
-            
-            if not data or not data.get('description'):
-                return "parsing_failed"
-                
-            if len(data['description']) < 500:
-                return "too_short"
+            if html == "ERR_403": return "403_forbidden", final_url, None
+            if html == "ERR_404": return "404_not_found", final_url, None
+            if not html: return "connection_error", final_url, None
+            return "fetched", final_url, html
+        except Exception as e:
+            return f"error_{type(e).__name__}", url, None
 
-            if self.update_vacancy_fields(sig, data):
-                return "ok"
+    def _apply_parsed(self, row, data):
+        """Стадия 3 (главный поток): проверка результата разбора и запись в БД."""
+        sig = row[0]
+        if not data or not data.get('description'):
+            return "parsing_failed"
             
-            return "ok_no_change" 
+        if len(data['description']) < 500:
+            return "too_short"
+
+        if self.update_vacancy_fields(sig, data):
+            METRICS.record_rows(row[2] or "unknown", updated=1)
+            return "ok"
+        
+        return "ok_no_change" 
+
+    def _process_one(self, row, session=None):
+        """Последовательная версия всех трех стадий (для отладки одной вакансии)."""
+        status, final_url, html = self._fetch_one(row, session)
+        if status != "fetched":
+            return status
+        try:
+            return self._apply_parsed(row, parse_description_page(html, final_url))
         except Exception as e:
             return f"error_{type(e).__name__}"
 
@@ -265,7 +215,9 @@ class DescriptionManager:
             print(f"[Desc] Нет вакансий для обогащения{f' ({source})' if source else ''}.")
             return 0
             
-        print(f"[Desc] Обработка {total_pending} вакансий в {max_workers} потоках{f' ({source})' if source else ''}...")
+        parser = get_parse_pool()
+        print(f"[Desc] Обработка {total_pending} вакансий в {max_workers} потоках "
+              f"(разбор HTML: {parser.workers or 'inline'} процессов, {get_parser_backend()}){f' ({source})' if source else ''}...")
         
         stats = {
             "ok": 0, "ok_no_change": 0, "403_forbidden": 0, "404_not_found": 0, 
@@ -275,12 +227,27 @@ class DescriptionManager:
         last_reported = 0
         consecutive_403 = 0
         
-        # Используем одну сессию на все запросы (более экономно)
-        with requests.Session() as session:
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                future_to_url = {executor.submit(self._process_one, row, session): row for row in pending}
-                for future in as_completed(future_to_url):
-                    res = future.result()
+        # Конвейер: потоки качают страницы (сеть), пул процессов разбирает HTML (CPU),
+        # главный поток пишет в БД. Все запросы идут через общий HttpClient.
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            fetching = {executor.submit(self._fetch_one, row): row for row in pending}
+            parsing = {}
+            stop = False
+            while (fetching or parsing) and not stop:
+                done, _ = wait(list(fetching) + list(parsing), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in fetching:
+                        row = fetching.pop(future)
+                        res, final_url, html = future.result()
+                        if res == "fetched":
+                            parsing[parser.submit(parse_description_page, html, final_url)] = row
+                            continue
+                    else:
+                        row = parsing.pop(future)
+                        try:
+                            res = self._apply_parsed(row, future.result())
+                        except Exception as e:
+                            res = f"error_{type(e).__name__}"
                     
                     if res == "403_forbidden":
                         consecutive_403 += 1
@@ -298,6 +265,8 @@ class DescriptionManager:
                     # Если получаем слишком много 403 подряд, останавливаемся
                     if consecutive_403 > 15:
                         print("\n[!] Обнаружена массовая блокировка (403). Останавливаем процесс...")
+                        for f in fetching: f.cancel()
+                        stop = True
                         break
 
                     # Печатаем прогресс каждые 20 штук
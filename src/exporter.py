@@ -0,0 +1,177 @@
+import os
+import json
+import shutil
+from datetime import datetime
+from db_connection import get_connection
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+# Типы колонок SQLite -> Arrow (все, что не INTEGER/REAL, пишется строкой)
+_ARROW_TYPES = {"INTEGER": "int64", "REAL": "float64", "BLOB": "binary"}
+STATE_FILE = "_export_state.json"
+
+
+class ParquetExporter:
+    """
+    Экспорт vacancies в Parquet-датасет, разбитый по стране и месяцу first_seen:
+
+        exports/parquet/country=DE/month=2026-10/part-20261017T120000123456.parquet
+
+    Строки читаются из SQLite порциями (chunk_size) и сразу дописываются в файл своей
+    партиции, поэтому память не зависит от размера базы. Инкрементальный режим выгружает
+    только строки с updated_at не раньше водяного знака прошлого экспорта (хранится в
+    _export_state.json рядом с данными); измененная вакансия попадает в новый part-файл,
+    поэтому при чтении берется последняя версия по internal_id (см. read_export).
+    Удаления (vacancy_deletions: слияние --resign, --reset) так не выразить - если с прошлого
+    экспорта строки удалялись, датасет выгружается заново целиком.
+    """
+
+    # По умолчанию - все колонки, кроме текста описания (его можно запросить явно: "description")
+    DEFAULT_EXCLUDE = ("description",)
+    KEY_COLUMNS = ("internal_id", "updated_at")
+
+    def __init__(self, db_path="data/jobs_database.sqlite", export_dir="exports/parquet",
+                 compression="zstd", chunk_size=50_000):
+        if pa is None:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+        self.db_path = db_path
+        self.export_dir = export_dir
+        self.compression = compression
+        self.chunk_size = chunk_size
+
+    def _table_columns(self, conn):
+        return {c[1]: (c[2] or "TEXT").upper() for c in conn.execute("PRAGMA table_info(vacancies)")}
+
+    def _resolve_columns(self, conn, columns):
+        available = self._table_columns(conn)
+        if columns is None:
+            selected = [c for c in available if c not in self.DEFAULT_EXCLUDE]
+        else:
+            unknown = [c for c in columns if c not in available]
+            if unknown:
+                raise ValueError(f"Unknown columns for export: {', '.join(unknown)}")
+            selected = [c for c in self.KEY_COLUMNS if c not in columns] + list(columns)
+        schema = pa.schema([(c, _ARROW_TYPES.get(available[c], "string")) for c in selected])
+        return selected, schema
+
+    def _load_state(self):
+        path = os.path.join(self.export_dir, STATE_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_state(self, state):
+        with open(os.path.join(self.export_dir, STATE_FILE), "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2)
+
+    def _clear_dataset(self):
+        """Удаляет партиции прошлых экспортов (только country=*/ и файл состояния)."""
+        if not os.path.isdir(self.export_dir):
+            return
+        for name in os.listdir(self.export_dir):
+            path = os.path.join(self.export_dir, name)
+            if name.startswith("country=") and os.path.isdir(path):
+                shutil.rmtree(path)
+            elif name == STATE_FILE:
+                os.remove(path)
+
+    def export(self, columns=None, full=False):
+        """
+        Выгружает вакансии. full=True пересоздает датасет целиком, иначе - только изменения
+        с прошлого экспорта (первый запуск всегда полный). columns - проекция (список колонок
+        vacancies, "description" - распакованный текст). Возвращает {"rows", "files", "watermark"}.
+        """
+        run_id = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+        writers = {}
+        rows_total = 0
+        with get_connection(self.db_path) as conn:
+            selected, schema = self._resolve_columns(conn, columns)
+            state = {} if full else self._load_state()
+            # Другой набор колонок - part-файлы датасета разошлись бы по схеме, выгружаем заново
+            since = state.get("watermark") if state.get("columns") == selected else None
+            # Номер последнего удаления фиксируется вместе с водяным знаком (AUTOINCREMENT не переиспользуется)
+            deletions = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM vacancy_deletions").fetchone()[0]
+            if since and deletions > state.get("deletions_seen", 0):
+                print(f"  [~] Vacancies were deleted since {since}: re-exporting the full dataset")
+                since = None
+            if since is None:
+                self._clear_dataset()
+            os.makedirs(self.export_dir, exist_ok=True)
+            # Водяной знак фиксируется до чтения: строки, измененные во время экспорта, попадут в следующий
+            watermark = conn.execute("SELECT datetime('now')").fetchone()[0]
+            select = ", ".join(
+                "vacancy_text(t.codec, t.body) AS description" if c == "description" else f"v.{c}" for c in selected
+            )
+            join = "LEFT JOIN vacancy_texts t ON t.vacancy_id = v.internal_id" if "description" in selected else ""
+            sql = f'''
+                SELECT COALESCE(v.country_api, 'unknown'), COALESCE(substr(v.first_seen, 1, 7), 'unknown'), {select}
+                FROM vacancies v {join}
+                {"WHERE v.updated_at >= ?" if since else ""}
+            '''
+            cursor = conn.execute(sql, (since,) if since else ())
+            try:
+                while True:
+                    chunk = cursor.fetchmany(self.chunk_size)
+                    if not chunk:
+                        break
+                    partitions = {}
+                    for row in chunk:
+                        partitions.setdefault((row[0], row[1]), []).append(row[2:])
+                    for key, rows in partitions.items():
+                        writer = writers.get(key)
+                        if writer is None:
+                            folder = os.path.join(self.export_dir, f"country={key[0]}", f"month={key[1]}")
+                            os.makedirs(folder, exist_ok=True)
+                            writer = pq.ParquetWriter(os.path.join(folder, f"part-{run_id}.parquet"), schema,
+                                                      compression=self.compression)
+                            writers[key] = writer
+                        # Построчно -> по колонкам: Arrow-массивы строятся по одной колонке
+                        arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+                        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                    rows_total += len(chunk)
+            finally:
+                for writer in writers.values():
+                    writer.close()
+            # Эти удаления учтены выгрузкой
+            conn.execute("DELETE FROM vacancy_deletions WHERE seq <= ?", (deletions,))
+            conn.commit()
+
+        self._save_state({
+            "watermark": watermark,
+            "exported_at": run_id,
+            "rows": rows_total,
+            "files": len(writers),
+            "columns": selected,
+            "deletions_seen": deletions,
+            "compression": self.compression,
+        })
+        mode = f"changes since {since}" if since else "full"
+        print(f"  [+] Exported {rows_total} rows ({mode}) into {len(writers)} files in {self.export_dir}")
+        return {"rows": rows_total, "files": len(writers), "watermark": watermark}
+
+
+def read_export(export_dir="exports/parquet", columns=None, filters=None):
+    """
+    Читает датасет в DataFrame: только нужные колонки и партиции (filters в формате pyarrow,
+    например [("country", "=", "DE"), ("month", ">=", "2026-01")]). Из нескольких версий
+    одной вакансии (инкрементальные part-файлы) остается последняя по updated_at.
+    """
+    if pa is None:
+        raise RuntimeError("Reading the Parquet export requires pyarrow (pip install pyarrow)")
+    import pyarrow.dataset as ds
+    if columns is not None:
+        columns = list(dict.fromkeys(list(ParquetExporter.KEY_COLUMNS) + list(columns)))
+    dataset = ds.dataset(export_dir, format="parquet", partitioning="hive")
+    expression = pq.filters_to_expression(filters) if filters else None
+    df = dataset.to_table(columns=columns, filter=expression).to_pandas()
+    return (df.sort_values("updated_at")
+              .drop_duplicates("internal_id", keep="last")
+              .sort_values("internal_id")
+              .reset_index(drop=True))
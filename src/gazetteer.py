@@ -0,0 +1,406 @@
+import re
+import bisect
+import unicodedata
+from functools import lru_cache
+
+# Офлайн-справочник городов DACH для нормализации локаций.
+# Формат строки: страна; регион (земля / кантон); город; алиасы через запятую; диапазоны PLZ.
+# Названия и алиасы сравниваются по словам (без учета регистра, умлаутов и пунктуации),
+# поэтому "Muenchen", "Munchen", "MÜNCHEN" и "Munich" дают один и тот же город.
+# Диапазоны PLZ используются, только если в строке нет названия города.
+_CITIES = """
+DE;Berlin;Berlin;;10115-14199
+DE;Hamburg;Hamburg;;20095-20539,21029-21149,22041-22769
+DE;Bayern;München;munich,muenchen,monaco di baviera;80331-81929
+DE;Nordrhein-Westfalen;Köln;cologne,koln;50667-51149
+DE;Hessen;Frankfurt am Main;frankfurt,ffm,frankfurt a m,frankfurt main,frankfurt a main;60306-60599,65929-65936
+DE;Brandenburg;Frankfurt (Oder);frankfurt oder,frankfurt an der oder,frankfurt o;15230-15236
+DE;Baden-Württemberg;Stuttgart;;70173-70629
+DE;Nordrhein-Westfalen;Düsseldorf;dusseldorf;40210-40629
+DE;Sachsen;Leipzig;;04103-04357
+DE;Nordrhein-Westfalen;Dortmund;;44135-44388
+DE;Nordrhein-Westfalen;Essen;;45127-45359
+DE;Bremen;Bremen;;28195-28779
+DE;Sachsen;Dresden;;01067-01328
+DE;Niedersachsen;Hannover;hanover;30159-30669
+DE;Bayern;Nürnberg;nuremberg;90402-90491
+DE;Nordrhein-Westfalen;Duisburg;;47051-47279
+DE;Nordrhein-Westfalen;Bochum;;44787-44894
+DE;Nordrhein-Westfalen;Wuppertal;;42103-42399
+DE;Nordrhein-Westfalen;Bielefeld;;33602-33739
+DE;Nordrhein-Westfalen;Bonn;;53111-53229
+DE;Nordrhein-Westfalen;Münster;;48143-48167
+DE;Baden-Württemberg;Mannheim;;68159-68309
+DE;Baden-Württemberg;Karlsruhe;;76131-76229
+DE;Bayern;Augsburg;;86150-86199
+DE;Hessen;Wiesbaden;;65183-65207
+DE;Nordrhein-Westfalen;Mönchengladbach;;41061-41239
+DE;Nordrhein-Westfalen;Gelsenkirchen;;45879-45899
+DE;Nordrhein-Westfalen;Aachen;;52062-52080
+DE;Niedersachsen;Braunschweig;brunswick;38100-38126
+DE;Sachsen;Chemnitz;;09111-09247
+DE;Schleswig-Holstein;Kiel;;24103-24159
+DE;Sachsen-Anhalt;Halle (Saale);halle,halle saale,halle an der saale;06108-06132
+DE;Nordrhein-Westfalen;Halle (Westf.);halle westf,halle westfalen,halle in westfalen;33790-33790
+DE;Sachsen-Anhalt;Magdeburg;;39104-39130
+DE;Baden-Württemberg;Freiburg im Breisgau;freiburg,freiburg i br,freiburg breisgau;79098-79117
+DE;Nordrhein-Westfalen;Krefeld;;47798-47839
+DE;Rheinland-Pfalz;Mainz;;55116-55131
+DE;Schleswig-Holstein;Lübeck;;23552-23570
+DE;Thüringen;Erfurt;;99084-99099
+DE;Nordrhein-Westfalen;Oberhausen;;46045-46149
+DE;Mecklenburg-Vorpommern;Rostock;;18055-18147
+DE;Hessen;Kassel;;34117-34134
+DE;Nordrhein-Westfalen;Hagen;;58089-58135
+DE;Brandenburg;Potsdam;;14467-14482
+DE;Saarland;Saarbrücken;;66111-66133
+DE;Nordrhein-Westfalen;Hamm;;
+DE;Rheinland-Pfalz;Ludwigshafen am Rhein;ludwigshafen;
+DE;Niedersachsen;Oldenburg;;
+DE;Nordrhein-Westfalen;Mülheim an der Ruhr;mülheim,mülheim ruhr;
+DE;Rheinland-Pfalz;Mülheim-Kärlich;;56218-56218
+DE;Niedersachsen;Osnabrück;;
+DE;Nordrhein-Westfalen;Leverkusen;;
+DE;Hessen;Darmstadt;;64283-64297
+DE;Baden-Württemberg;Heidelberg;;69115-69126
+DE;Nordrhein-Westfalen;Solingen;;
+DE;Bayern;Regensburg;;93047-93059
+DE;Nordrhein-Westfalen;Herne;;
+DE;Nordrhein-Westfalen;Paderborn;;
+DE;Nordrhein-Westfalen;Neuss;;
+DE;Bayern;Ingolstadt;;85049-85057
+DE;Hessen;Offenbach am Main;offenbach;
+DE;Bayern;Fürth;;
+DE;Bayern;Würzburg;;
+DE;Baden-Württemberg;Ulm;;
+DE;Bayern;Neu-Ulm;;89231-89233
+DE;Baden-Württemberg;Heilbronn;;
+DE;Baden-Württemberg;Pforzheim;;
+DE;Niedersachsen;Wolfsburg;;
+DE;Niedersachsen;Göttingen;;
+DE;Nordrhein-Westfalen;Bottrop;;
+DE;Baden-Württemberg;Reutlingen;;
+DE;Rheinland-Pfalz;Koblenz;;
+DE;Bremen;Bremerhaven;;
+DE;Bayern;Erlangen;;
+DE;Nordrhein-Westfalen;Bergisch Gladbach;;
+DE;Nordrhein-Westfalen;Remscheid;;
+DE;Rheinland-Pfalz;Trier;;
+DE;Nordrhein-Westfalen;Recklinghausen;;
+DE;Thüringen;Jena;;
+DE;Nordrhein-Westfalen;Moers;;
+DE;Niedersachsen;Salzgitter;;
+DE;Nordrhein-Westfalen;Siegen;;
+DE;Nordrhein-Westfalen;Gütersloh;;
+DE;Niedersachsen;Hildesheim;;
+DE;Hessen;Hanau;;
+DE;Rheinland-Pfalz;Kaiserslautern;;
+DE;Brandenburg;Cottbus;;
+DE;Mecklenburg-Vorpommern;Schwerin;;
+DE;Nordrhein-Westfalen;Witten;;
+DE;Baden-Württemberg;Esslingen am Neckar;esslingen;
+DE;Baden-Württemberg;Ludwigsburg;;
+DE;Thüringen;Gera;;
+DE;Nordrhein-Westfalen;Iserlohn;;
+DE;Nordrhein-Westfalen;Düren;;
+DE;Baden-Württemberg;Tübingen;;
+DE;Schleswig-Holstein;Flensburg;;
+DE;Sachsen;Zwickau;;
+DE;Hessen;Gießen;giessen;
+DE;Nordrhein-Westfalen;Ratingen;;
+DE;Baden-Württemberg;Villingen-Schwenningen;;
+DE;Baden-Württemberg;Konstanz;;
+DE;Rheinland-Pfalz;Worms;;
+DE;Nordrhein-Westfalen;Minden;;
+DE;Sachsen-Anhalt;Dessau-Roßlau;dessau;
+DE;Schleswig-Holstein;Neumünster;;
+DE;Schleswig-Holstein;Norderstedt;;
+DE;Niedersachsen;Delmenhorst;;
+DE;Niedersachsen;Wilhelmshaven;;
+DE;Nordrhein-Westfalen;Viersen;;
+DE;Nordrhein-Westfalen;Detmold;;
+DE;Nordrhein-Westfalen;Troisdorf;;
+DE;Niedersachsen;Lüneburg;;
+DE;Bayern;Bayreuth;;
+DE;Bayern;Bamberg;;
+DE;Bayern;Landshut;;
+DE;Bayern;Aschaffenburg;;
+DE;Bayern;Kempten (Allgäu);kempten,kempten allgäu;
+DE;Bayern;Rosenheim;;
+DE;Bayern;Passau;;
+DE;Bayern;Schweinfurt;;
+DE;Hessen;Bad Homburg vor der Höhe;bad homburg;
+DE;Hessen;Eschborn;;
+DE;Hessen;Oberursel (Taunus);oberursel;
+DE;Baden-Württemberg;Walldorf;;
+DE;Bayern;Unterföhring;;
+DE;Bayern;Garching bei München;garching;
+DE;Baden-Württemberg;Sindelfingen;;
+DE;Baden-Württemberg;Böblingen;;
+DE;Baden-Württemberg;Friedrichshafen;;
+DE;Baden-Württemberg;Neckarsulm;;
+DE;Bayern;Herzogenaurach;;
+DE;Thüringen;Weimar;;
+DE;Mecklenburg-Vorpommern;Greifswald;;
+AT;Wien;Wien;vienna,vienne;1010-1239
+AT;Steiermark;Graz;;8010-8063
+AT;Oberösterreich;Linz;;4020-4040
+AT;Salzburg;Salzburg;;5020-5026
+AT;Tirol;Innsbruck;;6020-6080
+AT;Kärnten;Klagenfurt;klagenfurt am wörthersee;9020-9073
+AT;Kärnten;Villach;;
+AT;Oberösterreich;Wels;;
+AT;Niederösterreich;St. Pölten;sankt pölten;
+AT;Vorarlberg;Dornbirn;;
+AT;Niederösterreich;Wiener Neustadt;;
+AT;Oberösterreich;Steyr;;
+AT;Vorarlberg;Feldkirch;;
+AT;Vorarlberg;Bregenz;;
+AT;Oberösterreich;Leonding;;
+AT;Niederösterreich;Klosterneuburg;;
+AT;Steiermark;Leoben;;
+AT;Niederösterreich;Krems an der Donau;krems;
+AT;Oberösterreich;Hagenberg im Mühlkreis;hagenberg;
+AT;Burgenland;Eisenstadt;;
+CH;Zürich;Zürich;zurich,zurigo;8000-8099
+CH;Genf;Genf;geneva,geneve,ginevra;1200-1209
+CH;Basel-Stadt;Basel;basle,bale;4000-4059
+CH;Bern;Bern;berne;3000-3030
+CH;Waadt;Lausanne;;1000-1018
+CH;Zürich;Winterthur;;8400-8411
+CH;Luzern;Luzern;lucerne;6000-6015
+CH;St. Gallen;St. Gallen;sankt gallen,saint gall;9000-9016
+CH;Tessin;Lugano;;
+CH;Bern;Biel;bienne,biel bienne;
+CH;Bern;Thun;;
+CH;Bern;Köniz;;
+CH;Neuenburg;La Chaux-de-Fonds;;
+CH;Schaffhausen;Schaffhausen;;
+CH;Freiburg;Fribourg;freiburg schweiz,freiburg ch,freiburg im uechtland,freiburg i ue;
+CH;Graubünden;Chur;;
+CH;Neuenburg;Neuenburg;neuchatel;
+CH;Zug;Zug;;
+CH;Zürich;Uster;;
+CH;Wallis;Sion;sitten;
+CH;Luzern;Emmen;;
+CH;Zug;Baar;;
+CH;Aargau;Aarau;;
+CH;Solothurn;Olten;;
+CH;Solothurn;Solothurn;;
+CH;Zürich;Wallisellen;;
+CH;Zürich;Dübendorf;;
+CH;Zürich;Kloten;;
+CH;Zürich;Opfikon;glattbrugg;
+CH;Zürich;Schlieren;;
+CH;St. Gallen;Rapperswil-Jona;rapperswil;
+CH;Thurgau;Frauenfeld;;
+CH;Thurgau;Kreuzlingen;;
+CH;Basel-Landschaft;Allschwil;;
+CH;Basel-Landschaft;Liestal;;
+"""
+
+# Регионы без города (например, "Bayern" или "Kanton Aargau"); города-земли уже есть выше
+_REGIONS = """
+DE;Bayern;bavaria
+DE;Baden-Württemberg;
+DE;Nordrhein-Westfalen;nrw,north rhine westphalia
+DE;Hessen;hesse
+DE;Niedersachsen;lower saxony
+DE;Sachsen;saxony
+DE;Sachsen-Anhalt;saxony anhalt
+DE;Thüringen;thuringia
+DE;Brandenburg;
+DE;Mecklenburg-Vorpommern;
+DE;Schleswig-Holstein;
+DE;Rheinland-Pfalz;rhineland palatinate
+DE;Saarland;
+AT;Niederösterreich;lower austria
+AT;Oberösterreich;upper austria
+AT;Steiermark;styria
+AT;Tirol;tyrol
+AT;Kärnten;carinthia
+AT;Vorarlberg;
+AT;Burgenland;
+CH;Aargau;
+CH;Thurgau;
+CH;Graubünden;grisons
+CH;Tessin;ticino
+CH;Wallis;valais
+CH;Waadt;vaud
+CH;Basel-Landschaft;baselland
+CH;Schwyz;
+"""
+
+# Строка целиком означает всю страну / удаленку (как и раньше - "Remote/Deutschland")
+COUNTRY_WIDE = {
+    "deutschland": "Remote/Deutschland", "germany": "Remote/Deutschland", "remote": "Remote/Deutschland",
+    "nationwide": "Remote/Deutschland", "home office": "Remote/Deutschland", "homeoffice": "Remote/Deutschland",
+    "unknown": "Remote/Deutschland", "bundesweit": "Remote/Deutschland", "deutschlandweit": "Remote/Deutschland",
+    "österreich": "Österreich", "austria": "Österreich", "schweiz": "Schweiz", "switzerland": "Schweiz",
+}
+
+_FOLD = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+_WORD = re.compile(r"[0-9a-z]+")
+# Уточнения, которые не называют другое место: "Frankfurt (Hybrid)", "Halle (m/w/d)"
+_SOFT_QUALIFIERS = frozenset(
+    "remote hybrid homeoffice home office mobil mobiles arbeiten teilweise vor ort onsite "
+    "m w d f x div und and umgebung raum region innenstadt zentrum city".split()
+)
+_PLZ_DE = re.compile(r"(?<!\d)(\d{5})(?!\d)")
+_PLZ_AT_CH = re.compile(r"\b(A|AT|CH)\s?-\s?(\d{4})\b", re.IGNORECASE)
+
+
+def _strip_accents(text):
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    """Слова строки: нижний регистр, ä -> ae и т.д., прочие диакритики и пунктуация убраны."""
+    return _NON_WORD.sub(" ", _strip_accents(text.lower().translate(_FOLD))).split()
+
+
+def _scan(text):
+    """
+    Слова строки (как tokenize) и разделитель перед каждым словом: по нему видно
+    составное имя через дефис ("Neu-Ulm") и уточнение в скобках или после "/"
+    ("Halle (Westf.)", "Halle/Westfalen").
+    """
+    folded = _strip_accents(text.lower().translate(_FOLD))
+    tokens, gaps, end = [], [], 0
+    for m in _WORD.finditer(folded):
+        tokens.append(m.group())
+        gaps.append(folded[end:m.start()] if tokens[1:] else "")
+        end = m.end()
+    return tokens, gaps
+
+
+class Gazetteer:
+    """
+    Справочник, скомпилированный в префиксное дерево по словам: в строке локации ищется
+    самое длинное совпадение в каждой позиции ("frankfurt oder" длиннее "frankfurt"),
+    поэтому разбор - один проход по словам, без перебора всех названий.
+
+    Совпадение не начинается внутри составного имени ("Neu-Ulm" - не Ulm). Название,
+    с которого начинаются несколько мест ("Halle", "Freiburg", "Mülheim"), с неизвестным
+    уточнением ("Freiburg (Elbe)") не принимается - лучше не найти город, чем найти чужой.
+    """
+
+    def __init__(self, cities=_CITIES, regions=_REGIONS):
+        self.trie = {}
+        self.plz = {"DE": [], "AT": [], "CH": []}
+        self._places_by_first_word = {}
+        for line in cities.strip().splitlines():
+            country, region, city, aliases, ranges = line.split(";")
+            entry = {"city": city, "region": region, "country": country, "kind": "city"}
+            for name in [city] + [a for a in aliases.split(",") if a]:
+                self._add(name, entry)
+            for part in filter(None, ranges.split(",")):
+                low, high = part.split("-")
+                self.plz[country].append((int(low), int(high), entry))
+        for line in regions.strip().splitlines():
+            country, region, aliases = line.split(";")
+            entry = {"city": None, "region": region, "country": country, "kind": "region"}
+            for name in [region] + [a for a in aliases.split(",") if a]:
+                self._add(name, entry)
+        for ranges in self.plz.values():
+            ranges.sort(key=lambda r: r[0])
+        self.ambiguous = {w for w, places in self._places_by_first_word.items() if len(places) > 1}
+        del self._places_by_first_word
+        self._plz_starts = {country: [r[0] for r in ranges] for country, ranges in self.plz.items()}
+
+    def _add(self, name, entry):
+        # Обе формы: "muenchen" (ü -> ue) и "munchen" (ü -> u), как пишут в объявлениях
+        for variant in {" ".join(tokenize(name)), _NON_WORD.sub(" ", _strip_accents(name.lower())).strip()}:
+            node = self.trie
+            for token in variant.split():
+                node = node.setdefault(token, {})
+            self._places_by_first_word.setdefault(variant.split()[0], set()).add((entry["country"], entry["region"], entry["city"]))
+            # Город важнее региона с тем же названием (Zürich, Salzburg, Bern)
+            if node.get(None, {}).get("kind") != "city":
+                node[None] = entry
+
+    def _walk(self, tokens, start):
+        """Самое длинное совпадение с позиции start: (entry, позиция после него) или (None, start)."""
+        node, found, end = self.trie, None, start
+        for i in range(start, len(tokens)):
+            node = node.get(tokens[i])
+            if node is None:
+                break
+            if None in node:
+                found, end = node[None], i + 1
+        return found, end
+
+    def _qualifier_fits(self, tokens, gaps, end, entry):
+        """Уточнение после города ("(Westf.)", "/Main") не противоречит ему."""
+        if end >= len(tokens) or not any(c in gaps[end] for c in "(/"):
+            return True
+        group = [tokens[end]]
+        for i in range(end + 1, len(tokens)):
+            if any(c in gaps[i] for c in "()/,;|"):
+                break
+            group.append(tokens[i])
+        if all(t in _SOFT_QUALIFIERS for t in group):
+            return True
+        found, _ = self._walk(tokens, end)
+        country_wide = COUNTRY_WIDE.get(" ".join(group))
+        country = {"Remote/Deutschland": "DE", "Österreich": "AT", "Schweiz": "CH"}.get(country_wide)
+        return (found is not None and found["country"] == entry["country"]) or country == entry["country"]
+
+    def _match(self, tokens, gaps=None):
+        """Первое (самое левое) совпадение-город; если городов нет - первый регион."""
+        gaps = gaps or [" "] * len(tokens)
+        region = None
+        for start in range(len(tokens)):
+            if gaps[start] == "-":
+                continue
+            found, end = self._walk(tokens, start)
+            if found:
+                if found["kind"] == "city":
+                    if tokens[start] not in self.ambiguous or self._qualifier_fits(tokens, gaps, end, found):
+                        return found
+                    continue
+                region = region or found
+        return region
+
+    def _match_plz(self, text):
+        codes = [("DE", int(m)) for m in _PLZ_DE.findall(text)]
+        codes += [("AT" if prefix.upper() in ("A", "AT") else "CH", int(code))
+                  for prefix, code in _PLZ_AT_CH.findall(text)]
+        for country, code in codes:
+            i = bisect.bisect_right(self._plz_starts[country], code) - 1
+            if i >= 0:
+                low, high, entry = self.plz[country][i]
+                if low <= code <= high:
+                    return entry
+        return None
+
+    def lookup(self, text):
+        """{city, region, country, kind} для строки локации или None, если ничего не найдено."""
+        return self._match(tokenize(text)) if text else None
+
+
+_GAZETTEER = None
+
+
+def get_gazetteer():
+    global _GAZETTEER
+    if _GAZETTEER is None:
+        _GAZETTEER = Gazetteer()
+    return _GAZETTEER
+
+
+@lru_cache(maxsize=65536)
+def lookup_location(loc):
+    """
+    Разбор локации по справочнику: город, затем PLZ, затем регион (земля / кантон).
+    Результат кэшируется: одни и те же строки ("10115 Berlin", "München, Bayern")
+    повторяются в тысячах вакансий. Возвращает dict или None.
+    """
+    if not loc:
+        return None
+    gazetteer = get_gazetteer()
+    found = gazetteer._match(*_scan(loc))
+    if found and found["kind"] == "city":
+        return found
+    return gazetteer._match_plz(loc) or found
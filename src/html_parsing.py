@@ -0,0 +1,317 @@
+import os
+import re
+import json
+import threading
+import configparser
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, Future
+from bs4 import BeautifulSoup
+
+# Функции этого модуля - чистые (html -> dict/list), без сети и БД, поэтому их можно
+# отдавать в ProcessPoolExecutor: разбор HTML упирается в CPU и под GIL в потоках не масштабируется.
+
+_BACKEND = None
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _load_parsing_settings():
+    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    config = configparser.ConfigParser()
+    config.read(os.path.join(base_dir, 'settings.ini'), encoding='utf-8')
+    backend = config.get('Parsing', 'html_parser', fallback='auto').strip()
+    workers = config.get('Parsing', 'parse_workers', fallback='auto').strip()
+    if workers == 'auto':
+        workers = max(1, (os.cpu_count() or 2) - 1)
+    return backend, int(workers)
+
+
+def get_parser_backend():
+    """'lxml', если он установлен (и не отключен в settings.ini), иначе встроенный 'html.parser'."""
+    global _BACKEND
+    if _BACKEND is None:
+        backend, _ = _load_parsing_settings()
+        if backend in ('auto', 'lxml'):
+            try:
+                import lxml  # noqa: F401
+                backend = 'lxml'
+            except ImportError:
+                backend = 'html.parser'
+        _BACKEND = backend
+    return _BACKEND
+
+
+def make_soup(html):
+    return BeautifulSoup(html, get_parser_backend())
+
+
+def html_to_text(fragment):
+    """HTML-фрагмент -> текст. Для простого текста без разметки BeautifulSoup не создаем."""
+    if not fragment:
+        return ""
+    if '<' not in fragment and '&' not in fragment:
+        return fragment.strip()
+    return make_soup(fragment).get_text(" ", strip=True)
+
+
+# --- Страницы вакансий (DescriptionManager) ---
+
+def parse_json_ld(soup):
+    """
+    Достает описание и зарплату из JSON-LD (JobPosting) уже разобранной страницы.
+    Возвращает словарь с найденными полями или None.
+    """
+    results = {"description": None, "salary_min": None, "salary_max": None}
+    try:
+        scripts = soup.find_all('script', type='application/ld+json')
+        for script in scripts:
+            try:
+                data = json.loads(script.string)
+                items = data if isinstance(data, list) else [data]
+                for item in items:
+                    if isinstance(item, dict) and item.get('@type') == 'JobPosting':
+                        # 1. Описание
+                        if 'description' in item:
+                            results["description"] = html_to_text(item['description'])
+
+                        # 2. Зарплата (baseSalary)
+                        salary = item.get('baseSalary')
+                        if isinstance(salary, dict):
+                            value = salary.get('value')
+                            if isinstance(value, dict):
+                                results["salary_min"] = value.get('minValue') or value.get('value')
+                                results["salary_max"] = value.get('maxValue') or value.get('value')
+
+                        # Если нашли главные данные, можно выходить (обычно JobPosting один на странице)
+                        if results["description"]:
+                            return results
+            except:
+                continue
+    except:
+        pass
+    return results if results["description"] else None
+
+
+def _stepstone_fallback(soup):
+    # Старые CSS селекторы (только для описания)
+    content = soup.find('div', class_=lambda x: x and 'JobDescription' in x)
+    if not content:
+        content = soup.find('div', class_='js-app-ld-ContentBlock')
+    if content:
+        return {"description": content.get_text(" ", strip=True), "salary_min": None, "salary_max": None}
+    return None
+
+
+def _xing_fallback(soup):
+    content = soup.find('div', class_=re.compile(r'job-description|description'))
+    if not content:
+        content = soup.find('main')
+    if content:
+        return {"description": content.get_text(" ", strip=True), "salary_min": None, "salary_max": None}
+    return None
+
+
+def _generic_fallback(soup):
+    # Внимание: меняет soup (удаляет служебные теги), поэтому вызывается последним
+    for tag in ['script', 'style', 'nav', 'footer', 'header', 'aside']:
+        for match in soup.find_all(tag): match.decompose()
+    paragraphs = soup.find_all(['p', 'div', 'li'])
+    text_blocks = [p.get_text(" ", strip=True) for p in paragraphs if len(p.get_text()) > 100]
+    desc = "\n".join(text_blocks)
+    if desc:
+        return {"description": desc, "salary_min": None, "salary_max": None}
+    return None
+
+
+def parse_description_page(html, final_url, site=None):
+    """
+    Разбирает страницу вакансии один раз и пробует JSON-LD, затем fallback для сайта.
+    `site` ('stepstone', 'xing', 'arbeitsagentur') можно задать явно, иначе он берется из final_url.
+    """
+    if site is None:
+        if 'stepstone.de' in final_url:
+            site = 'stepstone'
+        elif 'xing.com' in final_url:
+            site = 'xing'
+        elif 'arbeitsagentur.de' in final_url:
+            site = 'arbeitsagentur'
+    try:
+        soup = make_soup(html)
+    except Exception:
+        return None
+
+    data = parse_json_ld(soup)
+    if data:
+        return data
+    try:
+        if site == 'stepstone':
+            return _stepstone_fallback(soup)
+        if site == 'xing':
+            return _xing_fallback(soup)
+        if site == 'arbeitsagentur':
+            return None
+        return _generic_fallback(soup)
+    except Exception:
+        return None
+
+
+# --- Страницы выдачи (скраперы) ---
+
+def parse_stepstone_listing(html, base_url, country):
+    jobs = []
+    soup = make_soup(html)
+    for item in soup.find_all("article"):
+        title_elem = item.find("h2")
+        link_elem = item.find("a", href=re.compile(r"/stellenangebote--"))
+        if not title_elem or not link_elem: continue
+
+        job_url = link_elem["href"]
+        if not job_url.startswith("http"): job_url = base_url + job_url
+
+        # Извлечение ID
+        id_match = re.search(r"-(\d+)\.html", job_url)
+        job_id = id_match.group(1) if id_match else str(hash(job_url))
+
+        company_elem = item.find("a", href=re.compile(r"/cmp/")) or \
+                       item.find("div", {"data-test": "job-item-company-name"})
+        company = company_elem.get_text(strip=True) if company_elem else "Unknown"
+
+        location_elem = item.find("span", {"data-test": "job-item-location"}) or \
+                        item.find("div", {"data-test": "job-item-location"})
+        location = location_elem.get_text(strip=True) if location_elem else ("Germany" if country=="DE" else country)
+
+        # Если компания Unknown, попробуем вытащить из URL
+        if company == "Unknown" and "--" in job_url:
+            # URL format: ...--Title-Location-Company--ID-inline.html
+            url_parts = job_url.split("--")[1].split("-")
+            if len(url_parts) > 2:
+                # Usually the last few parts before the ID
+                company = " ".join(url_parts[-3:-1]).replace("-", " ").title()
+
+        jobs.append({
+            "id": job_id,
+            "title": title_elem.get_text(strip=True),
+            "company": company,
+            "location": location,
+            "url": job_url,
+            "source": "stepstone",
+            "country_search": country.upper()
+        })
+    return jobs
+
+
+def parse_salary(salary_str):
+    if not salary_str: return None, None
+    matches = re.findall(r'(\d{1,3}[\.\s]?\d{3})', salary_str)
+    if matches:
+        values = [float(m.replace('.', '').replace(' ', '')) for m in matches]
+        values = [v for v in values if 20000 <= v <= 300000]
+        if len(values) >= 2: return min(values), max(values)
+        elif len(values) == 1: return values[0], values[0]
+    return None, None
+
+
+def parse_xing_listing(html, country):
+    jobs = []
+    soup = make_soup(html)
+    job_links = soup.find_all('a', href=re.compile(r'/jobs/.*-\d+$'))
+
+    for link in job_links:
+        container = link.find_parent('article') or link
+        full_text = container.get_text("|", strip=True)
+        if "Jobs gefunden" in full_text[:20]: continue
+
+        title_elem = container.find(['h2', 'h3'])
+        title = title_elem.get_text(strip=True) if title_elem else link.get_text(strip=True).split("|")[0]
+        # Обычно: [Заголовок, Компания, Локация, ...]
+        parts = [p.strip() for p in full_text.split("|") if p.strip()]
+
+        # Пытаемся найти компанию в специальных элементах или тексте
+        company = "Unknown"
+        company_elem = container.find('p', class_=re.compile(r'CompanyLine')) or \
+                       container.find('span', class_=re.compile(r'CompanyName'))
+
+        if company_elem:
+            company = company_elem.get_text(strip=True)
+        elif len(parts) > 1:
+            # Fallback: парсим из full_text, пропуская заголовок
+            company = parts[1]
+
+        # Локация
+        location = "Germany"
+        loc_elem = container.find('p', class_=re.compile(r'LocationLine')) or \
+                   container.find('span', class_=re.compile(r'LocationName'))
+        if loc_elem:
+            location = loc_elem.get_text(strip=True)
+        elif len(parts) > 2 and company != parts[2]:
+            location = parts[2]
+
+        # Очистка локации от лишнего текста (типа "• Hybrid")
+        location = location.split("•")[0].strip()
+
+        # Пытаемся найти зарплату в тексте
+        salary_text = re.search(r'(\d[\d\.\s]*€|\d[\d\.\s]*\s*Euro|от\s*[\d\.\s]+)', full_text, re.I)
+        salary_min, salary_max = parse_salary(salary_text.group(0) if salary_text else "")
+
+        url = link['href']
+        if url.startswith('/'): url = "https://www.xing.com" + url
+
+        jobs.append({
+            'id': url.split('-')[-1],
+            'title': title,
+            'company': company,
+            'location': location,
+            'url': url,
+            'salary_min': salary_min,
+            'salary_max': salary_max,
+            'source': 'xing',
+            'country_search': country.upper()
+        })
+    return jobs
+
+
+# --- Пул процессов ---
+
+class ParsePool:
+    """
+    Пул процессов для разбора HTML. При workers=0 разбор выполняется в текущем
+    процессе (удобно для отладки), интерфейс тот же - submit() возвращает Future.
+
+    Процессы стартуют лениво, при первом submit() из потока скрапера, когда другие потоки
+    держат блокировки (HTTP-сессия, соединения SQLite). fork скопировал бы их захваченными,
+    поэтому процессы запускаются через spawn - чистый интерпретатор, как на Windows.
+    """
+
+    def __init__(self, workers=0):
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) if workers > 0 else None
+
+    def submit(self, fn, *args):
+        if self.executor is not None:
+            return self.executor.submit(fn, *args)
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def run(self, fn, *args):
+        """Синхронный вызов из потока скрапера: сам разбор уходит в отдельный процесс."""
+        return self.submit(fn, *args).result()
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+
+
+def get_parse_pool():
+    """Общий пул разбора на процесс (создается лениво, размер - [Parsing] parse_workers)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _, workers = _load_parsing_settings()
+            _pool = ParsePool(workers)
+        return _pool
@@ -0,0 +1,172 @@
+import os
+import json
+import time
+import threading
+import configparser
+from datetime import datetime
+
+# Хост -> источник для разбивки метрик (домен покрывает поддомены)
+HOST_SOURCES = {
+    "stepstone.de": "stepstone", "stepstone.at": "stepstone", "stepstone.ch": "stepstone",
+    "xing.com": "xing",
+    "arbeitsagentur.de": "arbeitsagentur",
+    "adzuna.com": "adzuna", "adzuna.de": "adzuna", "adzuna.at": "adzuna", "adzuna.ch": "adzuna",
+    "deepl.com": "deepl",
+}
+
+
+def source_for_host(host):
+    parts = (host or "").lower().split('.')
+    for i in range(len(parts) - 1):
+        source = HOST_SOURCES.get('.'.join(parts[i:]))
+        if source:
+            return source
+    return "other"
+
+
+def _empty_counters():
+    return {"requests": 0, "errors": 0, "cache_hits": 0, "bytes": 0, "http_seconds": 0.0,
+            "status": {}, "rows_inserted": 0, "rows_updated": 0}
+
+
+class RunMetrics:
+    """
+    Метрики одного запуска пайплайна: по этапам (scrape, enrich, translate, skills, trends)
+    и внутри этапа - по источникам. HTTP-запросы записывает HttpClient, строки - код этапа.
+    Этапы идут последовательно, поэтому запросы из рабочих потоков относятся к текущему этапу.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = datetime.now()
+        self.stages = {}
+        self.current = None
+
+    def begin(self, stage):
+        with self.lock:
+            self.stages[stage] = {"started": time.time(), "wall_seconds": None, "sources": {}}
+            self.current = stage
+
+    def end(self, stage):
+        with self.lock:
+            info = self.stages.get(stage)
+            if info and info["wall_seconds"] is None:
+                info["wall_seconds"] = round(time.time() - info["started"], 3)
+            if self.current == stage:
+                self.current = None
+
+    def _counters(self, stage, source):
+        stage = stage or self.current or "other"
+        if stage not in self.stages:
+            self.stages[stage] = {"started": time.time(), "wall_seconds": None, "sources": {}}
+        return self.stages[stage]["sources"].setdefault(source, _empty_counters())
+
+    def record_request(self, host, status=None, nbytes=0, seconds=0.0, error=False, cache_hit=False, stage=None):
+        source = source_for_host(host)
+        with self.lock:
+            c = self._counters(stage, source)
+            if cache_hit:
+                c["cache_hits"] += 1
+                return
+            c["requests"] += 1
+            c["http_seconds"] += seconds
+            if error:
+                c["errors"] += 1
+                status = "error"
+            c["bytes"] += nbytes
+            key = str(status)
+            c["status"][key] = c["status"].get(key, 0) + 1
+
+    def record_rows(self, source, inserted=0, updated=0, stage=None):
+        with self.lock:
+            c = self._counters(stage, source)
+            c["rows_inserted"] += inserted
+            c["rows_updated"] += updated
+
+    def report(self):
+        """Снимок всех метрик в виде словаря (для JSON)."""
+        with self.lock:
+            stages = {}
+            for name, info in self.stages.items():
+                wall = info["wall_seconds"]
+                if wall is None:
+                    wall = round(time.time() - info["started"], 3)
+                sources = {s: dict(c, status=dict(c["status"]), http_seconds=round(c["http_seconds"], 3))
+                           for s, c in info["sources"].items()}
+                rows = sum(c["rows_inserted"] + c["rows_updated"] for c in sources.values())
+                stages[name] = {
+                    "wall_seconds": wall,
+                    "requests": sum(c["requests"] for c in sources.values()),
+                    "bytes": sum(c["bytes"] for c in sources.values()),
+                    "rows": rows,
+                    "rows_per_second": round(rows / wall, 2) if wall else 0.0,
+                    "sources": sources
+                }
+            return {
+                "started_at": self.started_at.strftime("%Y-%m-%d %H:%M:%S"),
+                "finished_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "stages": stages
+            }
+
+    def write_json(self, report_dir="data/reports"):
+        os.makedirs(report_dir, exist_ok=True)
+        path = os.path.join(report_dir, f"run_{self.started_at.strftime('%Y%m%d_%H%M%S')}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2, ensure_ascii=False)
+        return path
+
+    def write_prometheus(self, path="data/metrics/pipeline.prom"):
+        """Textfile для node_exporter (textfile collector). Пишется атомарно через .tmp."""
+        report = self.report()
+        lines = []
+
+        def metric(name, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in samples:
+                label_str = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"{name}{{{label_str}}} {value}")
+
+        stages = report["stages"]
+        metric("dach_stage_wall_seconds", "Wall time of a pipeline stage.",
+               [({"stage": s}, info["wall_seconds"]) for s, info in stages.items()])
+        metric("dach_stage_rows_per_second", "Rows inserted+updated per second of stage wall time.",
+               [({"stage": s}, info["rows_per_second"]) for s, info in stages.items()])
+        per_source = [(s, src, c) for s, info in stages.items() for src, c in info["sources"].items()]
+        for key, name, help_text in [
+            ("requests", "dach_http_requests", "HTTP requests sent."),
+            ("errors", "dach_http_errors", "HTTP requests that failed without a response."),
+            ("cache_hits", "dach_http_cache_hits", "Responses served from the disk cache without a request."),
+            ("bytes", "dach_http_bytes", "Bytes downloaded (decoded body size)."),
+            ("rows_inserted", "dach_rows_inserted", "Rows inserted into the database."),
+            ("rows_updated", "dach_rows_updated", "Rows updated in the database."),
+        ]:
+            metric(name, help_text, [({"stage": s, "source": src}, c[key]) for s, src, c in per_source])
+        metric("dach_http_responses", "HTTP responses by status code.",
+               [({"stage": s, "source": src, "status": code}, n)
+                for s, src, c in per_source for code, n in c["status"].items()])
+        metric("dach_last_run_timestamp_seconds", "Unix time when the report was written.",
+               [({}, int(time.time()))])
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(path + ".tmp", path)
+        return path
+
+    def write_reports(self, config_path="settings.ini"):
+        """Пишет JSON-отчет и, если включено в [Metrics], Prometheus textfile."""
+        config = configparser.ConfigParser()
+        config.read(config_path, encoding='utf-8')
+        paths = [self.write_json(config.get('Metrics', 'report_dir', fallback='data/reports'))]
+        if config.getboolean('Metrics', 'prometheus', fallback=False):
+            paths.append(self.write_prometheus(config.get('Metrics', 'prometheus_path', fallback='data/metrics/pipeline.prom')))
+        return paths
+
+    def print_summary(self):
+        for name, info in self.report()["stages"].items():
+            print(f"  [{name}] {info['wall_seconds']}s, {info['requests']} requests, "
+                  f"{round(info['bytes'] / 1024 / 1024, 1)} MB, {info['rows']} rows ({info['rows_per_second']} rows/s)")
+
+
+METRICS = RunMetrics()
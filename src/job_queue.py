@@ -0,0 +1,163 @@
+from db_connection import get_connection
+from datetime import datetime
+
+
+class JobQueue:
+    """
+    Персистентная очередь задач скрапинга в той же SQLite-базе.
+
+    Каждая строка scrape_jobs - одна страница выдачи (source, query, country, page)
+    внутри цикла (scrape_cycles). Состояния: pending -> done / skipped / failed.
+    Если запуск упал, `--resume` продолжает последний незавершенный цикл и берет
+    только страницы, которые еще не были сохранены.
+    """
+
+    def __init__(self, db_path="data/jobs_database.sqlite", max_attempts=3):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self._init_tables()
+
+    def _init_tables(self):
+        with get_connection(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS scrape_cycles (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    started_at TEXT,
+                    finished_at TEXT,
+                    status TEXT DEFAULT 'running'
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS scrape_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    cycle_id INTEGER,
+                    source TEXT,
+                    query TEXT,
+                    role TEXT,
+                    level_name TEXT,
+                    country TEXT,
+                    is_aggregator INTEGER DEFAULT 0,
+                    auto_level INTEGER DEFAULT 0,
+                    page INTEGER,
+                    state TEXT DEFAULT 'pending',
+                    attempts INTEGER DEFAULT 0,
+                    fetched INTEGER,
+                    added INTEGER,
+                    last_error TEXT,
+                    created_at TEXT,
+                    updated_at TEXT,
+                    UNIQUE(cycle_id, source, query, country, page)
+                )
+            ''')
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_scrape_jobs_cycle_state ON scrape_jobs(cycle_id, state)")
+            conn.commit()
+
+    @staticmethod
+    def _now():
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    def start_cycle(self, tasks, pages_for):
+        """
+        Создает новый цикл и записывает все запланированные страницы.
+        `pages_for(task)` - сколько страниц планировать для задачи.
+        Незавершенные предыдущие циклы помечаются как 'abandoned'.
+        """
+        now = self._now()
+        with get_connection(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("UPDATE scrape_cycles SET status = 'abandoned' WHERE status = 'running'")
+            cursor.execute("INSERT INTO scrape_cycles (started_at, status) VALUES (?, 'running')", (now,))
+            cycle_id = cursor.lastrowid
+            rows = []
+            for t in tasks:
+                for page in range(1, pages_for(t) + 1):
+                    rows.append((cycle_id, t["source"], t["query"], t["role"], t["level_name"], t["country"],
+                                 1 if t["is_aggregator"] else 0, 1 if t["auto_level"] else 0, page, now, now))
+            cursor.executemany('''
+                INSERT OR IGNORE INTO scrape_jobs (cycle_id, source, query, role, level_name, country,
+                                                   is_aggregator, auto_level, page, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            conn.commit()
+        return cycle_id
+
+    def resume_cycle(self):
+        """Возвращает id последнего незавершенного цикла (или None)."""
+        with get_connection(self.db_path) as conn:
+            row = conn.execute("SELECT id FROM scrape_cycles WHERE status = 'running' ORDER BY id DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def get_units(self, cycle_id):
+        """
+        Группирует оставшиеся страницы в задачи (source, query, country).
+        В каждой задаче 'pages' - список (job_id, page) по возрастанию страницы.
+        """
+        with get_connection(self.db_path) as conn:
+            rows = conn.execute('''
+                SELECT id, source, query, role, level_name, country, is_aggregator, auto_level, page
+                FROM scrape_jobs
+                WHERE cycle_id = ? AND state = 'pending'
+                ORDER BY id
+            ''', (cycle_id,)).fetchall()
+
+        units = {}
+        for job_id, source, query, role, level_name, country, is_agg, auto_level, page in rows:
+            key = (source, query, country)
+            if key not in units:
+                units[key] = {
+                    "source": source, "query": query, "role": role, "level_name": level_name,
+                    "country": country, "is_aggregator": bool(is_agg), "auto_level": bool(auto_level),
+                    "cycle_id": cycle_id, "pages": []
+                }
+            units[key]["pages"].append((job_id, page))
+        for unit in units.values():
+            unit["pages"].sort(key=lambda p: p[1])
+        return list(units.values())
+
+    def mark_done(self, job_id, fetched, added):
+        with get_connection(self.db_path) as conn:
+            conn.execute('''
+                UPDATE scrape_jobs SET state = 'done', attempts = attempts + 1, fetched = ?, added = ?,
+                                       last_error = NULL, updated_at = ?
+                WHERE id = ?
+            ''', (fetched, added, self._now(), job_id))
+            conn.commit()
+
+    def mark_failed(self, job_id, error):
+        """Страница остается 'pending' для следующего --resume, пока не исчерпаны попытки."""
+        with get_connection(self.db_path) as conn:
+            conn.execute('''
+                UPDATE scrape_jobs SET
+                    attempts = attempts + 1,
+                    state = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END,
+                    last_error = ?, updated_at = ?
+                WHERE id = ?
+            ''', (self.max_attempts, str(error)[:500], self._now(), job_id))
+            conn.commit()
+
+    def skip_rest(self, unit, after_page):
+        """Конец выдачи или ранняя остановка: остальные страницы задачи не нужны."""
+        with get_connection(self.db_path) as conn:
+            conn.execute('''
+                UPDATE scrape_jobs SET state = 'skipped', updated_at = ?
+                WHERE cycle_id = ? AND source = ? AND query = ? AND country = ? AND page > ? AND state = 'pending'
+            ''', (self._now(), unit["cycle_id"], unit["source"], unit["query"], unit["country"], after_page))
+            conn.commit()
+
+    def finish_cycle(self, cycle_id):
+        """Закрывает цикл, если в нем не осталось страниц для повторной попытки."""
+        with get_connection(self.db_path) as conn:
+            left = conn.execute("SELECT COUNT(*) FROM scrape_jobs WHERE cycle_id = ? AND state = 'pending'",
+                                (cycle_id,)).fetchone()[0]
+            if left == 0:
+                conn.execute("UPDATE scrape_cycles SET status = 'finished', finished_at = ? WHERE id = ?",
+                             (self._now(), cycle_id))
+            conn.commit()
+        return left
+
+    def summary(self, cycle_id):
+        with get_connection(self.db_path) as conn:
+            rows = conn.execute("SELECT state, COUNT(*) FROM scrape_jobs WHERE cycle_id = ? GROUP BY state",
+                                (cycle_id,)).fetchall()
+        return dict(rows)
@@ -0,0 +1,280 @@
+from db_connection import get_connection
+from datetime import datetime
+
+
+# Ключи групп: NULL в колонках вакансии превращается в '' (PRIMARY KEY WITHOUT ROWID-таблиц не допускает NULL)
+_ACTIVE_KEY = "COALESCE({r}.country_api, ''), COALESCE({r}.search_query, ''), COALESCE({r}.search_level, ''), COALESCE({r}.source, '')"
+_SALARY_KEY = "COALESCE({r}.country_api, ''), COALESCE({r}.search_query, ''), COALESCE({r}.search_level, ''), COALESCE({r}.city, '')"
+_ACTIVE_MATCH = ("country = COALESCE({r}.country_api, '') AND role = COALESCE({r}.search_query, '') "
+                 "AND level = COALESCE({r}.search_level, '') AND source = COALESCE({r}.source, '')")
+_SALARY_MATCH = ("country = COALESCE({r}.country_api, '') AND role = COALESCE({r}.search_query, '') "
+                 "AND level = COALESCE({r}.search_level, '') AND city = COALESCE({r}.city, '')")
+# Вакансия входит в зарплатную статистику, если есть salary_min; верхняя граница - salary_max или salary_min
+_SALARY_TOP = "COALESCE({r}.salary_max, {r}.salary_min)"
+
+
+def _add_active(r, sign):
+    return f'''
+        INSERT INTO stats_active (country, role, level, source, active_count, total_count)
+        VALUES ({_ACTIVE_KEY.format(r=r)}, {sign} * (COALESCE({r}.is_active, 1) = 1), {sign})
+        ON CONFLICT DO UPDATE SET
+            active_count = active_count + excluded.active_count,
+            total_count = total_count + excluded.total_count;'''
+
+
+def _add_salary(r):
+    return f'''
+        INSERT INTO stats_salary (country, role, level, city, salary_count, salary_min_sum, salary_max_sum, salary_min, salary_max)
+        SELECT {_SALARY_KEY.format(r=r)}, 1, {r}.salary_min, {_SALARY_TOP.format(r=r)}, {r}.salary_min, {_SALARY_TOP.format(r=r)}
+        WHERE {r}.salary_min IS NOT NULL
+        ON CONFLICT DO UPDATE SET
+            salary_count = salary_count + 1,
+            salary_min_sum = salary_min_sum + excluded.salary_min_sum,
+            salary_max_sum = salary_max_sum + excluded.salary_max_sum,
+            salary_min = MIN(COALESCE(salary_min, excluded.salary_min), excluded.salary_min),
+            salary_max = MAX(COALESCE(salary_max, excluded.salary_max), excluded.salary_max);'''
+
+
+def _remove_salary(r):
+    # Суммы вычитаются; min/max пересчитываются по группе, только если уходит крайнее значение
+    # (AFTER-триггер: в vacancies уже новые значения, поэтому пересчет корректен)
+    group = ("v.country_api IS {r}.country_api AND v.search_query IS {r}.search_query "
+             "AND v.search_level IS {r}.search_level AND v.city IS {r}.city AND v.salary_min IS NOT NULL").format(r=r)
+    return f'''
+        UPDATE stats_salary SET
+            salary_count = salary_count - 1,
+            salary_min_sum = salary_min_sum - {r}.salary_min,
+            salary_max_sum = salary_max_sum - {_SALARY_TOP.format(r=r)}
+        WHERE {r}.salary_min IS NOT NULL AND {_SALARY_MATCH.format(r=r)};
+        UPDATE stats_salary SET
+            salary_min = (SELECT MIN(v.salary_min) FROM vacancies v WHERE {group}),
+            salary_max = (SELECT MAX(COALESCE(v.salary_max, v.salary_min)) FROM vacancies v WHERE {group})
+        WHERE {r}.salary_min IS NOT NULL AND {_SALARY_MATCH.format(r=r)}
+            AND (salary_min >= {r}.salary_min OR salary_max <= {_SALARY_TOP.format(r=r)});
+        DELETE FROM stats_salary WHERE salary_count <= 0 AND {_SALARY_MATCH.format(r=r)};'''
+
+
+def _skill_month(sign):
+    return f'''
+        INSERT INTO stats_skills_monthly (month, skill_id, vacancy_count)
+        SELECT COALESCE(substr(v.first_seen, 1, 7), ''), {'NEW' if sign > 0 else 'OLD'}.skill_id, {sign}
+        FROM vacancies v WHERE v.internal_id = {'NEW' if sign > 0 else 'OLD'}.vacancy_id
+        ON CONFLICT DO UPDATE SET vacancy_count = vacancy_count + excluded.vacancy_count;'''
+
+
+class MarketStats:
+    """
+    Агрегаты для дашбордов и ноутбука, которые поддерживаются триггерами SQLite
+    при каждой вставке / обновлении / закрытии вакансии (в т.ч. пакетным UPSERT):
+
+    * stats_active - число активных и всех вакансий по (country, role, level, source);
+      snapshot_daily() раз в запуск копирует его в stats_daily_active (дневная история);
+    * stats_salary - count / суммы / min / max зарплат по (country, role, level, city);
+    * stats_skills_monthly - число вакансий с навыком по месяцу first_seen.
+
+    role - search_query, city - нормализованный город (vacancies.city).
+    Если база менялась в обход триггеров (или они появились у уже заполненной базы),
+    rebuild() пересчитывает все из vacancies одним проходом.
+    """
+
+    def __init__(self, db_path="data/jobs_database.sqlite"):
+        self.db_path = db_path
+        self._init_tables()
+
+    def _init_tables(self):
+        with get_connection(self.db_path) as conn:
+            cursor = conn.cursor()
+            is_new = not cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'stats_active'").fetchone()
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS stats_active (
+                    country TEXT, role TEXT, level TEXT, source TEXT,
+                    active_count INTEGER DEFAULT 0,
+                    total_count INTEGER DEFAULT 0,
+                    PRIMARY KEY (country, role, level, source)
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS stats_daily_active (
+                    day TEXT, country TEXT, role TEXT, level TEXT, source TEXT,
+                    active_count INTEGER,
+                    PRIMARY KEY (day, country, role, level, source)
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS stats_salary (
+                    country TEXT, role TEXT, level TEXT, city TEXT,
+                    salary_count INTEGER DEFAULT 0,
+                    salary_min_sum REAL DEFAULT 0,
+                    salary_max_sum REAL DEFAULT 0,
+                    salary_min REAL,
+                    salary_max REAL,
+                    PRIMARY KEY (country, role, level, city)
+                ) WITHOUT ROWID
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS stats_skills_monthly (
+                    month TEXT, skill_id INTEGER,
+                    vacancy_count INTEGER DEFAULT 0,
+                    PRIMARY KEY (month, skill_id)
+                ) WITHOUT ROWID
+            ''')
+            # Пересчет min/max группы при уходе крайнего значения
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_vacancies_salary_group
+                ON vacancies(country_api, search_query, search_level, city) WHERE salary_min IS NOT NULL
+            ''')
+
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_stats_vacancy_insert AFTER INSERT ON vacancies
+                BEGIN {_add_active('NEW', 1)} {_add_salary('NEW')}
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_stats_vacancy_delete AFTER DELETE ON vacancies
+                BEGIN {_add_active('OLD', -1)} {_remove_salary('OLD')}
+                END
+            ''')
+            # UPDATE OF срабатывает на каждый UPSERT (is_active = 1 в SET), поэтому фильтр WHEN
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_stats_vacancy_active AFTER UPDATE OF
+                    is_active, source, country_api, search_query, search_level ON vacancies
+                WHEN OLD.is_active IS NOT NEW.is_active OR OLD.source IS NOT NEW.source
+                    OR OLD.country_api IS NOT NEW.country_api OR OLD.search_query IS NOT NEW.search_query
+                    OR OLD.search_level IS NOT NEW.search_level
+                BEGIN {_add_active('OLD', -1)} {_add_active('NEW', 1)}
+                    DELETE FROM stats_active WHERE total_count <= 0 AND {_ACTIVE_MATCH.format(r='OLD')};
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_stats_vacancy_salary AFTER UPDATE OF
+                    salary_min, salary_max, country_api, search_query, search_level, city ON vacancies
+                WHEN OLD.salary_min IS NOT NEW.salary_min OR OLD.salary_max IS NOT NEW.salary_max
+                    OR OLD.country_api IS NOT NEW.country_api OR OLD.search_query IS NOT NEW.search_query
+                    OR OLD.search_level IS NOT NEW.search_level OR OLD.city IS NOT NEW.city
+                BEGIN {_remove_salary('OLD')} {_add_salary('NEW')}
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_stats_skill_insert AFTER INSERT ON vacancy_skills
+                BEGIN {_skill_month(1)}
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS trg_stats_skill_delete AFTER DELETE ON vacancy_skills
+                BEGIN {_skill_month(-1)}
+                    DELETE FROM stats_skills_monthly WHERE skill_id = OLD.skill_id AND vacancy_count <= 0;
+                END
+            ''')
+            if is_new:
+                self._rebuild(cursor)
+            conn.commit()
+
+    def _rebuild(self, cursor):
+        cursor.execute("DELETE FROM stats_active")
+        cursor.execute("DELETE FROM stats_salary")
+        cursor.execute("DELETE FROM stats_skills_monthly")
+        cursor.execute(f'''
+            INSERT INTO stats_active (country, role, level, source, active_count, total_count)
+            SELECT {_ACTIVE_KEY.format(r='v')}, SUM(COALESCE(v.is_active, 1) = 1), COUNT(*)
+            FROM vacancies v GROUP BY 1, 2, 3, 4
+        ''')
+        cursor.execute(f'''
+            INSERT INTO stats_salary (country, role, level, city, salary_count, salary_min_sum, salary_max_sum, salary_min, salary_max)
+            SELECT {_SALARY_KEY.format(r='v')}, COUNT(*), SUM(v.salary_min), SUM({_SALARY_TOP.format(r='v')}),
+                   MIN(v.salary_min), MAX({_SALARY_TOP.format(r='v')})
+            FROM vacancies v WHERE v.salary_min IS NOT NULL GROUP BY 1, 2, 3, 4
+        ''')
+        cursor.execute('''
+            INSERT INTO stats_skills_monthly (month, skill_id, vacancy_count)
+            SELECT COALESCE(substr(v.first_seen, 1, 7), ''), vs.skill_id, COUNT(*)
+            FROM vacancy_skills vs JOIN vacancies v ON v.internal_id = vs.vacancy_id
+            GROUP BY 1, 2
+        ''')
+
+    def rebuild(self):
+        """Полный пересчет агрегатов из vacancies / vacancy_skills."""
+        with get_connection(self.db_path) as conn:
+            self._rebuild(conn.cursor())
+            conn.commit()
+
+    def clear(self):
+        with get_connection(self.db_path) as conn:
+            for table in ("stats_active", "stats_daily_active", "stats_salary", "stats_skills_monthly"):
+                conn.execute(f"DELETE FROM {table}")
+            conn.commit()
+
+    def snapshot_daily(self, day=None):
+        """Записывает текущие активные счетчики как точку дневной истории (повторный вызов за день перезаписывает)."""
+        day = day or datetime.now().strftime("%Y-%m-%d")
+        with get_connection(self.db_path) as conn:
+            conn.execute("DELETE FROM stats_daily_active WHERE day = ?", (day,))
+            conn.execute('''
+                INSERT INTO stats_daily_active (day, country, role, level, source, active_count)
+                SELECT ?, country, role, level, source, active_count FROM stats_active WHERE active_count > 0
+            ''', (day,))
+            conn.commit()
+
+    @staticmethod
+    def _filters(filters):
+        where, params = [], []
+        for column, value in filters.items():
+            if value:
+                where.append(f"{column} = ?")
+                params.append(value.upper() if column == "country" else value)
+        return (" WHERE " + " AND ".join(where)) if where else "", params
+
+    def get_active_counts(self, by=("source",), country=None, role=None, level=None, source=None):
+        """Активные и все вакансии, сгруппированные по колонкам `by` (country, role, level, source)."""
+        import pandas as pd
+        columns = ", ".join(by)
+        where, params = self._filters({"country": country, "role": role, "level": level, "source": source})
+        sql = (f"SELECT {columns}, SUM(active_count) AS active_count, SUM(total_count) AS total_count "
+               f"FROM stats_active{where} GROUP BY {columns} ORDER BY total_count DESC")
+        with get_connection(self.db_path) as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def get_daily_active(self, country=None, role=None, level=None, source=None):
+        """Дневная история числа активных вакансий (сумма по выбранным фильтрам)."""
+        import pandas as pd
+        where, params = self._filters({"country": country, "role": role, "level": level, "source": source})
+        sql = f"SELECT day, SUM(active_count) AS active_count FROM stats_daily_active{where} GROUP BY day ORDER BY day"
+        with get_connection(self.db_path) as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def get_salary_stats(self, by=("city",), country=None, role=None, level=None, city=None, min_count=1):
+        """Зарплаты по группам `by` (country, role, level, city): count, средние min/max/avg, крайние значения."""
+        import pandas as pd
+        columns = ", ".join(by)
+        where, params = self._filters({"country": country, "role": role, "level": level, "city": city})
+        sql = f'''
+            SELECT {columns}, SUM(salary_count) AS salary_count,
+                   SUM(salary_min_sum) / SUM(salary_count) AS salary_min_avg,
+                   SUM(salary_max_sum) / SUM(salary_count) AS salary_max_avg,
+                   (SUM(salary_min_sum) + SUM(salary_max_sum)) / (2.0 * SUM(salary_count)) AS salary_avg,
+                   MIN(salary_min) AS salary_min, MAX(salary_max) AS salary_max
+            FROM stats_salary{where}
+            GROUP BY {columns} HAVING SUM(salary_count) >= ?
+            ORDER BY salary_avg DESC
+        '''
+        with get_connection(self.db_path) as conn:
+            return pd.read_sql_query(sql, conn, params=params + [min_count])
+
+    def get_skill_trends(self, since=None, limit=20):
+        """Помесячное число вакансий по навыкам (топ `limit` навыков за период)."""
+        import pandas as pd
+        since_sql = "WHERE m.month >= ?" if since else ""
+        params = [since[:7]] if since else []
+        sql = f'''
+            WITH top AS (
+                SELECT m.skill_id FROM stats_skills_monthly m {since_sql}
+                GROUP BY m.skill_id ORDER BY SUM(m.vacancy_count) DESC LIMIT ?
+            )
+            SELECT m.month, s.name AS skill, m.vacancy_count
+            FROM stats_skills_monthly m
+            JOIN top ON top.skill_id = m.skill_id
+            JOIN skills s ON s.id = m.skill_id
+            {since_sql}
+            ORDER BY m.month, m.vacancy_count DESC
+        '''
+        with get_connection(self.db_path) as conn:
+            return pd.read_sql_query(sql, conn, params=params + [limit] + params)
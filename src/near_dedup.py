@@ -0,0 +1,175 @@
+import zlib
+import time
+import numpy as np
+from data_utils import clean_text
+from db_connection import get_connection
+
+
+# Универсальное хэширование (a*x + b) mod p: p < 2^31, поэтому a*x помещается в uint64
+_PRIME = np.uint64((1 << 31) - 1)
+
+
+class NearDuplicateDetector:
+    """
+    Поиск почти-дубликатов вакансий, которые точная сигнатура (title|company|location)
+    не склеивает: другой вариант компании у StepStone/Xing, слегка измененный заголовок.
+
+    1. MinHash: текст (заголовок + описание, clean_text) режется на шинглы по shingle_size
+       слов; для каждой из num_perm хэш-функций берется минимум. Доля совпавших позиций
+       двух подписей оценивает коэффициент Жаккара их шинглов. Подписи хранятся в
+       vacancy_minhash и пересчитываются только для новых / измененных описаний.
+    2. LSH: подпись делится на bands полос; вакансии с одинаковой полосой - кандидаты.
+       Внутри корзины каждый кандидат сравнивается только с первым элементом, поэтому
+       работа линейна по числу вакансий, попарного сравнения всех со всеми нет.
+    3. Кандидаты с оценкой Жаккара >= threshold объединяются (union-find) в кластеры;
+       результат перезаписывается в vacancy_clusters (cluster_id - самая ранняя вакансия).
+
+    Вакансии с коротким текстом (меньше min_shingles шинглов, обычно это описание-заголовок
+    агрегатора) не сравниваются: у них слишком мало текста, чтобы отличить разные вакансии.
+    """
+
+    def __init__(self, db_path="data/jobs_database.sqlite", num_perm=128, bands=16, threshold=0.8,
+                 shingle_size=3, min_shingles=30, seed=1, batch_size=2000):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.db_path = db_path
+        self.num_perm = num_perm
+        self.bands = bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.min_shingles = min_shingles
+        self.batch_size = batch_size
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, int(_PRIME), size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, int(_PRIME), size=num_perm).astype(np.uint64)
+        # Подписи, посчитанные с другими параметрами, несравнимы - такие пересчитываются
+        self.params = f"{num_perm}:{shingle_size}:{seed}"
+
+    def minhash(self, title, description):
+        """MinHash-подпись (uint32[num_perm]) или None, если текста слишком мало."""
+        words = clean_text(f"{title or ''} {description or ''}").split()
+        k = self.shingle_size
+        shingles = {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+        if len(shingles) < self.min_shingles:
+            return None
+        x = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        x %= _PRIME
+        return ((self._a[:, None] * x[None, :] + self._b[:, None]) % _PRIME).min(axis=1).astype(np.uint32)
+
+    def update_signatures(self):
+        """Считает подписи для вакансий, у которых их нет или изменилось описание. Возвращает их число."""
+        with get_connection(self.db_path) as conn:
+            conn.execute("DELETE FROM vacancy_minhash WHERE vacancy_id NOT IN (SELECT internal_id FROM vacancies)")
+            # Сначала только id (запись в vacancy_minhash во время чтения того же запроса недопустима),
+            # затем тексты порциями - в памяти не больше batch_size описаний
+            stale = [r[0] for r in conn.execute('''
+                SELECT t.vacancy_id FROM vacancy_texts t
+                LEFT JOIN vacancy_minhash m ON m.vacancy_id = t.vacancy_id
+                WHERE m.vacancy_id IS NULL OR m.content_hash IS NOT t.content_hash OR m.params IS NOT ?
+            ''', (self.params,))]
+            for i in range(0, len(stale), self.batch_size):
+                chunk = stale[i:i + self.batch_size]
+                rows = []
+                for vacancy_id, title, description, text_hash in conn.execute(f'''
+                    SELECT v.internal_id, v.title, vacancy_text(t.codec, t.body), t.content_hash
+                    FROM vacancies v JOIN vacancy_texts t ON t.vacancy_id = v.internal_id
+                    WHERE v.internal_id IN ({", ".join("?" * len(chunk))})
+                ''', chunk).fetchall():
+                    signature = self.minhash(title, description)
+                    rows.append((vacancy_id, text_hash, self.params,
+                                 signature.tobytes() if signature is not None else None))
+                conn.executemany('''
+                    INSERT INTO vacancy_minhash (vacancy_id, content_hash, params, minhash) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(vacancy_id) DO UPDATE SET
+                        content_hash = excluded.content_hash,
+                        params = excluded.params,
+                        minhash = excluded.minhash
+                ''', rows)
+                conn.commit()
+        return len(stale)
+
+    def _load_signatures(self):
+        where = "WHERE minhash IS NOT NULL AND params = ?"
+        with get_connection(self.db_path) as conn:
+            # Матрица подписей выделяется сразу: num_perm * 4 байта на вакансию, без промежуточных копий
+            count = conn.execute(f"SELECT COUNT(*) FROM vacancy_minhash {where}", (self.params,)).fetchone()[0]
+            ids = np.empty(count, dtype=np.int64)
+            signatures = np.empty((count, self.num_perm), dtype=np.uint32)
+            cursor = conn.execute(f"SELECT vacancy_id, minhash FROM vacancy_minhash {where} ORDER BY vacancy_id",
+                                  (self.params,))
+            n = 0
+            for vacancy_id, blob in cursor:
+                ids[n] = vacancy_id
+                signatures[n] = np.frombuffer(blob, dtype=np.uint32)
+                n += 1
+        return ids[:n], signatures[:n]
+
+    def _candidate_pairs(self, signatures):
+        """Пары (i, j) индексов с совпавшей полосой и оценкой Жаккара >= threshold."""
+        rows_per_band = self.num_perm // self.bands
+        # Полоса -> одно uint64 (коллизии не страшны: пары все равно проверяются по всей подписи)
+        weights = np.random.RandomState(7).randint(1, 1 << 62, size=rows_per_band, dtype=np.int64).astype(np.uint64)
+        pairs = set()
+        for band in range(self.bands):
+            part = signatures[:, band * rows_per_band:(band + 1) * rows_per_band].astype(np.uint64)
+            keys = (part * weights).sum(axis=1)
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            # Начало каждой корзины и ее первый элемент для всех позиций
+            starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+            heads = np.repeat(order[starts], np.diff(np.r_[starts, len(order)]))
+            members = order
+            mask = members != heads
+            heads, members = heads[mask], members[mask]
+            for i in range(0, len(members), 100_000):
+                h, m = heads[i:i + 100_000], members[i:i + 100_000]
+                similarity = (signatures[h] == signatures[m]).mean(axis=1)
+                keep = similarity >= self.threshold
+                pairs.update(zip(h[keep].tolist(), m[keep].tolist()))
+        return pairs
+
+    def run(self):
+        """Обновляет подписи и перестраивает vacancy_clusters. Возвращает статистику."""
+        started = time.time()
+        updated = self.update_signatures()
+        ids, signatures = self._load_signatures()
+
+        parent = {}
+
+        def find(x):
+            root = x
+            while parent.get(root, root) != root:
+                root = parent[root]
+            while parent.get(x, x) != root:
+                parent[x], x = root, parent[x]
+            return root
+
+        for i, j in self._candidate_pairs(signatures):
+            ri, rj = find(i), find(j)
+            if ri != rj:
+                # Корень - меньший индекс, т.е. самая ранняя вакансия (ids отсортированы)
+                parent[max(ri, rj)] = min(ri, rj)
+
+        clusters = {}
+        for i in list(parent):
+            clusters.setdefault(find(i), set()).add(i)
+        rows = []
+        for root, members in clusters.items():
+            members.add(root)
+            for i in members:
+                similarity = float((signatures[i] == signatures[root]).mean())
+                rows.append((int(ids[i]), int(ids[root]), round(similarity, 3)))
+
+        with get_connection(self.db_path) as conn:
+            conn.execute("DELETE FROM vacancy_clusters")
+            conn.executemany("INSERT INTO vacancy_clusters (vacancy_id, cluster_id, similarity) VALUES (?, ?, ?)", rows)
+            conn.commit()
+
+        stats = {
+            "signatures_updated": updated,
+            "compared": len(ids),
+            "clusters": len(clusters),
+            "duplicates": len(rows) - len(clusters),
+            "seconds": round(time.time() - started, 1),
+        }
+        return stats
@@ -0,0 +1,194 @@
+import time
+import pandas as pd
+from data_utils import get_job_signatures, normalize_location
+from database_manager import DatabaseManager, create_staging, select_staged_texts, write_staged_texts, unindex_vacancies
+from db_connection import get_connection
+
+
+class Resigner:
+    """
+    Пересчет сигнатур всей таблицы vacancies после изменения правил clean_text /
+    normalize_location (data_utils.py, gazetteer.py).
+
+    1. Сигнатуры и города считаются порциями по chunk_size строк векторно
+       (get_job_signatures: очистка колонками, каждое уникальное значение - один раз).
+    2. Строки, у которых новые сигнатуры совпали, сливаются в самую раннюю (меньший
+       internal_id) тем же UPSERT, что и save_vacancies: реальная зарплата важнее оценки
+       Adzuna, источник не-Adzuna важнее, более длинное описание заменяет короткое, url -
+       последний непустой. last_seen и is_active - максимум по группе, first_seen остается.
+    3. Навыки, перевод и кластеры слитых строк переносятся / удаляются, FTS-индекс и
+       статистика (триггеры MarketStats) обновляются в той же транзакции. Удаленные строки
+       попадают в vacancy_deletions (триггер DatabaseManager), и следующий --export выгружает
+       Parquet-датасет заново, а не дописывает изменения поверх слитых строк.
+
+    run(dry_run=True) только считает и возвращает отчет, ничего не меняя.
+    """
+
+    def __init__(self, db_path="data/jobs_database.sqlite", chunk_size=100_000):
+        self.db_path = db_path
+        self.chunk_size = chunk_size
+
+    def _compute(self, conn):
+        """DataFrame (internal_id, signature, new_signature, city, new_city) по всей таблице."""
+        parts = []
+        for chunk in pd.read_sql_query(
+            "SELECT internal_id, signature, title, company, location, city FROM vacancies ORDER BY internal_id",
+            conn, chunksize=self.chunk_size
+        ):
+            chunk["new_signature"] = get_job_signatures(chunk["title"], chunk["company"], chunk["location"])
+            codes, uniques = pd.factorize(chunk["location"], use_na_sentinel=False)
+            cities = pd.Series(uniques, dtype=object).map(lambda v: normalize_location(v if isinstance(v, str) else None))
+            chunk["new_city"] = cities.to_numpy()[codes]
+            parts.append(chunk[["internal_id", "signature", "new_signature", "city", "new_city"]])
+        if not parts:
+            return pd.DataFrame(columns=["internal_id", "signature", "new_signature", "city", "new_city"])
+        return pd.concat(parts, ignore_index=True)
+
+    def plan(self, df):
+        """Группы слияния {survivor_id: [loser_id, ...]} и строки со сменившейся сигнатурой / городом."""
+        collide = df[df.duplicated("new_signature", keep=False)]
+        # df отсортирован по internal_id, поэтому первая строка группы - самая ранняя
+        survivors = collide.groupby("new_signature", sort=False)["internal_id"].transform("first")
+        is_loser = collide["internal_id"] != survivors
+        losers = collide[is_loser].assign(survivor_id=survivors[is_loser])
+        merges = {}
+        for loser_id, survivor_id in zip(losers["internal_id"].tolist(), losers["survivor_id"].tolist()):
+            merges.setdefault(survivor_id, []).append(loser_id)
+        kept = df[~df["internal_id"].isin(losers["internal_id"])]
+        resigned = kept[kept["signature"] != kept["new_signature"]]
+        recity = kept[kept["city"].fillna("") != kept["new_city"]]
+        return merges, losers, resigned, recity
+
+    def _apply(self, conn, losers, resigned, recity):
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TEMP TABLE IF NOT EXISTS resign_losers (
+                internal_id INTEGER PRIMARY KEY, survivor_id INTEGER, signature TEXT
+            )
+        ''')
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS resign_signatures (internal_id INTEGER PRIMARY KEY, signature TEXT)")
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS resign_groups (survivor_id INTEGER PRIMARY KEY, last_seen TEXT, is_active INTEGER)")
+        for table in ("resign_losers", "resign_signatures", "resign_groups"):
+            cursor.execute(f"DELETE FROM {table}")
+        cursor.executemany("INSERT INTO resign_losers (internal_id, survivor_id, signature) VALUES (?, ?, ?)",
+                           zip(losers["internal_id"].tolist(), losers["survivor_id"].tolist(),
+                               losers["new_signature"].tolist()))
+        cursor.executemany("INSERT INTO resign_signatures (internal_id, signature) VALUES (?, ?)",
+                           zip(resigned["internal_id"].tolist(), resigned["new_signature"].tolist()))
+
+        # Итог группы, который UPSERT не выражает: самое позднее появление и активность
+        cursor.execute('''
+            INSERT INTO resign_groups (survivor_id, last_seen, is_active)
+            SELECT g.survivor_id, MAX(v.last_seen), MAX(COALESCE(v.is_active, 1))
+            FROM (SELECT internal_id, survivor_id FROM resign_losers
+                  UNION SELECT survivor_id, survivor_id FROM resign_losers) g
+            JOIN vacancies v ON v.internal_id = g.internal_id
+            GROUP BY g.survivor_id
+        ''')
+
+        # 1. Слитые строки -> staging в порядке internal_id (как если бы они пришли позже выжившей)
+        create_staging(cursor)
+        columns = DatabaseManager.VACANCY_COLUMNS
+        select = ", ".join(
+            "l.signature" if c == "signature" else "g.last_seen" if c == "last_seen" else f"v.{c}"
+            for c in (c.strip() for c in columns.split(","))
+        )
+        cursor.execute(f'''
+            INSERT INTO staging_vacancies ({DatabaseManager.STAGING_COLUMNS})
+            SELECT {select}, t.content_hash, t.codec, t.body
+            FROM resign_losers l
+            JOIN vacancies v ON v.internal_id = l.internal_id
+            JOIN resign_groups g ON g.survivor_id = l.survivor_id
+            LEFT JOIN vacancy_texts t ON t.vacancy_id = l.internal_id
+            ORDER BY l.internal_id
+        ''')
+
+        # 2. Что не переносит UPSERT: перевод, навыки (объединение); затем удаляем слитые строки
+        cursor.execute('''
+            UPDATE vacancies SET
+                translated_title = COALESCE(translated_title, (
+                    SELECT v.translated_title FROM resign_losers l JOIN vacancies v ON v.internal_id = l.internal_id
+                    WHERE l.survivor_id = vacancies.internal_id AND v.translated_title IS NOT NULL
+                    ORDER BY l.internal_id LIMIT 1)),
+                extracted_skills = COALESCE(NULLIF(extracted_skills, ''), (
+                    SELECT v.extracted_skills FROM resign_losers l JOIN vacancies v ON v.internal_id = l.internal_id
+                    WHERE l.survivor_id = vacancies.internal_id AND v.extracted_skills != ''
+                    ORDER BY l.internal_id LIMIT 1))
+            WHERE internal_id IN (SELECT survivor_id FROM resign_losers)
+        ''')
+        cursor.execute('''
+            INSERT OR IGNORE INTO vacancy_skills (vacancy_id, skill_id)
+            SELECT l.survivor_id, s.skill_id FROM resign_losers l JOIN vacancy_skills s ON s.vacancy_id = l.internal_id
+        ''')
+        unindex_vacancies(cursor, "SELECT internal_id FROM resign_losers")
+        loser_ids = "SELECT internal_id FROM resign_losers"
+        cursor.execute(f"DELETE FROM vacancy_skills WHERE vacancy_id IN ({loser_ids})")
+        cursor.execute(f"DELETE FROM vacancy_texts WHERE vacancy_id IN ({loser_ids})")
+        cursor.execute(f"DELETE FROM vacancy_minhash WHERE vacancy_id IN ({loser_ids})")
+        # Кластер, чьим представителем была слитая строка, пересоберет следующий --dedup
+        cursor.execute(f"DELETE FROM vacancy_clusters WHERE vacancy_id IN ({loser_ids}) OR cluster_id IN ({loser_ids})")
+        cursor.execute(f"DELETE FROM vacancies WHERE internal_id IN ({loser_ids})")
+
+        # 3. Новые сигнатуры в два шага: новая сигнатура одной строки может быть старой у другой
+        changed = "SELECT internal_id FROM resign_signatures"
+        cursor.execute(f"UPDATE vacancies SET signature = 'resign:' || internal_id WHERE internal_id IN ({changed})")
+        cursor.execute(f'''
+            UPDATE vacancies SET signature = (
+                SELECT r.signature FROM resign_signatures r WHERE r.internal_id = vacancies.internal_id
+            ) WHERE internal_id IN ({changed})
+        ''')
+
+        # 4. Слияние по правилам save_vacancies и описания (с FTS)
+        select_staged_texts(cursor)
+        cursor.execute(DatabaseManager.UPSERT_SQL.format(
+            columns=columns + ", updated_at",
+            values=f"SELECT {columns}, datetime('now') FROM staging_vacancies WHERE true ORDER BY seq"
+        ))
+        write_staged_texts(cursor)
+        cursor.execute('''
+            UPDATE vacancies SET is_active = (SELECT g.is_active FROM resign_groups g WHERE g.survivor_id = vacancies.internal_id)
+            WHERE internal_id IN (SELECT survivor_id FROM resign_groups)
+        ''')
+
+        # 5. Город (ключ зарплатной статистики; триггер MarketStats переносит суммы)
+        cursor.executemany("UPDATE vacancies SET city = ? WHERE internal_id = ?",
+                           zip(recity["new_city"].tolist(), recity["internal_id"].tolist()))
+        conn.commit()
+
+    def run(self, dry_run=False, report_limit=10):
+        """
+        Пересчитывает сигнатуры и сливает совпавшие строки. Возвращает статистику:
+        rows, resigned (сменили сигнатуру), merged (удалено слиянием), groups, cities, seconds, merges.
+        """
+        started = time.time()
+        with get_connection(self.db_path) as conn:
+            df = self._compute(conn)
+            merges, losers, resigned, recity = self.plan(df)
+            if not dry_run and (merges or len(resigned) or len(recity)):
+                # Без триггера надгробий инкрементальный --export не узнал бы о слитых строках
+                if merges and not conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'trg_vacancies_deleted'"
+                ).fetchone():
+                    raise RuntimeError("trg_vacancies_deleted is missing: open the database with DatabaseManager first")
+                self._apply(conn, losers, resigned, recity)
+            sample = list(merges.items())[:report_limit]
+            if sample:
+                ids = [i for survivor, group in sample for i in [survivor] + group]
+                titles = dict(conn.execute(
+                    f"SELECT internal_id, title || ' | ' || COALESCE(company, '?') || ' | ' || COALESCE(location, '?') "
+                    f"FROM vacancies WHERE internal_id IN ({', '.join('?' * len(ids))})", ids
+                ).fetchall())
+                for survivor, group in sample:
+                    print(f"  [~] #{survivor} <- {', '.join(f'#{i}' for i in group)}: {titles.get(survivor, '')}")
+                if len(merges) > len(sample):
+                    print(f"  ... and {len(merges) - len(sample)} more groups")
+
+        return {
+            "rows": len(df),
+            "resigned": len(resigned),
+            "merged": len(losers),
+            "groups": len(merges),
+            "cities": len(recity),
+            "seconds": round(time.time() - started, 1),
+            "merges": merges,
+        }
@@ -0,0 +1,72 @@
+import time
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class ScrapeScheduler:
+    """
+    Runs independent scrape units (source, country, query) concurrently.
+
+    Each unit is a dict with at least a 'source' key. Units of the same source
+    are capped by `source_limits`, the total by `max_workers`. The network part
+    (`worker`) runs in a thread pool, while `on_result` is always called in the
+    calling thread, so database writes stay single-threaded. An exception from
+    either one counts the unit as failed and goes to `on_error`.
+    """
+
+    def __init__(self, max_workers=8, source_limits=None, default_limit=1):
+        self.max_workers = max(1, max_workers)
+        self.source_limits = source_limits or {}
+        self.default_limit = default_limit
+
+    def _limit(self, source):
+        return max(1, self.source_limits.get(source, self.default_limit))
+
+    def run(self, tasks, worker, on_result, on_error=None):
+        # Очереди задач по источникам (сохраняем исходный порядок внутри источника)
+        queues = OrderedDict()
+        for task in tasks:
+            queues.setdefault(task['source'], deque()).append(task)
+
+        running = {source: 0 for source in queues}
+        in_flight = {}
+        stats = {"done": 0, "failed": 0, "total": sum(len(q) for q in queues.values())}
+        started = time.time()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while True:
+                # Раздаем задачи по кругу между источниками, пока есть свободные слоты
+                submitted = True
+                while submitted and len(in_flight) < self.max_workers:
+                    submitted = False
+                    for source, queue in queues.items():
+                        if not queue or running[source] >= self._limit(source):
+                            continue
+                        if len(in_flight) >= self.max_workers:
+                            break
+                        task = queue.popleft()
+                        running[source] += 1
+                        in_flight[executor.submit(worker, task)] = task
+                        submitted = True
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = in_flight.pop(future)
+                    running[task['source']] -= 1
+                    try:
+                        on_result(task, future.result())
+                    except Exception as e:
+                        # Ошибка загрузки или сохранения одной задачи не останавливает остальные
+                        stats["failed"] += 1
+                        if on_error:
+                            on_error(task, e)
+                        else:
+                            print(f"    [!] Error in {task['source']}: {e}")
+                        continue
+                    stats["done"] += 1
+
+        stats["seconds"] = round(time.time() - started, 1)
+        return stats
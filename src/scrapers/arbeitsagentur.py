@@ -1,48 +1,58 @@
-import requests
-import time
+from scrapers.http_client import get_http_client
 
 class ArbeitsagenturScraper:
     def __init__(self):
-        # Using v5 as it is more stable currently
+        # Using v5 as it is more stable currently, v4 as backup.
+        # HttpClient remembers which one answered, so a dead v5 is not retried on every page.
         self.api_url = "https://rest.arbeitsagentur.de/jobboerse/jobsuche-service/pc/v5/jobs"
+        self.api_urls = [self.api_url, self.api_url.replace("/v5/", "/v4/")]
         self.headers = {
             "X-API-Key": "jobboerse-jobsuche",
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/133.0.0.0 Safari/537.36"
         }
+        self.client = get_http_client()
 
-    def fetch_jobs(self, query, pages=1, country="DE", location="Deutschland"):
+    def _normalize_location(self, location):
         # Fix: AA API is extremely sensitive to 'wo'. 
         # 'Germany' or 'Remote/Deutschland' returns 0 results.
         if not location or location.lower() in ["deutschland", "germany", "remote", "remote/deutschland"]:
-            location = "Deutschland"
+            return "Deutschland"
+        return location
+
+    def fetch_page(self, query, page=1, country="DE", location="Deutschland"):
+        """Загружает одну страницу выдачи. Возвращает (jobs, has_more)."""
+        params = {"was": query, "wo": self._normalize_location(location), "page": page, "size": 50}
+        response = self.client.get_first_working("aa_api", self.api_urls, params=params, headers=self.headers, timeout=15,
+                                                 cache_source="arbeitsagentur")
+        # 404 - выдача закончилась; 403/429/5xx - исключение, страница остается в очереди для --resume
+        if response.status_code == 404: return [], False
+        response.raise_for_status()
+        
+        items = response.json().get('stellenangebote', [])
+        page_jobs = []
+        for item in items:
+            ref_nr = item.get('refnr')
+            page_jobs.append({
+                'id': ref_nr,
+                'title': item.get('titel'),
+                'company': item.get('arbeitgeber', 'Unknown'),
+                'location': item.get('arbeitsort', {}).get('ort', 'Deutschland'),
+                'url': f"https://www.arbeitsagentur.de/jobsuche/jobdetail/{ref_nr}",
+                'created': item.get('aktuelleVeroeffentlichungsdatum'),
+                'source': 'arbeitsagentur',
+                'country_search': country.upper()
+            })
+        return page_jobs, len(items) >= 50
 
+    def fetch_jobs(self, query, pages=1, country="DE", location="Deutschland"):
+        """Все страницы подряд (без остановки на известных вакансиях - ее делает пайплайн в main.py)."""
         all_jobs = []
         for page in range(1, pages + 1):
-            params = {"was": query, "wo": location, "page": page, "size": 50}
             try:
-                response = requests.get(self.api_url, params=params, headers=self.headers, timeout=15)
-                # If v5 fails, try v4 as backup
-                if response.status_code != 200:
-                    alt_url = self.api_url.replace("/v5/", "/v4/")
-                    response = requests.get(alt_url, params=params, headers=self.headers, timeout=15)
-                    if response.status_code != 200: break
-                
-                items = response.json().get('stellenangebote', [])
-                for item in items:
-                    ref_nr = item.get('refnr')
-                    all_jobs.append({
-                        'id': ref_nr,
-                        'title': item.get('titel'),
-                        'company': item.get('arbeitgeber', 'Unknown'),
-                        'location': item.get('arbeitsort', {}).get('ort', 'Deutschland'),
-                        'url': f"https://www.arbeitsagentur.de/jobsuche/jobdetail/{ref_nr}",
-                        'created': item.get('aktuelleVeroeffentlichungsdatum'),
-                        'source': 'arbeitsagentur',
-                        'country_search': country.upper()
-                    })
-                if len(items) < 50: break
-                time.sleep(1)
+                page_jobs, has_more = self.fetch_page(query, page, country, location)
             except Exception as e:
                 print(f"  [!] Arbeitsagentur error: {e}")
                 break
+            all_jobs.extend(page_jobs)
+            if not has_more: break
         return all_jobs
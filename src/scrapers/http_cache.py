@@ -0,0 +1,243 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+import tempfile
+import threading
+import configparser
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Параметры, которые не влияют на содержимое ответа (или являются секретами) - не входят в ключ
+IGNORED_PARAMS = {"app_id", "app_key", "utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content"}
+
+
+def normalize_url(url, params=None):
+    """Приводит URL к каноничному виду: нижний регистр хоста, без фрагмента, отсортированные параметры."""
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and not ((scheme == "https" and parts.port == 443) or (scheme == "http" and parts.port == 80)):
+        host = f"{host}:{parts.port}"
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query += [(k, str(v)) for k, v in (params.items() if isinstance(params, dict) else params)]
+    query = sorted((k, v) for k, v in query if k not in IGNORED_PARAMS)
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+class CachedResponse:
+    """Минимальная замена requests.Response для ответов, отданных из кэша."""
+
+    def __init__(self, url, status_code, content, headers, encoding=None):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.encoding = encoding or "utf-8"
+        self.from_cache = True
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        pass
+
+
+class ResponseCache:
+    """
+    Дисковый кэш HTTP-ответов в data/http_cache.
+
+    Индекс (URL-ключ -> метаданные, ETag/Last-Modified) лежит в SQLite, тела хранятся
+    сжатыми zlib-файлами, названными по sha256 содержимого, так что одинаковые
+    страницы под разными URL занимают место один раз. При превышении max_size
+    удаляются давно не читавшиеся записи (LRU).
+    """
+
+    def __init__(self, path="data/http_cache", max_size_mb=500, ttls=None, default_ttl=0):
+        self.path = path
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.lock = threading.Lock()
+        os.makedirs(os.path.join(self.path, "bodies"), exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(self.path, "index.sqlite"), check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                final_url TEXT,
+                status INTEGER,
+                etag TEXT,
+                last_modified TEXT,
+                content_type TEXT,
+                encoding TEXT,
+                content_hash TEXT,
+                size INTEGER,
+                stored_at REAL,
+                accessed_at REAL
+            )
+        ''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed_at)")
+        self.conn.commit()
+        self.total_size = self.conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT content_hash, size FROM entries)"
+        ).fetchone()[0]
+        self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "stored": 0, "evicted": 0}
+
+    def ttl_for(self, source):
+        return self.ttls.get(source, self.default_ttl)
+
+    def _body_path(self, content_hash):
+        return os.path.join(self.path, "bodies", content_hash[:2], content_hash)
+
+    def lookup(self, url, params=None):
+        """Возвращает (key, entry или None). entry - dict с метаданными и полем 'age'."""
+        key = hashlib.sha256(normalize_url(url, params).encode()).hexdigest()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT final_url, status, etag, last_modified, content_type, encoding, content_hash, stored_at "
+                "FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if not row or not os.path.exists(self._body_path(row[6])):
+            with self.lock:
+                self.stats["misses"] += 1
+            return key, None
+        return key, {
+            "final_url": row[0], "status": row[1], "etag": row[2], "last_modified": row[3],
+            "content_type": row[4], "encoding": row[5], "content_hash": row[6],
+            "age": time.time() - row[7]
+        }
+
+    def conditional_headers(self, entry):
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def load(self, key, entry, revalidated=False):
+        """
+        Читает тело из кэша и отдает CachedResponse; при revalidated=True продлевает срок жизни.
+        Если тело успели вытеснить после lookup() (или файл поврежден), запись удаляется
+        и возвращается None - это промах, страницу нужно загрузить заново.
+        """
+        try:
+            with open(self._body_path(entry["content_hash"]), "rb") as f:
+                content = zlib.decompress(f.read())
+        except (FileNotFoundError, zlib.error):
+            with self.lock:
+                # Запись могли уже перезаписать новым телом (store из другого потока) - ее не трогаем
+                self.conn.execute("DELETE FROM entries WHERE key = ? AND content_hash = ?",
+                                  (key, entry["content_hash"]))
+                self.conn.commit()
+                self._drop_body_if_orphan(entry["content_hash"])
+                self.stats["misses"] += 1
+            return None
+        now = time.time()
+        with self.lock:
+            if revalidated:
+                self.conn.execute("UPDATE entries SET stored_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+                self.stats["revalidated"] += 1
+            else:
+                self.conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+                self.stats["hits"] += 1
+            self.conn.commit()
+        headers = {"Content-Type": entry["content_type"] or ""}
+        return CachedResponse(entry["final_url"], entry["status"], content, headers, entry["encoding"])
+
+    def store(self, key, url, response):
+        """Сохраняет успешный (200) ответ вместе с валидаторами."""
+        if response.status_code != 200:
+            return
+        content = response.content or b""
+        content_hash = hashlib.sha256(content).hexdigest()
+        body_path = self._body_path(content_hash)
+        # Сжатие - вне блокировки; запись файла и индекса - под ней, чтобы два потока с одним
+        # телом не мешали друг другу и размер тела учитывался один раз
+        compressed = None if os.path.exists(body_path) else zlib.compress(content, 6)
+        now = time.time()
+        with self.lock:
+            is_new_body = not self.conn.execute(
+                "SELECT 1 FROM entries WHERE content_hash = ? LIMIT 1", (content_hash,)
+            ).fetchone()
+            if not os.path.exists(body_path):
+                if compressed is None:
+                    compressed = zlib.compress(content, 6)
+                os.makedirs(os.path.dirname(body_path), exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(body_path), suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(compressed)
+                os.replace(tmp_path, body_path)
+            size = os.path.getsize(body_path)
+            old = self.conn.execute("SELECT content_hash FROM entries WHERE key = ?", (key,)).fetchone()
+            self.conn.execute('''
+                INSERT OR REPLACE INTO entries (key, url, final_url, status, etag, last_modified, content_type,
+                                                encoding, content_hash, size, stored_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (key, url, response.url, response.status_code, response.headers.get("ETag"),
+                  response.headers.get("Last-Modified"), response.headers.get("Content-Type"),
+                  response.encoding, content_hash, size, now, now))
+            self.conn.commit()
+            if is_new_body:
+                self.total_size += size
+            if old and old[0] != content_hash:
+                self._drop_body_if_orphan(old[0])
+            self.stats["stored"] += 1
+            if self.total_size > self.max_size:
+                self._evict()
+
+    def invalidate(self, url, params=None):
+        """Удаляет запись (например, если в ответе оказалась капча)."""
+        key = hashlib.sha256(normalize_url(url, params).encode()).hexdigest()
+        with self.lock:
+            row = self.conn.execute("SELECT content_hash FROM entries WHERE key = ?", (key,)).fetchone()
+            self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.conn.commit()
+            if row:
+                self._drop_body_if_orphan(row[0])
+
+    def _drop_body_if_orphan(self, content_hash):
+        still_used = self.conn.execute("SELECT 1 FROM entries WHERE content_hash = ? LIMIT 1", (content_hash,)).fetchone()
+        path = self._body_path(content_hash)
+        if not still_used and os.path.exists(path):
+            self.total_size -= os.path.getsize(path)
+            os.remove(path)
+
+    def _evict(self):
+        # Удаляем самые давно читанные записи, пока не опустимся до 90% лимита
+        target = int(self.max_size * 0.9)
+        rows = self.conn.execute("SELECT key, content_hash FROM entries ORDER BY accessed_at ASC").fetchall()
+        for key, content_hash in rows:
+            if self.total_size <= target:
+                break
+            self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._drop_body_if_orphan(content_hash)
+            self.stats["evicted"] += 1
+        self.conn.commit()
+
+
+def load_cache_settings(config_path=None):
+    """Читает секцию [HttpCache] из settings.ini. Возвращает None, если кэш выключен."""
+    if config_path is None:
+        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        config_path = os.path.join(base_dir, 'settings.ini')
+    config = configparser.ConfigParser()
+    config.read(config_path, encoding='utf-8')
+    if not config.getboolean('HttpCache', 'enabled', fallback=False):
+        return None
+
+    reserved = {'enabled', 'path', 'max_size_mb', 'default_ttl'}
+    ttls = {k: config.getint('HttpCache', k) for k, _ in config.items('HttpCache') if k not in reserved}
+    return {
+        "path": config.get('HttpCache', 'path', fallback='data/http_cache'),
+        "max_size_mb": config.getfloat('HttpCache', 'max_size_mb', fallback=500),
+        "default_ttl": config.getint('HttpCache', 'default_ttl', fallback=0),
+        "ttls": ttls
+    }
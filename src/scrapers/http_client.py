@@ -0,0 +1,151 @@
+import time
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
+from scrapers.rate_limiter import get_rate_limiter
+from scrapers.http_cache import ResponseCache, load_cache_settings
+from instrumentation import METRICS
+
+# urllib3 умеет распаковывать brotli только если установлен brotli/brotlicffi
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+
+class HttpClient:
+    """
+    Общий HTTP-клиент для всех скраперов и DescriptionManager.
+
+    Одна requests.Session с пулом keep-alive соединений на каждый хост
+    (urllib3 держит отдельный pool на (scheme, host, port)), прозрачной
+    распаковкой gzip/brotli и общим rate limiter'ом перед каждым запросом.
+    Если включен [HttpCache], ответы с cache_source кэшируются на диске
+    и перепроверяются условными GET (ETag / Last-Modified).
+    """
+
+    def __init__(self, pool_connections=20, pool_maxsize=10, limiter=None, cache=None):
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self.session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+        self.limiter = limiter or get_rate_limiter()
+        if cache is None:
+            settings = load_cache_settings()
+            cache = ResponseCache(**settings) if settings else None
+        self.cache = cache
+        self.lock = threading.Lock()
+        self.host_stats = {}
+        # Какой из URL-кандидатов сработал в последний раз (например, версия API Arbeitsagentur)
+        self.preferred = {}
+
+    def _record(self, url, response=None, error=False, cache_hit=False, seconds=0.0):
+        host = urlparse(url).hostname or ""
+        METRICS.record_request(host, status=response.status_code if response is not None else None,
+                               nbytes=len(response.content or b"") if response is not None else 0,
+                               seconds=seconds, error=error, cache_hit=cache_hit)
+        with self.lock:
+            stats = self.host_stats.setdefault(host, {"requests": 0, "errors": 0, "bytes": 0, "cache_hits": 0})
+            if cache_hit:
+                stats["cache_hits"] += 1
+                return
+            stats["requests"] += 1
+            if error:
+                stats["errors"] += 1
+            elif response is not None:
+                stats["bytes"] += len(response.content or b"")
+
+    def get(self, url, params=None, headers=None, timeout=15, allow_redirects=True, rate_limit=True, cache_source=None):
+        """
+        GET через общий пул. `cache_source` (например 'stepstone' или 'descriptions')
+        выбирает TTL из [HttpCache]; без него или при TTL <= 0 кэш не используется.
+        """
+        ttl = self.cache.ttl_for(cache_source) if self.cache is not None and cache_source else 0
+        if ttl <= 0:
+            return self._fetch(url, params, headers, timeout, allow_redirects, rate_limit)
+
+        key, entry = self.cache.lookup(url, params)
+        if entry and entry["age"] < ttl:
+            cached = self.cache.load(key, entry)
+            if cached is not None:
+                self._record(url, cache_hit=True)
+                return cached
+            # Тело вытеснено между lookup и load - обычный промах
+            entry = None
+        request_headers = {**(headers or {}), **self.cache.conditional_headers(entry)} if entry else headers
+
+        response = self._fetch(url, params, request_headers, timeout, allow_redirects, rate_limit)
+        if response.status_code == 304 and entry:
+            cached = self.cache.load(key, entry, revalidated=True)
+            if cached is not None:
+                return cached
+            # 304 без тела в кэше бесполезен - запрашиваем страницу без условных заголовков
+            response = self._fetch(url, params, headers, timeout, allow_redirects, rate_limit)
+        self.cache.store(key, url, response)
+        return response
+
+    def _fetch(self, url, params, headers, timeout, allow_redirects, rate_limit):
+        if rate_limit:
+            self.limiter.acquire(url)
+        started = time.time()
+        try:
+            response = self.session.get(url, params=params, headers=headers, timeout=timeout, allow_redirects=allow_redirects)
+        except Exception:
+            self._record(url, error=True, seconds=time.time() - started)
+            raise
+        self._record(url, response, seconds=time.time() - started)
+        return response
+
+    def get_first_working(self, key, urls, **kwargs):
+        """
+        Пробует URL-кандидаты по очереди и запоминает первый, вернувший 200.
+        В следующий раз начинает сразу с него, а не с заведомо нерабочего.
+        """
+        start = self.preferred.get(key, 0)
+        order = [start] + [i for i in range(len(urls)) if i != start]
+        response = None
+        for i in order:
+            response = self.get(urls[i], **kwargs)
+            if response.status_code == 200:
+                if i != start:
+                    print(f"  [HTTP] {key}: switching to {urls[i]}")
+                self.preferred[key] = i
+                return response
+        return response
+
+    def pool_stats(self):
+        """Статистика по хостам: запросы, ошибки, байты, открыто соединений, простаивает в пуле."""
+        result = {host: dict(stats) for host, stats in self.host_stats.items()}
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats = result.setdefault(pool.host, {"requests": 0, "errors": 0, "bytes": 0, "cache_hits": 0})
+            stats["connections_opened"] = pool.num_connections
+            stats["pool_requests"] = pool.num_requests
+            stats["idle"] = pool.pool.qsize() if pool.pool is not None else 0
+        return result
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """Единственный на процесс HttpClient (создается лениво)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
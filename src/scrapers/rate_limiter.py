@@ -0,0 +1,119 @@
+import os
+import time
+import threading
+import configparser
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """
+    Классический token bucket: `rate` токенов в секунду, не больше `burst` про запас.
+    acquire() резервирует токен под замком, а спит уже вне его, поэтому
+    потоки, ждущие один хост, встают в очередь честно и не блокируют друг друга дольше нужного.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.waited = 0.0
+        self.acquired = 0
+
+    def acquire(self, tokens=1):
+        if self.rate <= 0:
+            return 0.0
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Токены могут уйти в минус - это и есть "бронь" для следующих потоков
+            self.tokens -= tokens
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.acquired += 1
+            self.waited += delay
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class HostRateLimiter:
+    """
+    Один лимитер на процесс: отдельный token bucket на каждый настроенный сайт.
+    Хост сопоставляется с настройками по суффиксу домена, т.е. 'stepstone.de'
+    покрывает и 'www.stepstone.de', и 'api.stepstone.de' - и у них один общий bucket.
+    Для неизвестных хостов используется 'default', bucket у каждого хоста свой.
+    """
+
+    def __init__(self, limits=None, default=(1.0, 1)):
+        self.limits = limits or {}
+        self.default = default
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def _settings_for(self, host):
+        """(ключ bucket'а, (rate, burst)): совпавший ключ настроек или сам хост."""
+        parts = host.split('.')
+        for i in range(len(parts) - 1):
+            key = '.'.join(parts[i:])
+            if key in self.limits:
+                return key, self.limits[key]
+        return host, self.default
+
+    def bucket(self, url_or_host):
+        host = (urlparse(url_or_host).hostname if '//' in url_or_host else url_or_host) or ''
+        host = host.lower()
+        key, (rate, burst) = self._settings_for(host)
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = TokenBucket(rate, burst)
+            return bucket
+
+    def acquire(self, url_or_host):
+        """Блокирует поток, пока для хоста не появится свободный токен."""
+        return self.bucket(url_or_host).acquire()
+
+    def get_stats(self):
+        with self.lock:
+            return {host: {"rate": b.rate, "burst": b.burst, "requests": b.acquired, "waited_s": round(b.waited, 1)}
+                    for host, b in self.buckets.items()}
+
+
+def _parse_limit(value):
+    rate, _, burst = value.partition(',')
+    return float(rate), int(burst) if burst.strip() else 1
+
+
+def load_rate_limits(config_path=None):
+    """Читает секцию [RateLimits] из settings.ini: `host = rate, burst`."""
+    if config_path is None:
+        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        config_path = os.path.join(base_dir, 'settings.ini')
+    config = configparser.ConfigParser()
+    config.read(config_path, encoding='utf-8')
+
+    limits = {}
+    default = (1.0, 1)
+    if config.has_section('RateLimits'):
+        for host, value in config.items('RateLimits'):
+            if host == 'default':
+                default = _parse_limit(value)
+            else:
+                limits[host.lower()] = _parse_limit(value)
+    return limits, default
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Общий для всех скраперов и DescriptionManager лимитер (создается лениво)."""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            limits, default = load_rate_limits()
+            _limiter = HostRateLimiter(limits, default)
+        return _limiter
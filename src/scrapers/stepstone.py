@@ -1,16 +1,16 @@
-import requests
-from bs4 import BeautifulSoup
-import time
-import re
+from scrapers.http_client import get_http_client
+from html_parsing import get_parse_pool, parse_stepstone_listing
 
 class StepStoneScraper:
     def __init__(self):
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
         }
+        self.client = get_http_client()
+        self.parser = get_parse_pool()
 
-    def fetch_jobs(self, query, pages=1, country="DE"):
-        all_jobs = []
+    def fetch_page(self, query, page=1, country="DE"):
+        """Загружает одну страницу выдачи. Возвращает (jobs, has_more)."""
         # Сопоставляем домены и локации
         domain_map = {
             "DE": {"url": "https://www.stepstone.de", "loc": "in-deutschland"},
@@ -19,54 +19,26 @@ class StepStoneScraper:
         }
         
         cfg = domain_map.get(country.upper(), domain_map["DE"])
+        search_query = query.replace(' ', '-')
+        url = f"{cfg['url']}/jobs/{search_query}/{cfg['loc']}?page={page}"
+        response = self.client.get(url, headers=self.headers, timeout=15, cache_source="stepstone")
+        # 404 - выдача закончилась; 403/429/5xx - исключение, страница остается в очереди для --resume
+        if response.status_code == 404: return [], False
+        response.raise_for_status()
         
+        # Разбор HTML - в пуле процессов, поток скрапера только ждет результат
+        page_jobs = self.parser.run(parse_stepstone_listing, response.text, cfg['url'], country)
+        return page_jobs, bool(page_jobs)
+
+    def fetch_jobs(self, query, pages=1, country="DE"):
+        """Все страницы подряд (без остановки на известных вакансиях - ее делает пайплайн в main.py)."""
+        all_jobs = []
         for page in range(1, pages + 1):
-            search_query = query.replace(' ', '-')
-            url = f"{cfg['url']}/jobs/{search_query}/{cfg['loc']}?page={page}"
             try:
-                response = requests.get(url, headers=self.headers, timeout=15)
-                if response.status_code != 200: break
-                
-                soup = BeautifulSoup(response.text, "html.parser")
-                for item in soup.find_all("article"):
-                    title_elem = item.find("h2")
-                    link_elem = item.find("a", href=re.compile(r"/stellenangebote--"))
-                    if not title_elem or not link_elem: continue
-                    
-                    job_url = link_elem["href"]
-                    if not job_url.startswith("http"): job_url = cfg['url'] + job_url
-                    
-                    # Извлечение ID
-                    id_match = re.search(r"-(\d+)\.html", job_url)
-                    job_id = id_match.group(1) if id_match else str(hash(job_url))
-                    
-                    company_elem = item.find("a", href=re.compile(r"/cmp/")) or \
-                                   item.find("div", {"data-test": "job-item-company-name"})
-                    company = company_elem.get_text(strip=True) if company_elem else "Unknown"
-                    
-                    location_elem = item.find("span", {"data-test": "job-item-location"}) or \
-                                    item.find("div", {"data-test": "job-item-location"})
-                    location = location_elem.get_text(strip=True) if location_elem else ("Germany" if country=="DE" else country)
-                    
-                    # Если компания Unknown, попробуем вытащить из URL
-                    if company == "Unknown" and "--" in job_url:
-                        # URL format: ...--Title-Location-Company--ID-inline.html
-                        url_parts = job_url.split("--")[1].split("-")
-                        if len(url_parts) > 2:
-                            # Usually the last few parts before the ID
-                            company = " ".join(url_parts[-3:-1]).replace("-", " ").title()
-
-                    all_jobs.append({
-                        "id": job_id,
-                        "title": title_elem.get_text(strip=True),
-                        "company": company,
-                        "location": location,
-                        "url": job_url,
-                        "source": "stepstone",
-                        "country_search": country.upper()
-                    })
-                time.sleep(2)
+                page_jobs, has_more = self.fetch_page(query, page, country)
             except Exception as e:
                 print(f"  [!] StepStone error: {e}")
                 break
+            all_jobs.extend(page_jobs)
+            if not has_more: break
         return all_jobs
@@ -0,0 +1,70 @@
+from db_connection import get_connection
+import threading
+from datetime import datetime, timedelta
+from data_utils import get_job_signature, get_job_fields
+
+
+class SignatureIndex:
+    """
+    In-memory множество сигнатур вакансий, которые мы уже видели недавно.
+
+    Загружается один раз из `vacancies.signature` перед скрапингом. Пайплайн
+    (main.py) проверяет каждую страницу выдачи через `is_page_known()` и прекращает
+    пагинацию, если страница (почти) целиком состоит из известных вакансий -
+    выдача на большинстве площадок отсортирована от новых к старым.
+
+    Вакансии с недокачанных страниц не получают свежий last_seen, поэтому
+    пары (source, country) с остановкой копятся в `cut_scopes`, и
+    mark_stale_vacancies закрывает их вакансии только по более длинному сроку.
+    """
+
+    def __init__(self, signatures=None, known_ratio=0.9):
+        self.signatures = set(signatures or [])
+        self.known_ratio = known_ratio
+        self.lock = threading.Lock()
+        self.pages_checked = 0
+        self.pages_cut = 0
+        self.cut_scopes = set()
+
+    @classmethod
+    def load(cls, db_path, max_age_days=3, known_ratio=0.9):
+        """
+        Грузит сигнатуры, у которых last_seen не старше `max_age_days`.
+        Более старые записи считаются "неизвестными": страница из них не
+        останавливает пагинацию, и их last_seen обновляется. Вакансии глубже
+        точки остановки это не спасает - см. cut_scopes.
+        """
+        since = (datetime.now() - timedelta(days=max_age_days)).strftime("%Y-%m-%d")
+        with get_connection(db_path) as conn:
+            rows = conn.execute("SELECT signature FROM vacancies WHERE is_active = 1 AND last_seen >= ?",
+                                (since,)).fetchall()
+        return cls((r[0] for r in rows), known_ratio=known_ratio)
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def __contains__(self, signature):
+        return signature in self.signatures
+
+    @staticmethod
+    def signature_for(job):
+        return get_job_signature(*get_job_fields(job))
+
+    def is_page_known(self, jobs):
+        """
+        Возвращает True, если доля известных вакансий на странице >= known_ratio.
+        Все вакансии страницы сразу добавляются в индекс, чтобы параллельные
+        запросы с похожими синонимами тоже могли остановиться раньше.
+        """
+        if not jobs:
+            return False
+        sigs = [self.signature_for(j) for j in jobs]
+        with self.lock:
+            known = sum(1 for s in sigs if s in self.signatures)
+            self.signatures.update(sigs)
+            self.pages_checked += 1
+            is_known = known / len(sigs) >= self.known_ratio
+            if is_known:
+                self.pages_cut += 1
+                self.cut_scopes.update((j.get('source'), j.get('country_search')) for j in jobs)
+        return is_known
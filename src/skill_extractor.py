@@ -1,41 +1,115 @@
-import sqlite3
+from db_connection import get_connection
+from database_manager import save_vacancy_skills
+import os
 import re
-import pandas as pd
-from collections import Counter
+import json
+import hashlib
+import multiprocessing
+from collections import deque, Counter
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, Future
+from instrumentation import METRICS
+
+# Версия логики извлечения: увеличивать при изменении кода extract_from_text / _is_garbage
+# (изменения skill_terms и blacklist учитываются автоматически, см. SkillExtractor.version)
+EXTRACTOR_VERSION = 3
+
+# Гендерные суффиксы ("Entwickler/in") и кандидаты для Discovery: CamelCase, аббревиатуры 3+,
+# термины с точкой / слешем (с буквами, чтобы не ловить числа)
+_GENDER_SUFFIX = re.compile(r'(/in|\*in|:in)\b', re.IGNORECASE)
+_DISCOVERY = re.compile(r'\b[A-Z][a-z]+[A-Z][A-Za-z0-9]*\b|\b[A-Z]{3,12}\b|\b[A-Za-z]{2,}[./][A-Za-z]{2,}\b')
+_NON_ALNUM = re.compile(r'[^a-z0-9]')
+_WORD = re.compile(r'\w+')
+
+# Правила _is_garbage, собранные один раз (раньше множества создавались при каждом вызове)
+_PRICE = re.compile(r'^[\d\s\.,€$£-]+$')
+_NON_DIGIT = re.compile(r'[^\d]')
+_DOMAIN = re.compile(r'\.(de|com|at|org|net|ag|me|io|info|pro|group|eu|uk|ch)$')
+_HR_KEYWORDS = frozenset({'ANSTELLUNG', 'VOLLZEIT', 'TEILZEIT', 'BACHELOR', 'MASTER', 'DIRECT', 'BEREICH', 'LEVEL'})
+_LEGAL_NOISE = frozenset({'CO.KG', 'GMBH', 'GMBH.CO', 'KARRIERE', 'BEWERBUNG'})
+_BELIEVABLE_3 = frozenset({
+    'API', 'CLI', 'GUI', 'NPM', 'SSH', 'SSL', 'TCP', 'UDP', 'XML', 'DOM', 'SDK',
+    'NLP', 'LLM', 'OCR', 'RPA', 'ERP', 'CRM', 'BI', 'CI', 'CD', 'UI', 'UX',
+    'AWS', 'SQL', 'SAP', 'GCP', 'ETL', 'GIT', 'VPC', 'IAM', 'CDN'
+})
+_MESSENGERS = frozenset({'whatsapp', 'telegram', 'viber', 'skype', 'linkedin', 'xing', 'facebook'})
+_DE_NOISE = frozenset({'DYNAMISCH', 'MOTIVIERT', 'ERFAHREN', 'EIGENSTÄNDIG', 'KREATIV', 'OFFEN', 'BUNT'})
+
+
+def _normalize_for_check(s):
+    return _NON_ALNUM.sub('', s.lower())
+
+
+# Экстрактор процесса-воркера (создается инициализатором пула, словари компилируются один раз на процесс)
+_worker_extractor = None
+
+
+def _init_worker(skill_terms, blacklist, garbage_cache_size):
+    """Инициализатор процесса пула: экстрактор с той же таксономией, что у родителя (и та же версия)."""
+    global _worker_extractor
+    _worker_extractor = SkillExtractor(db_path=None, workers=0, skill_terms=skill_terms, blacklist=blacklist,
+                                       garbage_cache_size=garbage_cache_size)
+
+
+def _extract_chunk(texts, extractor=None):
+    """
+    Порция: [(vacancy_id, текст)] -> ([(vacancy_id, [навыки])], (pid, hits, misses)). Без доступа к БД.
+    extractor=None - экстрактор процесса-воркера. Кэш вердиктов Discovery живет в экстракторе и копится
+    между порциями, поэтому счетчики накопительные - родитель берет последние по каждому pid.
+    """
+    extractor = extractor or _worker_extractor
+    results = [(vacancy_id, extractor.extract_from_text(text)) for vacancy_id, text in texts]
+    stats = extractor.garbage_cache_stats()
+    return results, (os.getpid(), stats["hits"], stats["misses"])
+
 
 class SkillExtractor:
-    def __init__(self, db_path="data/jobs_database.sqlite"):
+    def __init__(self, db_path="data/jobs_database.sqlite", workers=None, chunk_size=2000, commit_rows=50_000,
+                 garbage_cache_size=100_000, skill_terms=None, blacklist=None):
         self.db_path = db_path
-        self.skills_patterns = {
-            'Python': r'python',
-            'SQL': r'sql',
-            'R': r'\br\b',
-            'Power BI': r'power\s?bi',
-            'Tableau': r'tableau',
-            'Excel': r'excel',
-            'Machine Learning': r'machine\s?learning|ml',
-            'Deep Learning': r'deep\s?learning',
-            'Azure': r'azure',
-            'AWS': r'aws|amazon\s?web',
-            'GCP': r'gcp|google\s?cloud',
-            'SAP': r'\bsap\b',
-            'Airflow': r'airflow',
-            'Spark': r'spark',
-            'Pandas': r'pandas',
-            'MLOps': r'mlops',
-            'Docker': r'docker',
-            'Kubernetes': r'kubernetes|k8s',
-            'PyTorch': r'pytorch',
-            'TensorFlow': r'tensorflow',
-            'English': r'english|englisch',
-            'German': r'german|deutsch',
-            'ETL': r'\betl\b',
-            'NoSQL': r'nosql|mongodb|cassandra',
-            'CI/CD': r'ci/cd|jenkins|gitlab\s?ci',
-            'Git': r'\bgit\b|github|gitlab',
-            'Communication': r'communication|kommunikations',
-            'Problem Solving': r'problem\s?solving'
+        # Процессы для analyze_skills: None - число ядер - 1, 0 - в текущем процессе
+        self.workers = max(1, (os.cpu_count() or 2) - 1) if workers is None else workers
+        self.chunk_size = chunk_size
+        self.commit_rows = commit_rows
+        # Навык -> варианты написания (текст в нижнем регистре, слова через пробел). Варианты
+        # сравниваются с целыми словами текста: 'ml' не находится в "html", 'sql' - в "nosql",
+        # 'deutsch' - в "Deutschland". '*' в конце - префикс слова, для немецких составных слов
+        # ("Deutschkenntnisse", "Kommunikationsstärke"). Разделители внутри варианта ("ci/cd",
+        # "power-bi") - любые не-буквы, поэтому они записаны через пробел.
+        self.skill_terms = {
+            'Python': ['python*'],
+            'SQL': ['sql', 'mysql', 'postgresql', 'postgres', 'mssql', 'tsql'],
+            'R': ['r'],
+            'Power BI': ['power bi', 'powerbi'],
+            'Tableau': ['tableau'],
+            'Excel': ['excel'],
+            'Machine Learning': ['machine learning', 'machinelearning', 'ml'],
+            'Deep Learning': ['deep learning', 'deeplearning'],
+            'Azure': ['azure'],
+            'AWS': ['aws', 'amazon web'],
+            'GCP': ['gcp', 'google cloud', 'googlecloud'],
+            'SAP': ['sap'],
+            'Airflow': ['airflow'],
+            'Spark': ['spark', 'pyspark'],
+            'Pandas': ['pandas'],
+            'MLOps': ['mlops'],
+            'Docker': ['docker'],
+            'Kubernetes': ['kubernetes', 'k8s'],
+            'PyTorch': ['pytorch'],
+            'TensorFlow': ['tensorflow'],
+            'English': ['english', 'englisch*'],
+            'German': ['german', 'deutsch', 'deutschkenntnis*', 'deutschsprachig*'],
+            'ETL': ['etl'],
+            'NoSQL': ['nosql', 'mongodb', 'cassandra'],
+            'CI/CD': ['ci cd', 'jenkins', 'gitlab ci', 'gitlabci'],
+            'Git': ['git', 'github', 'gitlab'],
+            'Communication': ['communication*', 'kommunikations*'],
+            'Problem Solving': ['problem solving', 'problemsolving']
         }
+        # Своя таксономия (skill_terms / blacklist) вместо встроенной; от нее зависит self.version
+        if skill_terms is not None:
+            self.skill_terms = skill_terms
+        self._compile_matcher()
         self.blacklist = {
             'THE', 'AND', 'FOR', 'WITH', 'FROM', 'THIS', 'THAT', 'YOUR', 'WILL', 'TEAM', 'DATA', 'WORK', 
             'PLEASE', 'FOLLOW', 'SELECT', 'COUNTRY', 'HOME', 'OFFICE', 'JOB', 'TASKS', 'PROFILE', 
@@ -71,6 +145,55 @@ class SkillExtractor:
             'VL', 'VERMÖGENSWIRKSAME', 'LEISTUNGEN', 'ALTRSVERSORGUNG', 'PENSION', 'RETIREMENT',
             'KITA', 'CARE', 'SUPPORT', 'AMAZON', 'GOOGLE', 'MICROSOFT'
         }
+        if blacklist is not None:
+            self.blacklist = set(blacklist)
+        # Вердикты _is_garbage по кандидатам Discovery: одни и те же токены ("SQL", "PowerBI", "GmbH")
+        # повторяются в десятках тысяч вакансий, поэтому почти все проверки - попадания в LRU-кэш
+        self.garbage_cache_size = garbage_cache_size
+        self._garbage_verdict = lru_cache(maxsize=garbage_cache_size)(self._is_garbage)
+        # Версия, с которой записываются навыки: другая версия кода или словарей -> строки пересчитываются
+        taxonomy = json.dumps([self.skill_terms, sorted(self.blacklist)], sort_keys=True, ensure_ascii=False)
+        self.version = f"{EXTRACTOR_VERSION}.{hashlib.blake2b(taxonomy.encode('utf-8'), digest_size=4).hexdigest()}"
+
+    def _compile_matcher(self):
+        """
+        Варианты навыков -> один проход по словам текста (как автомат Ахо-Корасик, но по словам):
+        слова режутся одним findall, одиночные варианты находятся пересечением множеств.
+        Фразы и префиксы проверяются регулярным выражением с границами слова, и только если
+        в тексте есть их первое слово (для префикса - сама подстрока), т.е. почти никогда.
+        """
+        self._words = {}    # слово -> навыки
+        self._checks = []   # (навык, первое слово / префикс, это префикс?, regex)
+        for skill, terms in self.skill_terms.items():
+            for term in terms:
+                is_prefix = term.endswith('*')
+                words = term.rstrip('*').split()
+                if len(words) == 1 and not is_prefix:
+                    self._words.setdefault(words[0], set()).add(skill)
+                    continue
+                # Без (?<!\w) в начале: выражение с литералом в начале ищется намного быстрее,
+                # границу слова перед совпадением проверяет _match_skills
+                pattern = r'\W+'.join(map(re.escape, words)) + ('' if is_prefix else r'(?!\w)')
+                self._checks.append((skill, words[0], len(words) == 1, re.compile(pattern)))
+        self._known_norm = {skill: _normalize_for_check(skill) for skill in self.skill_terms}
+
+    def _match_skills(self, lower_text):
+        """Установленные навыки (skill_terms) в тексте в нижнем регистре."""
+        unique = set(_WORD.findall(lower_text))
+        found = set()
+        for word in self._words.keys() & unique:
+            found |= self._words[word]
+        for skill, head, is_prefix, pattern in self._checks:
+            if skill in found:
+                continue
+            if not (head in lower_text if is_prefix else head in unique):
+                continue
+            for m in pattern.finditer(lower_text):
+                before = lower_text[m.start() - 1] if m.start() else ' '
+                if not (before.isalnum() or before == '_'):
+                    found.add(skill)
+                    break
+        return found
 
     def _is_garbage(self, s):
         """Checks if a string looks like web junk, random IDs, URLs, emails or generic contact info."""
@@ -80,11 +203,11 @@ class SkillExtractor:
         if s_upper in self.blacklist: return True
 
         # 0. Reject pure numbers, prices, or ranges (e.g. 60.000, 75.000, 10-20)
-        if re.match(r'^[\d\s\.,€$£-]+$', s) and len(re.sub(r'[^\d]', '', s)) >= 3:
+        if _PRICE.match(s) and len(_NON_DIGIT.sub('', s)) >= 3:
             return True
         
         # 1. Ignore URLs, domains and emails (e.g. freenet.ag, nils.meissner@...)
-        if re.search(r'\.(de|com|at|org|net|ag|me|io|info|pro|group|eu|uk|ch)$', s_lower):
+        if _DOMAIN.search(s_lower):
             return True
         if '@' in s_lower or s_lower.startswith('www.') or 'http' in s_lower:
             return True
@@ -95,27 +218,19 @@ class SkillExtractor:
             for p in parts:
                 p_clean = p.strip().upper()
                 if p_clean in self.blacklist or len(p_clean) < 2 or p_clean.isdigit(): return True
-            hr_keywords = {'ANSTELLUNG', 'VOLLZEIT', 'TEILZEIT', 'BACHELOR', 'MASTER', 'DIRECT', 'BEREICH', 'LEVEL'}
-            if any(p.upper() in hr_keywords for p in parts): return True
+            if any(p.upper() in _HR_KEYWORDS for p in parts): return True
         
         # 3. Handle names or identifiers in format "first.last" (e.g. nils.meissner, Co.KG)
         if '.' in s and len(s) < 30:
             parts = s.split('.')
             if len(parts) == 2 and all(p.islower() and len(p) > 1 for p in parts):
                 return True
-            if s_upper in ['CO.KG', 'GMBH', 'GMBH.CO', 'KARRIERE', 'BEWERBUNG']: return True
+            if s_upper in _LEGAL_NOISE: return True
             if any(p.upper() in self.blacklist for p in parts): return True
         
         # 4. Handle 3-letter strings - tighten the "Discovery"
         if len(s) == 3 and s.isupper():
-            believable_3 = {
-                'API', 'CLI', 'GUI', 'NPM', 'SSH', 'SSL', 'TCP', 'UDP', 'XML', 'DOM', 'SDK',
-                'NLP', 'LLM', 'OCR', 'RPA', 'ERP', 'CRM', 'BI', 'CI', 'CD', 'UI', 'UX',
-                'AWS', 'SQL', 'SAP', 'GCP', 'ETL', 'GIT', 'VPC', 'IAM', 'CDN'
-            }
-            if s_upper not in believable_3:
-                vowels = 'AEIOU'
-                if not any(v in s_upper for v in vowels): return True
+            if s_upper not in _BELIEVABLE_3:
                 return True # Default to skip unknown 3-letter acronyms
         
         # 5. Filter CamelCase that looks like benefits or common German words
@@ -125,108 +240,200 @@ class SkillExtractor:
             
         # 6. Check prefix/suffix or generic noise
         if s.startswith(('.', '/')) or s.endswith(('.', '/')): return True
-        if s_lower in ['whatsapp', 'telegram', 'viber', 'skype', 'linkedin', 'xing', 'facebook']: return True
+        if s_lower in _MESSENGERS: return True
 
         # 7. Check if it's a known non-technical word
-        de_noise = {'DYNAMISCH', 'MOTIVIERT', 'ERFAHREN', 'EIGENSTÄNDIG', 'KREATIV', 'OFFEN', 'BUNT'}
-        if s_upper in de_noise: return True
+        if s_upper in _DE_NOISE: return True
 
         return False
 
+    def garbage_cache_stats(self):
+        """Статистика кэша вердиктов _is_garbage: {hits, misses, size, hit_rate}."""
+        info = self._garbage_verdict.cache_info()
+        lookups = info.hits + info.misses
+        return {"hits": info.hits, "misses": info.misses, "size": info.currsize,
+                "hit_rate": round(info.hits / lookups, 4) if lookups else 0.0}
+
     def extract_from_text(self, text):
         """Analyzes a single block of text (title + description) for skills."""
         if not text: return []
         
         # Pre-process text to handle common German "gender-neutral" suffixes
-        text = re.sub(r'(/in|\*in|:in)\b', '', text, flags=re.IGNORECASE)
+        text = _GENDER_SUFFIX.sub('', text)
         
-        lower_text = text.lower()
-        found_skills = set()
-        
-        # 1. Поиск установленных навыков (Case-insensitive)
-        for skill, pattern in self.skills_patterns.items():
-            if re.search(pattern, lower_text):
-                found_skills.add(skill)
+        # 1. Поиск установленных навыков - один проход по словам текста
+        found_skills = self._match_skills(text.lower())
+        known_norms = [self._known_norm[skill] for skill in found_skills]
         
         # 2. Discovery: Поиск неизвестных технических терминов
-        # Focus on CamelCase, acronyms 3+, or terms with dots/slashes
-        # Updated regex to require letters in slash/dot terms to avoid numbers
-        candidates = re.findall(r'\b[A-Z][a-z]+[A-Z][A-Za-z0-9]*\b|\b[A-Z]{3,12}\b|\b[A-Za-z]{2,}[./][A-Za-z]{2,}\b', text)
-        
-        def normalize_for_check(s):
-            return re.sub(r'[^a-z0-9]', '', s.lower())
-
-        for cond in candidates:
+        for cond in _DISCOVERY.findall(text):
             cond_clean = cond.strip('.,/() -')
             if len(cond_clean) < 2: continue
-            if cond_clean.upper() in self.blacklist: continue
-            if self._is_garbage(cond_clean): continue
+            if self._garbage_verdict(cond_clean): continue
             
             # Normalization check to avoid "Power BI" vs "PowerBI"
-            cond_norm = normalize_for_check(cond_clean)
-            is_known = False
-            for known in found_skills:
-                known_norm = normalize_for_check(known)
-                if cond_norm == known_norm or cond_norm in known_norm:
-                    is_known = True
-                    break
-            
-            if not is_known:
-                found_skills.add(cond_clean)
+            cond_norm = _normalize_for_check(cond_clean)
+            if any(cond_norm == known or cond_norm in known for known in known_norms):
+                continue
+            found_skills.add(cond_clean)
+            # Как и раньше, найденный термин тоже "известен": "DataBricks" и "DATABRICKS" - один навык
+            known_norms.append(cond_norm)
         
         return sorted(list(found_skills))
 
 
-    def analyze_skills(self):
-        conn = sqlite3.connect(self.db_path)
-        df = pd.read_sql_query("SELECT signature, title, description, source FROM vacancies", conn)
-        conn.close()
+    def _read_chunks(self, conn, full):
+        """
+        Порции [(id, title, description, source, content_hash описания)] по chunk_size строк -
+        keyset-пагинацией по internal_id, поэтому между порциями можно писать в ту же базу,
+        а в памяти только порция. Без full - только строки с skills_version IS NULL (по индексу).
+        """
+        stale = "" if full else "AND v.skills_version IS NULL"
+        sql = f'''
+            SELECT v.internal_id, v.title, vacancy_text(t.codec, t.body), v.source, t.content_hash
+            FROM vacancies v LEFT JOIN vacancy_texts t ON t.vacancy_id = v.internal_id
+            WHERE v.internal_id > ? {stale}
+            ORDER BY v.internal_id LIMIT ?
+        '''
+        last_id = 0
+        while True:
+            rows = conn.execute(sql, (last_id, self.chunk_size)).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield rows
+
+    def _write_chunk(self, cursor, results, keys):
+        cursor.executemany(
+            "UPDATE vacancies SET extracted_skills = ?, skills_hash = ?, skills_version = ? WHERE internal_id = ?",
+            [(", ".join(skills), keys[vacancy_id], self.version, vacancy_id) for vacancy_id, skills in results]
+        )
+        save_vacancy_skills(cursor, results)
+
+    def analyze_skills(self, full=False):
+        """
+        Извлекает навыки для новых и измененных вакансий: строка обрабатывается, если skills_version
+        пуст (новая вакансия; заголовок или описание изменились - сбрасывают триггеры, см.
+        DatabaseManager._init_db) или навыки посчитаны другой версией экстрактора. full=True -
+        все вакансии заново.
+
+        Потоково: порции читаются из базы, извлечение идет в пуле из workers процессов
+        (в работе не больше 2 * workers порций), результаты пишутся executemany по порциям
+        и фиксируются раз в commit_rows строк. Память ограничена несколькими порциями.
+        """
+        conn = get_connection(self.db_path)
+        total = conn.execute("SELECT COUNT(*) FROM vacancies").fetchone()[0]
+        scope = f"всех {total} вакансий" if full else f"новых/измененных из {total} вакансий"
+        print(f"[Skills] Анализ {scope} (extractor {self.version}, процессов: {self.workers or 'нет'}, Discovery mode ON)...")
+        if not full:
+            # Навыки другой версии экстрактора - тоже к пересчету; поиск по индексу, без прохода по таблице
+            conn.execute("UPDATE vacancies SET skills_version = NULL WHERE skills_version < ? OR skills_version > ?",
+                         (self.version, self.version))
+            conn.commit()
+
+        # Воркеры получают таксономию этого экстрактора: навыки пишутся с версией, по которой посчитаны
+        # spawn, а не fork: в процессе открыты SQLite-соединения и могут быть заняты блокировки других потоков
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker,
+            mp_context=multiprocessing.get_context("spawn"),
+            initargs=(self.skill_terms, sorted(self.blacklist), self.garbage_cache_size)
+        ) if self.workers > 0 else None
+        pending = deque()
+        processed, uncommitted = 0, 0
+        sources = Counter()
+        cache_stats = {}
+
+        def submit(rows):
+            texts = [(r[0], f"{r[1]} {r[2]}") for r in rows]
+            if executor is not None:
+                future = executor.submit(_extract_chunk, texts)
+            else:
+                future = Future()
+                future.set_result(_extract_chunk(texts, self))
+            pending.append((future, {r[0]: r[4] for r in rows}))
+            sources.update(r[3] or 'unknown' for r in rows)
+
+        def drain(limit):
+            nonlocal processed, uncommitted
+            while len(pending) > limit:
+                future, keys = pending.popleft()
+                results, (pid, hits, misses) = future.result()
+                cache_stats[pid] = (hits, misses)
+                self._write_chunk(conn.cursor(), results, keys)
+                processed += len(results)
+                uncommitted += len(results)
+                if uncommitted >= self.commit_rows:
+                    conn.commit()
+                    uncommitted = 0
+                    print(f"  [+] {processed} vacancies")
 
-        print(f"[Skills] Анализ {len(df)} вакансий (Discovery mode ON)...")
-        
-        results = []
-        for idx, row in df.iterrows():
-            orig_text = f"{row['title']} {row['description']}"
-            skills_list = self.extract_from_text(orig_text)
-            results.append({
-                'signature': row['signature'],
-                'skills': ", ".join(skills_list)
-            })
-        
-        # Обновляем таблицу вакансий
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            # Проверяем наличие колонки
-            cursor.execute("PRAGMA table_info(vacancies)")
-            columns = [c[1] for c in cursor.fetchall()]
-            if 'extracted_skills' not in columns:
-                cursor.execute("ALTER TABLE vacancies ADD COLUMN extracted_skills TEXT")
-            
-            for res in results:
-                cursor.execute("UPDATE vacancies SET extracted_skills = ? WHERE signature = ?", 
-                             (res['skills'], res['signature']))
+            for rows in self._read_chunks(conn, full):
+                submit(rows)
+                drain(max(2 * self.workers - 1, 0))
+            drain(0)
             conn.commit()
-            conn.close()
-            print(f"[Skills] Навыки извлечены и сохранены в БД.")
         except Exception as e:
+            conn.rollback()
             print(f"[!] Ошибка при сохранении навыков: {e}")
+            return
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+        for source, count in sources.items():
+            METRICS.record_rows(source, updated=count)
+        print(f"[Skills] Навыки извлечены для {processed} вакансий и сохранены в БД.")
+        hits = sum(h for h, _ in cache_stats.values())
+        lookups = hits + sum(m for _, m in cache_stats.values())
+        if lookups:
+            print(f"[Skills] Кэш Discovery-фильтра: {hits / lookups:.1%} попаданий ({lookups} проверок, "
+                  f"процессов: {len(cache_stats)})")
 
 
-    def get_top_skills(self, min_salary=None):
-        conn = sqlite3.connect(self.db_path)
-        query = "SELECT extracted_skills FROM vacancies WHERE extracted_skills IS NOT NULL"
+    def get_top_skills(self, min_salary=None, max_salary=None, country=None, level=None, source=None,
+                       since=None, until=None, active_only=False, limit=20):
+        """
+        Топ навыков одним GROUP BY по vacancy_skills. Фильтры (все необязательные):
+        зарплатная вилка (min_salary/max_salary), страна, уровень (search_level), источник,
+        окно по first_seen (since/until, 'YYYY-MM-DD'), только активные вакансии.
+        Возвращает список (навык, количество), как Counter.most_common().
+        """
+        query = '''
+            SELECT s.name, COUNT(*) AS cnt
+            FROM vacancy_skills vs
+            JOIN skills s ON s.id = vs.skill_id
+            JOIN vacancies v ON v.internal_id = vs.vacancy_id
+            WHERE 1=1
+        '''
+        params = []
         if min_salary:
-            query += f" AND (salary_min >= {min_salary} OR salary_max >= {min_salary})"
-        
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-        
-        all_skills = []
-        for s in df['extracted_skills']:
-            if s: all_skills.extend(s.split(", "))
-            
-        return Counter(all_skills).most_common(20)
+            query += " AND (v.salary_min >= ? OR v.salary_max >= ?)"
+            params += [min_salary, min_salary]
+        if max_salary:
+            query += " AND v.salary_min <= ?"
+            params.append(max_salary)
+        if country:
+            query += " AND v.country_api = ?"
+            params.append(country.upper())
+        if level:
+            query += " AND v.search_level = ?"
+            params.append(level)
+        if source:
+            query += " AND v.source = ?"
+            params.append(source)
+        if since:
+            query += " AND v.first_seen >= ?"
+            params.append(since)
+        if until:
+            query += " AND v.first_seen <= ?"
+            params.append(until)
+        if active_only:
+            query += " AND v.is_active = 1"
+        query += " GROUP BY vs.skill_id ORDER BY cnt DESC, s.name LIMIT ?"
+        params.append(limit)
+
+        return [tuple(r) for r in get_connection(self.db_path).execute(query, params).fetchall()]
 
 if __name__ == "__main__":
     extractor = SkillExtractor()
@@ -0,0 +1,56 @@
+import zlib
+import hashlib
+import threading
+
+# Сжатие описаний для таблицы vacancy_texts. Кодек хранится в каждой строке,
+# поэтому база остается читаемой и после установки/удаления zstandard.
+try:
+    import zstandard
+    DEFAULT_CODEC = "zstd"
+except ImportError:
+    zstandard = None
+    DEFAULT_CODEC = "zlib"
+
+# Объекты ZstdCompressor / ZstdDecompressor нельзя использовать из нескольких потоков
+# одновременно (скраперы пишут описания параллельно) - у каждого потока свои
+_local = threading.local()
+
+
+def _zstd():
+    if not hasattr(_local, "compressor"):
+        _local.compressor = zstandard.ZstdCompressor(level=6)
+        _local.decompressor = zstandard.ZstdDecompressor()
+    return _local
+
+
+def content_hash(text):
+    """Хэш текста описания (для дедупликации, FTS и инкрементального извлечения навыков)."""
+    return hashlib.blake2b((text or "").encode("utf-8"), digest_size=16).hexdigest()
+
+
+def compress_text(text, codec=None):
+    """Текст -> (codec, body, content_hash, raw_length)."""
+    text = text or ""
+    raw = text.encode("utf-8")
+    codec = codec or DEFAULT_CODEC
+    if codec == "zstd":
+        body = _zstd().compressor.compress(raw)
+    else:
+        codec = "zlib"
+        body = zlib.compress(raw, 6)
+    return codec, body, content_hash(text), len(text)
+
+
+def decompress_text(codec, body):
+    """Обратная операция. Регистрируется в SQLite как функция vacancy_text(codec, body)."""
+    if body is None:
+        return None
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("description is zstd-compressed, but the zstandard package is not installed")
+        raw = _zstd().decompressor.decompress(body)
+    elif codec == "zlib":
+        raw = zlib.decompress(body)
+    else:
+        raw = body
+    return raw.decode("utf-8")
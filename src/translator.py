@@ -1,10 +1,12 @@
 import os
 import requests
-import sqlite3
+from db_connection import get_connection
 import re
 import time
 import configparser
+from urllib.parse import urlparse
 from dotenv import load_dotenv
+from instrumentation import METRICS
 
 load_dotenv()
 
@@ -62,7 +64,7 @@ class JobTranslator:
             print("[!] DeepL API Key not found in .env. Skipping translation.")
             return
 
-        conn = sqlite3.connect(self.db_path)
+        conn = get_connection(self.db_path)
         cursor = conn.cursor()
 
         # Check monthly usage before starting
@@ -71,7 +73,6 @@ class JobTranslator:
             print(f"[Translator] Monthly DeepL Usage: {usage['used']}/{usage['limit']} chars")
             if usage['used'] >= usage['limit']:
                 print("[!] Monthly limit reached! Stop.")
-                conn.close()
                 return
 
         # 1. Skip 'Senior' level vacancies to save credits (as per user request)
@@ -84,7 +85,6 @@ class JobTranslator:
         rows = cursor.fetchall()
         if not rows:
             print("[Translator] No new titles to translate.")
-            conn.close()
             return
 
         # Group signatures by CLEANED title to save credits
@@ -119,6 +119,7 @@ class JobTranslator:
                     [translated] + signatures
                 )
                 processed_count += len(signatures)
+                METRICS.record_rows("deepl", updated=len(signatures))
                 print(f"  [+] ({self.chars_translated}/{self.SESSION_LIMIT}) {cleaned_title} -> {translated} ({len(signatures)} vacancies)")
             else:
                 consecutive_errors += 1
@@ -130,7 +131,6 @@ class JobTranslator:
             time.sleep(0.3)
 
         conn.commit()
-        conn.close()
         
         final_usage = self.get_api_usage()
         usage_str = f" (Monthly total: {final_usage['used']}/{final_usage['limit']})" if final_usage else ""
@@ -142,8 +142,18 @@ class JobTranslator:
             "text": text,
             "target_lang": target_lang
         }
+        # Хост берется из self.url: Free и Pro API - разные домены
+        host = urlparse(self.url).hostname
+        started = time.time()
         try:
             response = requests.post(self.url, headers=headers, data=data, timeout=10)
+        except Exception as e:
+            METRICS.record_request(host, seconds=time.time() - started, error=True)
+            print(f"  [!] Translation Exception: {e}")
+            return None
+        METRICS.record_request(host, status=response.status_code,
+                               nbytes=len(response.content or b""), seconds=time.time() - started)
+        try:
             if response.status_code == 200:
                 result = response.json()
                 return result["translations"][0]["text"]
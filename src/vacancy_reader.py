@@ -0,0 +1,127 @@
+from db_connection import get_connection
+
+
+# Колонки с небольшим числом значений - категории (набор значений берется из всей таблицы
+# до чтения, поэтому у всех порций он один и тот же и pd.concat категории не теряет)
+CATEGORY_COLUMNS = ("source", "country_api", "search_level", "search_query")
+# Даты и время в ISO: updated_at бывает и датой (перенос из last_seen), и датой со временем
+DATE_COLUMNS = ("first_seen", "last_seen", "updated_at")
+SMALL_INT_COLUMNS = ("is_active", "salary_is_predicted", "needs_enrichment")
+DEFAULT_COLUMNS = ("internal_id", "title", "company", "location", "city", "country_api", "search_query",
+                   "search_level", "source", "salary_min", "salary_max", "salary_is_predicted",
+                   "first_seen", "last_seen", "is_active")
+
+
+class VacancyReader:
+    """
+    Потоковое чтение vacancies для анализа: только нужные колонки, фильтры в SQL
+    и порции по chunk_size строк с компактными типами (категории, даты, int8/float32).
+
+        for chunk in db.reader.iter_vacancies(columns=["source", "first_seen"], country="DE"):
+            counts = counts.add(chunk["source"].value_counts(), fill_value=0)
+
+    Память ограничена одной порцией, поэтому так можно обходить многолетнюю историю.
+    read_vacancies() собирает все порции в один DataFrame (для небольших выборок).
+    """
+
+    def __init__(self, db_path="data/jobs_database.sqlite"):
+        self.db_path = db_path
+
+    def _query(self, conn, columns, country, level, source, active_only, unique_only, since, until, date_column):
+        available = [c[1] for c in conn.execute("PRAGMA table_info(vacancies)")]
+        columns = list(columns or DEFAULT_COLUMNS)
+        unknown = [c for c in columns if c not in available]
+        if unknown:
+            raise ValueError(f"Unknown vacancy columns: {', '.join(unknown)}")
+        if date_column not in DATE_COLUMNS:
+            raise ValueError(f"date_column must be one of {', '.join(DATE_COLUMNS)}")
+
+        select = ", ".join(
+            "vacancy_text(t.codec, t.body) AS description" if c == "description" else f"v.{c}" for c in columns
+        )
+        join = "LEFT JOIN vacancy_texts t ON t.vacancy_id = v.internal_id" if "description" in columns else ""
+        where, params = [], []
+        if country:
+            where.append("v.country_api = ?")
+            params.append(country.upper())
+        if level:
+            where.append("v.search_level = ?")
+            params.append(level)
+        if source:
+            where.append("v.source = ?")
+            params.append(source)
+        if active_only:
+            where.append("v.is_active = 1")
+        if unique_only:
+            # Из кластера почти-дубликатов (near_dedup.py) остается самая ранняя вакансия
+            where.append("NOT EXISTS (SELECT 1 FROM vacancy_clusters c "
+                         "WHERE c.vacancy_id = v.internal_id AND c.cluster_id != v.internal_id)")
+        if since:
+            where.append(f"v.{date_column} >= ?")
+            params.append(str(since))
+        if until:
+            where.append(f"v.{date_column} <= ?")
+            params.append(str(until))
+        sql = f"SELECT {select} FROM vacancies v {join}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return columns, sql + " ORDER BY v.internal_id", params
+
+    def _categories(self, conn, columns):
+        categories = {}
+        for column in CATEGORY_COLUMNS:
+            if column in columns:
+                # Из самой vacancies, а не из stats_active: значение, которого нет в категориях, стало бы NaN
+                categories[column] = [r[0] for r in conn.execute(
+                    f"SELECT DISTINCT {column} FROM vacancies WHERE {column} IS NOT NULL ORDER BY 1"
+                )]
+        return categories
+
+    @staticmethod
+    def _apply_dtypes(df, categories):
+        import pandas as pd
+        for column, values in categories.items():
+            df[column] = pd.Categorical(df[column], categories=values)
+        for column in DATE_COLUMNS:
+            if column in df:
+                df[column] = pd.to_datetime(df[column], format="ISO8601", errors="coerce")
+        if "created" in df:
+            df["created"] = pd.to_datetime(df["created"], format="ISO8601", utc=True, errors="coerce")
+        for column in SMALL_INT_COLUMNS:
+            if column in df:
+                df[column] = df[column].fillna(0).astype("int8")
+        for column in ("salary_min", "salary_max"):
+            if column in df:
+                df[column] = df[column].astype("float32")
+        if "description_length" in df:
+            df["description_length"] = df["description_length"].fillna(0).astype("int32")
+        return df
+
+    def iter_vacancies(self, columns=None, country=None, level=None, source=None, active_only=False,
+                       unique_only=False, since=None, until=None, date_column="first_seen", chunk_size=50_000, as_arrow=False):
+        """
+        Генератор порций вакансий. columns - проекция (по умолчанию DEFAULT_COLUMNS, без описания;
+        "description" - распакованный текст), since/until - диапазон по date_column (включительно),
+        unique_only=True - без почти-дубликатов.
+        as_arrow=True отдает pyarrow.RecordBatch вместо DataFrame (категории -> dictionary).
+        """
+        import pandas as pd
+        if as_arrow:
+            import pyarrow as pa
+        with get_connection(self.db_path) as conn:
+            columns, sql, params = self._query(conn, columns, country, level, source,
+                                               active_only, unique_only, since, until, date_column)
+            categories = self._categories(conn, columns)
+            for chunk in pd.read_sql_query(sql, conn, params=params, chunksize=chunk_size):
+                chunk = self._apply_dtypes(chunk, categories)
+                yield pa.RecordBatch.from_pandas(chunk, preserve_index=False) if as_arrow else chunk
+
+    def read_vacancies(self, columns=None, **filters):
+        """То же, что iter_vacancies, но одним DataFrame (типы те же, категории сохраняются)."""
+        import pandas as pd
+        chunks = list(self.iter_vacancies(columns=columns, **filters))
+        if chunks:
+            return pd.concat(chunks, ignore_index=True)
+        columns = list(columns or DEFAULT_COLUMNS)
+        with get_connection(self.db_path) as conn:
+            return self._apply_dtypes(pd.DataFrame(columns=columns), self._categories(conn, columns))